@@ -0,0 +1,280 @@
+"""
+Modo batch (sem interface) do TopStart Thermal
+Processa arquivos ou pastas em paralelo, gerando PNG monocromático ou ESC/POS
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import PRINTER_CONFIG, IMAGE_CONFIG, DOCUMENT_CONFIG
+from dithering import METHODS
+import document_source
+import instrumentation
+from instrumentation import JobTimings
+from image_processor import ImageProcessor
+from printer_handler import PrinterHandler
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp') + document_source.DOCUMENT_EXTENSIONS
+
+# Instâncias por processo (criadas no initializer do pool)
+_processor = None
+_printer_handler = None
+
+
+def collect_files(paths):
+    """
+    Expande arquivos e pastas em uma lista de imagens
+    
+    Args:
+        paths: Lista de caminhos (arquivos ou pastas)
+    
+    Returns:
+        Lista ordenada de tuplas (caminho, nome relativo); o nome relativo
+        mantém as subpastas de cada pasta informada e define a saída
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        file_path = os.path.join(root, name)
+                        files.append((file_path, os.path.relpath(file_path, path)))
+        elif os.path.isfile(path):
+            files.append((path, os.path.basename(path)))
+        else:
+            print(f"Aviso: caminho não encontrado: {path}")
+    
+    return sorted(files)
+
+
+def output_name(relative):
+    """Nome da saída (sem extensão) de um arquivo de entrada, relativo à pasta de saída"""
+    return os.path.splitext(relative)[0]
+
+
+def find_collisions(files):
+    """
+    Entradas que gravariam na mesma saída (ex.: x.png e x.jpg na mesma pasta)
+    
+    Args:
+        files: Retorno de collect_files
+    
+    Returns:
+        Lista de listas de caminhos de entrada com a mesma saída
+    """
+    outputs = {}
+    for path, relative in files:
+        outputs.setdefault(os.path.normcase(output_name(relative)), []).append(path)
+    return [paths for paths in outputs.values() if len(paths) > 1]
+
+
+def _init_worker():
+    """Cria o processador e o handler uma vez por processo do pool"""
+    global _processor, _printer_handler
+    _processor = ImageProcessor(PRINTER_CONFIG['paper_width_px'], PRINTER_CONFIG['pixels_per_mm'])
+    _printer_handler = PrinterHandler()
+
+
+def process_file(path, output_dir, output_format='png', auto_top_fix=True, offset_mm=0, method='threshold',
+                 join_pages=False, relative=None):
+    """
+    Processa um arquivo e grava o resultado (executado nos processos do pool)
+    
+    Args:
+        path: Caminho da imagem de entrada
+        output_dir: Pasta de saída
+        output_format: 'png' (monocromático) ou 'bin' (comandos ESC/POS)
+        auto_top_fix: Remover margem branca superior
+        offset_mm: Offset vertical em milímetros
+        method: 'threshold', 'dither' ou um dos algoritmos de dithering.METHODS
+        join_pages: Em TIFF/PDF, unir as páginas em uma faixa contínua
+        relative: Nome relativo (collect_files); a saída repete as subpastas
+            dentro de output_dir (padrão: nome do arquivo)
+    
+    Returns:
+        Tupla (caminho de entrada, caminho de saída, segundos, JobTimings)
+    """
+    if _processor is None:
+        _init_worker()
+    
+    start = time.perf_counter()
+    name = output_name(relative or os.path.basename(path))
+    output_path = os.path.join(output_dir, f"{name}.{output_format}")
+    os.makedirs(os.path.dirname(output_path) or output_dir, exist_ok=True)
+    timings = JobTimings(path)
+    
+    if document_source.is_document(path):
+        with instrumentation.activate(timings):
+            output_path = _process_document(path, output_dir, name, output_format,
+                                            auto_top_fix, offset_mm, method, join_pages)
+        return path, output_path, time.perf_counter() - start, timings
+    
+    with instrumentation.activate(timings), _processor.open_image(path, grayscale=True) as image:
+        if output_format == 'bin':
+            # Streaming: cada faixa é codificada e gravada antes da próxima
+            bands = _processor.iter_monochrome_bands(
+                image,
+                band_height=PRINTER_CONFIG['raster_band_height'],
+                auto_top_fix=auto_top_fix,
+                offset_mm=offset_mm,
+                method=method
+            )
+            with open(output_path, 'wb') as f:
+                for chunk in _printer_handler.iter_esc_pos_chunks(bands):
+                    f.write(chunk)
+        else:
+            processed = _processor.process(image, auto_top_fix, offset_mm)
+            _processor.convert_to_monochrome(processed, method).save(output_path)
+    
+    return path, output_path, time.perf_counter() - start, timings
+
+
+def _process_document(path, output_dir, name, output_format, auto_top_fix, offset_mm, method, join_pages):
+    """
+    Processa um TIFF/PDF página por página
+    
+    Em 'bin' as páginas vão para um único arquivo (cada uma com corte, ou
+    todas em uma faixa contínua); em 'png' cada página vira um arquivo
+    nome-001.png, ou um único nome.png com as páginas unidas.
+    
+    Returns:
+        Caminho (ou padrão de nomes) da saída
+    """
+    if join_pages:
+        bands = document_source.iter_joined_bands(path, _processor, method)
+        output_path = os.path.join(output_dir, f"{name}.{output_format}")
+        if output_format == 'bin':
+            with open(output_path, 'wb') as f:
+                for chunk in _printer_handler.iter_esc_pos_chunks(bands):
+                    f.write(chunk)
+        else:
+            _printer_handler.join_bands(bands).save(output_path)
+        return output_path
+    
+    pages = document_source.iter_processed_pages(path, _processor, auto_top_fix, offset_mm, method)
+    if output_format == 'bin':
+        output_path = os.path.join(output_dir, f"{name}.bin")
+        with open(output_path, 'wb') as f:
+            for page in pages:
+                for chunk in _printer_handler.iter_esc_pos_chunks([page]):
+                    f.write(chunk)
+        return output_path
+    
+    for number, page in enumerate(pages, 1):
+        page.save(os.path.join(output_dir, f"{name}-{number:03d}.png"))
+    return os.path.join(output_dir, f"{name}-*.png")
+
+
+def run_batch(files, output_dir, workers=None, **options):
+    """
+    Processa vários arquivos em paralelo com um pool de processos
+    
+    Args:
+        files: Retorno de collect_files (tuplas caminho, nome relativo)
+        output_dir: Pasta de saída
+        workers: Número de processos (padrão: núcleos disponíveis)
+        **options: Opções repassadas para process_file
+    
+    Returns:
+        Tupla (lista de resultados, lista de falhas, segundos totais)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    results = []
+    failures = []
+    start = time.perf_counter()
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(process_file, path, output_dir, relative=relative, **options): path
+            for path, relative in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                _, output_path, seconds, timings = future.result()
+                results.append((path, output_path, seconds))
+                print(f"  ok    {seconds * 1000:8.1f} ms  {path} -> {output_path}")
+                print(f"        {timings.summary()}")
+            except Exception as e:
+                failures.append((path, e))
+                print(f"  ERRO  {path}: {e}")
+    
+    return results, failures, time.perf_counter() - start
+
+
+def main(argv=None):
+    """Ponto de entrada do modo batch"""
+    parser = argparse.ArgumentParser(
+        prog="main.py --batch",
+        description="Processa imagens para impressoras térmicas 58mm sem abrir a interface"
+    )
+    parser.add_argument('paths', nargs='+', help="Arquivos ou pastas de imagens")
+    parser.add_argument('-o', '--output', default='output', help="Pasta de saída (padrão: output)")
+    parser.add_argument('-f', '--format', choices=('png', 'bin'), default='png',
+                        help="png = imagem monocromática, bin = comandos ESC/POS")
+    parser.add_argument('--mode', choices=('dither',) + METHODS, default=IMAGE_CONFIG['default_mode'],
+                        help="Conversão monocromática")
+    parser.add_argument('--offset', type=int, default=0, help="Offset manual em mm")
+    parser.add_argument('--no-auto-top-fix', action='store_true',
+                        help="Não remover a margem branca superior")
+    parser.add_argument('--join-pages', action='store_true', default=DOCUMENT_CONFIG['join_pages'],
+                        help="TIFF/PDF: unir as páginas em uma faixa contínua, sem margens brancas")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: núcleos disponíveis)")
+    parser.add_argument('--profile', metavar='ARQUIVO',
+                        help="Processa o primeiro arquivo com cProfile e grava as estatísticas (.prof)")
+    args = parser.parse_args(argv)
+    
+    instrumentation.configure_logging('INFO' if args.profile else None)
+    
+    files = collect_files(args.paths)
+    if not files:
+        print("Nenhuma imagem encontrada.")
+        return 1
+    
+    # Duas entradas com a mesma saída: uma sobrescreveria a outra
+    collisions = find_collisions(files)
+    if collisions:
+        print("Erro: arquivos com o mesmo nome de saída (renomeie ou processe separadamente):")
+        for paths in collisions:
+            print(f"  {', '.join(paths)}")
+        return 1
+    
+    options = dict(
+        output_format=args.format,
+        auto_top_fix=not args.no_auto_top_fix,
+        offset_mm=args.offset,
+        method=args.mode,
+        join_pages=args.join_pages
+    )
+    
+    if args.profile:
+        # Um único trabalho no processo principal, onde o cProfile enxerga tudo
+        os.makedirs(args.output, exist_ok=True)
+        with instrumentation.profiled(args.profile):
+            path, relative = files[0]
+            _, output_path, seconds, timings = process_file(path, args.output, relative=relative, **options)
+        print(f"  perfil {seconds * 1000:7.1f} ms  {path} -> {output_path}")
+        print(f"        {timings.summary()}")
+        files = files[1:]
+        if not files:
+            return 0
+    
+    print(f"Processando {len(files)} imagem(ns)...")
+    results, failures, total_seconds = run_batch(files, args.output, workers=args.workers, **options)
+    
+    throughput = len(results) / total_seconds if total_seconds > 0 else 0.0
+    print(f"\n{len(results)} imagem(ns) em {total_seconds:.2f}s ({throughput:.1f} imagens/s)")
+    if failures:
+        print(f"{len(failures)} falha(s)")
+        return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""
+Benchmark do pipeline do TopStart Thermal
+Mede tempo e pico de memória de cada etapa em imagens sintéticas reproduzíveis
+O pico de memória residente de cada entrada é medido em um subprocesso separado
+
+Uso:
+    python benchmark.py                      # Mede e mostra a tabela
+    python benchmark.py --save               # Grava a linha de base (benchmark_baseline.json)
+    python benchmark.py --check              # Compara com a linha de base; sai com 1 se piorou
+    python benchmark.py --cases logo,a4 --modes L,RGB --repeat 5
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import PIL
+from PIL import Image
+from config import PRINTER_CONFIG
+from image_processor import ImageProcessor
+from printer_handler import PrinterHandler
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+# Entradas sintéticas: (largura, altura, formato do arquivo codificado)
+CASES = {
+    'logo': (320, 120, 'PNG'),  # Logotipo pequeno
+    'a4': (1654, 2339, 'PNG'),  # Página A4 escaneada a 200 DPI
+    'photo': (4000, 3000, 'JPEG'),  # Foto de 12 MP
+    'banner': (696, 24000, 'PNG'),  # Faixa de 2000 mm (1,5x a largura do papel)
+}
+
+MODES = ('RGB', 'RGBA', 'P', 'L')
+
+STAGES = ('decode', 'resize', 'trim_offset', 'monochrome', 'encode')
+
+# Diferenças menores que isso são ruído, mesmo acima da tolerância
+MIN_REGRESSION_MS = 2.0
+MIN_REGRESSION_KB = 256
+
+
+def make_image(case, mode):
+    """
+    Gera uma imagem sintética determinística
+    
+    Args:
+        case: Nome em CASES
+        mode: Modo PIL ('RGB', 'RGBA', 'P' ou 'L')
+    
+    Returns:
+        Tupla (PIL Image, bytes do arquivo codificado)
+    """
+    import numpy as np
+    
+    width, height, file_format = CASES[case]
+    rng = np.random.default_rng(42)
+    
+    if case == 'photo':
+        # Gradiente suave com ruído (tons contínuos)
+        y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+        x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+        pixels = 255 * (0.5 + 0.35 * np.sin(6 * x + 4 * y) * np.cos(3 * y))
+        pixels = pixels + rng.normal(0, 12, (height, width)).astype(np.float32)
+    else:
+        # Fundo branco com margem superior e blocos escuros de "texto"
+        pixels = np.full((height, width), 255, dtype=np.float32)
+        margin = height // 10
+        line_height = max(4, height // 200)
+        for top in range(margin, height - line_height, line_height * 2):
+            length = int(width * rng.uniform(0.3, 0.9))
+            left = int(width * 0.05)
+            pixels[top:top + line_height, left:left + length] = rng.uniform(0, 90)
+        pixels = pixels - np.abs(rng.normal(0, 4, (height, width))).astype(np.float32)
+    
+    gray = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    image = gray if mode == 'L' else gray.convert(mode if mode != 'P' else 'RGB').convert(mode)
+    
+    encoded = io.BytesIO()
+    (image.convert('RGB') if file_format == 'JPEG' else image).save(encoded, file_format)
+    return image, encoded.getvalue()
+
+
+def run_stages(processor, printer_handler, encoded):
+    """
+    Prepara o pipeline completo, etapa por etapa
+    
+    Args:
+        processor: ImageProcessor
+        printer_handler: PrinterHandler (codificação ESC/POS)
+        encoded: Bytes do arquivo de entrada
+    
+    Returns:
+        Tupla (lista de (etapa, função sem argumentos), dicionário com a saída da última etapa)
+    """
+    state = {}
+    
+    def decode():
+        state['output'] = processor.load(processor.open_image(io.BytesIO(encoded), grayscale=True))
+    
+    def resize():
+        state['output'] = processor.resize_to_width(state['output'], grayscale=True)
+    
+    def trim_offset():
+        # Mesmo caminho do aplicativo: recorte e offset fundidos em um buffer
+        state['output'] = processor.trim_and_offset(state['output'], True, 5)
+    
+    def monochrome():
+        state['output'] = processor.convert_to_monochrome(state['output'])
+    
+    def encode():
+        state['output'] = printer_handler.get_esc_pos_commands(state['output'])
+    
+    return list(zip(STAGES, (decode, resize, trim_offset, monochrome, encode))), state
+
+
+def measure(case, mode, repeat=3):
+    """
+    Mede uma combinação de entrada e modo
+    
+    O tempo é o menor de `repeat` execuções sem tracemalloc; o pico de
+    memória por etapa vem de uma execução extra com tracemalloc ligado. O
+    tracemalloc enxerga alocações do Python e do numpy, mas não os buffers
+    internos do Pillow, então esse pico é só informativo; o que vale para o
+    --check é o pico residente do pipeline inteiro (rss_kb), medido em um
+    subprocesso (ver measure_rss).
+    
+    Args:
+        case: Nome em CASES
+        mode: Modo PIL da imagem de entrada
+        repeat: Número de execuções cronometradas
+    
+    Returns:
+        Dicionário {'stages': {etapa: {'ms': ..., 'peak_kb': ..., 'output_kb': ...}},
+                    'rss_kb': ... ou None}
+    """
+    processor = ImageProcessor(PRINTER_CONFIG['paper_width_px'], PRINTER_CONFIG['pixels_per_mm'])
+    printer_handler = PrinterHandler()
+    _, encoded = make_image(case, mode)
+    
+    results = {stage: {'ms': None} for stage in STAGES}
+    
+    for _ in range(repeat):
+        stages, _ = run_stages(processor, printer_handler, encoded)
+        for stage, run in stages:
+            start = time.perf_counter()
+            run()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = results[stage]['ms']
+            results[stage]['ms'] = elapsed if best is None else min(best, elapsed)
+    
+    stages, state = run_stages(processor, printer_handler, encoded)
+    tracemalloc.start()
+    try:
+        for stage, run in stages:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            results[stage]['peak_kb'] = (peak - before) / 1024
+            results[stage]['output_kb'] = _output_kb(state['output'])
+    finally:
+        tracemalloc.stop()
+    
+    return {'stages': results, 'rss_kb': measure_rss(encoded)}
+
+
+def measure_rss(encoded):
+    """
+    Mede o pico de memória residente do pipeline em um subprocesso novo
+    
+    O subprocesso só importa os módulos, lê o arquivo e roda as etapas uma
+    vez, então o pico dele inclui os buffers do Pillow e não é contaminado
+    por medições anteriores. É descontado o pico antes do pipeline
+    (interpretador e imports).
+    
+    Args:
+        encoded: Bytes do arquivo de entrada
+    
+    Returns:
+        Pico em KB acima do início do pipeline, ou None se a plataforma
+        não tem o módulo resource (Windows)
+    """
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        return None
+    
+    fd, path = tempfile.mkstemp(suffix='.bin')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(encoded)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--rss-child', path],
+            capture_output=True, text=True, check=True,
+        )
+    finally:
+        os.remove(path)
+    return json.loads(completed.stdout.strip().splitlines()[-1])['rss_kb']
+
+
+def _peak_rss_kb():
+    """Pico de memória residente do processo atual em KB"""
+    # No Linux o ru_maxrss sobrevive ao exec e herdaria o pico do processo
+    # pai; o VmHWM é zerado com o novo espaço de endereçamento
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    
+    import resource
+    
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _rss_child(path):
+    """Executado no subprocesso de measure_rss: roda o pipeline e mostra o pico"""
+    processor = ImageProcessor(PRINTER_CONFIG['paper_width_px'], PRINTER_CONFIG['pixels_per_mm'])
+    printer_handler = PrinterHandler()
+    with open(path, 'rb') as f:
+        encoded = f.read()
+    
+    # O numpy é importado sob demanda pelas etapas; fica fora da medição
+    import numpy  # noqa: F401
+    
+    before = _peak_rss_kb()
+    stages, _ = run_stages(processor, printer_handler, encoded)
+    for _, run in stages:
+        run()
+    after = _peak_rss_kb()
+    
+    print(json.dumps({'rss_kb': after - before}))
+
+
+def _output_kb(output):
+    """Tamanho aproximado da saída de uma etapa em KB (buffer da PIL Image ou bytes)"""
+    if isinstance(output, bytes):
+        return len(output) / 1024
+    image = output
+    bits = {'1': 1, 'L': 8, 'P': 8, 'RGB': 32, 'RGBA': 32}.get(image.mode, 32)
+    return image.width * image.height * bits / 8 / 1024
+
+
+def run_benchmark(cases=None, modes=None, repeat=3):
+    """
+    Mede todas as combinações pedidas
+    
+    Args:
+        cases: Nomes em CASES (padrão: todos)
+        modes: Modos PIL (padrão: todos)
+        repeat: Número de execuções cronometradas por combinação
+    
+    Returns:
+        Dicionário {'caso/modo': {etapa: medidas}}
+    """
+    results = {}
+    for case in cases or CASES:
+        for mode in modes or MODES:
+            key = f"{case}/{mode}"
+            results[key] = measure(case, mode, repeat)
+            total = sum(stage['ms'] for stage in results[key]['stages'].values())
+            print(f"  {key:<14} {total:9.1f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compara os resultados com a linha de base
+    
+    Args:
+        results: Resultado de run_benchmark
+        baseline: Resultados gravados anteriormente
+        tolerance: Piora relativa aceita (0.25 = 25%)
+    
+    Returns:
+        Lista de mensagens, uma por etapa (tempo) ou entrada (memória
+        residente) que piorou além da tolerância
+    """
+    regressions = []
+    for key, measured in results.items():
+        base_case = baseline.get(key, {})
+        for stage, values in measured['stages'].items():
+            base = base_case.get('stages', {}).get(stage)
+            if base is None:
+                continue
+            
+            if (values['ms'] > base['ms'] * (1 + tolerance)
+                    and values['ms'] - base['ms'] > MIN_REGRESSION_MS):
+                regressions.append(
+                    f"{key} {stage}: {base['ms']:.1f} ms -> {values['ms']:.1f} ms"
+                )
+        
+        # O pico do tracemalloc não enxerga o Pillow; só o residente entra no gate
+        rss, base_rss = measured['rss_kb'], base_case.get('rss_kb')
+        if rss is None or base_rss is None:
+            continue
+        if rss > base_rss * (1 + tolerance) and rss - base_rss > MIN_REGRESSION_KB:
+            regressions.append(f"{key}: pico residente {base_rss:.0f} KB -> {rss:.0f} KB")
+    return regressions
+
+
+def print_table(results):
+    """Mostra os tempos (ms) e picos do tracemalloc (KB) por etapa e o pico residente por entrada"""
+    header = f"{'entrada':<14}" + "".join(f"{stage:>18}" for stage in STAGES) + f"{'residente':>12}"
+    print(header)
+    print("-" * len(header))
+    for key, measured in results.items():
+        stages = measured['stages']
+        cells = "".join(
+            f"{stages[stage]['ms']:>9.1f}ms{stages[stage]['peak_kb']:>7.0f}KB" for stage in STAGES
+        )
+        rss = measured['rss_kb']
+        rss_cell = f"{rss:>10.0f}KB" if rss is not None else f"{'-':>12}"
+        print(f"{key:<14}{cells}{rss_cell}")
+
+
+def main(argv=None):
+    """Ponto de entrada do benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de impressão térmica")
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help=f"Entradas separadas por vírgula ({', '.join(CASES)})")
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f"Modos separados por vírgula ({', '.join(MODES)})")
+    parser.add_argument('--repeat', type=int, default=3, help="Execuções por medição (vale a menor)")
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, metavar='ARQUIVO',
+                        help=f"Grava os resultados como linha de base (padrão: {DEFAULT_BASELINE})")
+    parser.add_argument('--check', nargs='?', const=DEFAULT_BASELINE, metavar='ARQUIVO',
+                        help="Compara com a linha de base e sai com código 1 se alguma etapa piorou")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Piora relativa aceita por etapa (padrão: 0.25 = 25%%)")
+    parser.add_argument('--rss-child', metavar='ARQUIVO', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    
+    if args.rss_child:
+        _rss_child(args.rss_child)
+        return 0
+    
+    cases = [case for case in args.cases.split(',') if case]
+    modes = [mode for mode in args.modes.split(',') if mode]
+    unknown = [name for name in cases if name not in CASES] + [name for name in modes if name not in MODES]
+    if unknown:
+        parser.error(f"desconhecido(s): {', '.join(unknown)}")
+    
+    results = run_benchmark(cases, modes, args.repeat)
+    print_table(results)
+    
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'environment': {
+                    'python': platform.python_version(),
+                    'pillow': PIL.__version__,
+                    'platform': platform.platform(),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nLinha de base gravada em {args.save}")
+    
+    if args.check:
+        try:
+            with open(args.check, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"\nErro ao ler a linha de base {args.check}: {e}")
+            return 2
+        
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} etapa(s) pioraram mais de {args.tolerance:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNenhuma etapa piorou mais de {args.tolerance:.0%} em relação a {args.check}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
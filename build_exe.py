@@ -1,26 +1,46 @@
 """
 Script para criar executável do TopStart Thermal
+
+Uso:
+    python build_exe.py            # Pasta com o executável (abre mais rápido)
+    python build_exe.py --onefile  # Arquivo único (extrai para uma pasta temporária a cada execução)
 """
 
+import argparse
 import PyInstaller.__main__
 import os
 
 # Diretório atual
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
+APP_NAME = 'ZeroTop Thermal 58mm'
+
+parser = argparse.ArgumentParser(description="Cria o executável do ZeroTop Thermal 58mm")
+parser.add_argument('--onefile', action='store_true',
+                    help="Gera um único .exe (mais lento para abrir: extrai tudo a cada execução)")
+args = parser.parse_args()
+
+# --onedir evita a extração para uma pasta temporária a cada abertura
+bundle_mode = '--onefile' if args.onefile else '--onedir'
+
 # Configuração do PyInstaller
 PyInstaller.__main__.run([
     'main.py',
-    '--onefile',
+    bundle_mode,
     '--windowed',
-    '--name=ZeroTop Thermal 58mm',
+    f'--name={APP_NAME}',
     '--clean',
     '--noconfirm',
     '--add-data=printer.ico;.',
     '--icon=printer.ico',
 ])
 
+if args.onefile:
+    exe_path = os.path.join('dist', f'{APP_NAME}.exe')
+else:
+    exe_path = os.path.join('dist', APP_NAME, f'{APP_NAME}.exe')
+
 print("\n" + "="*50)
 print("Executável criado com sucesso!")
-print("Localização: dist/TopStart Thermal.exe")
+print(f"Localização: {exe_path}")
 print("="*50)
@@ -9,14 +9,71 @@ PRINTER_CONFIG = {
     'pixels_per_mm': 8,
     'paper_width_px': 384,  # Reduzido de 464 para compensar margens da impressora
     'max_paper_height_mm': 2000,  # Altura máxima do rolo
+    'raster_band_height': 256,  # Linhas por bloco GS v 0
+    'copy_separator': 'cut',  # Entre cópias: 'cut', 'feed' ou 'none'
+    'blank_feed_min_rows': 8,  # Faixas brancas a partir disso viram avanço de papel (0 = desligado)
+    'collapse_blank_mm': None,  # Encurta espaços em branco internos maiores que isso (None = não encurta)
+    'profile': 'generic',  # Perfil da impressora (ver PRINTER_PROFILES)
+    'encoder_benchmark_file': 'encoder_benchmark.json',  # Resultado de python printer_handler.py --benchmark-encoders
+}
+
+# Perfis de impressora: como as imagens são codificadas
+# image_encoder: 'raster' (GS v 0), 'column' (ESC * 33, 24 pontos por coluna)
+# ou 'auto' (o mais rápido no benchmark gravado para a impressora; raster se não houver)
+PRINTER_PROFILES = {
+    'generic': {'image_encoder': 'raster'},
+    'legacy': {'image_encoder': 'column'},  # Modelos antigos que imprimem GS v 0 devagar ou cortado
+    'auto': {'image_encoder': 'auto'},
+}
+
+# Impressoras de rede (socket RAW)
+NETWORK_CONFIG = {
+    'host': None,  # Ex.: '192.168.0.50' para usar uma impressora Ethernet por padrão
+    'port': 9100,
+    'connect_timeout': 3.0,  # Segundos
+    'write_timeout': 30.0,  # Segundos por escrita (a impressora pode segurar o fluxo)
+    'idle_timeout': 60.0,  # Conexões ociosas há mais tempo são reabertas
+    'max_idle_connections': 2,  # Conexões guardadas por impressora
+    'send_buffer_kb': 16,  # Buffer de envio do socket: limita o que fica na fila do sistema
+                           # (envio acompanha a impressora; cancelamento e velocidade medida mais precisos)
+}
+
+# Várias impressoras iguais (printer_fleet.py)
+FLEET_CONFIG = {
+    'printers': [],  # Ex.: [{'name': 'caixa', 'host': '192.168.0.50'}, {'name': 'cozinha', 'host': '192.168.0.51'}]
+    'affinity': {},  # Grupo -> impressora(s) preferida(s). Ex.: {'cozinha': 'cozinha'}
+    'initial_bytes_per_s': 30000,  # Velocidade estimada antes da primeira medição (~90 mm/s)
+    'throughput_alpha': 0.3,  # Peso dos envios recentes na velocidade medida
+    'prefetch': 1,  # Trabalhos na fila de cada impressora além do que está sendo enviado
+    'max_attempts': 3,  # Envios de um trabalho (em impressoras diferentes) antes de desistir
+    'health_interval_s': 5.0,  # Intervalo entre testes das impressoras com falha
 }
 
 # Configurações de processamento de imagem
 IMAGE_CONFIG = {
     'white_threshold': 250,  # Pixels acima desse valor são considerados brancos
     'dark_pixel_ratio': 0.01,  # 1% de pixels escuros para detectar conteúdo
-    'dither_method': 'floyd-steinberg',  # Método de dithering
-    'default_mode': 'threshold',  # 'threshold' ou 'dither'
+    'dither_method': 'floyd-steinberg',  # Algoritmo do modo 'dither' (ver dithering.METHODS)
+    'mono_threshold': 128,  # Limiar preto/branco da conversão monocromática
+    'gamma': 1.0,  # Correção de gamma antes da conversão (<1 clareia, >1 escurece)
+    'default_mode': 'threshold',  # 'threshold', 'dither' ou um algoritmo de dithering.METHODS
+    'max_image_pixels': 80_000_000,  # Pixels decodificados de uma vez (proteção contra decompression bombs)
+    'strip_min_pixels': 16_000_000,  # Imagens maiores são processadas em faixas horizontais
+    'strip_memory_mb': 32,  # Memória máxima de cada faixa da imagem original
+}
+
+# Documentos de várias páginas (TIFF e PDF)
+DOCUMENT_CONFIG = {
+    'join_pages': False,  # True: páginas em uma faixa contínua, sem corte entre elas
+    'page_gap_mm': 4,  # Espaço entre páginas unidas (margens brancas removidas)
+}
+
+# Pasta monitorada (python main.py --watch)
+HOT_FOLDER_CONFIG = {
+    'workers': 4,  # Arquivos processados em paralelo (threads de um único processo)
+    'settle_s': 1.0,  # Tempo sem mudar de tamanho antes de imprimir (arquivo ainda sendo gravado)
+    'poll_interval_s': 0.5,  # Intervalo das verificações (e da varredura sem watchdog)
+    'state_db': 'hot_folder.db',  # Hashes dos arquivos já impressos (sobrevive a reinícios)
 }
 
 # Configurações da interface
@@ -25,6 +82,29 @@ UI_CONFIG = {
     'window_height': 700,
     'preview_max_height': 400,
     'canvas_width': 464,
+    'startup_budget_ms': 1500,  # Orçamento de abertura (python main.py --startup-check)
+    'preview_tile_px': 256,  # Altura das faixas do preview, em pixels de tela
+    'preview_zoom_min': 0.1,
+    'preview_zoom_max': 4.0,
+    'preview_zoom_step': 1.25,  # Fator por clique da roda com Ctrl
+    'preview_refine_ms': 150,  # Ociosidade antes de refazer as faixas em alta qualidade
+}
+
+# Histórico de imagens
+HISTORY_CONFIG = {
+    'db_file': 'history.db',  # Banco SQLite do histórico
+    'legacy_file': 'history.json',  # Histórico antigo, importado uma vez
+    'max_entries': 1000,  # Entradas usadas há mais tempo são apagadas
+    'visible': 5,  # Miniaturas mostradas na interface
+}
+
+# Configurações de cache
+CACHE_CONFIG = {
+    'stage_cache_mb': 256,  # Memória máxima para etapas do pipeline no preview
+    'thumbnail_dir': '.thumbnails',  # Miniaturas do histórico
+    'payload_dir': '.print_cache',  # Comandos ESC/POS prontos para reimpressão
+    'payload_cache_mb': 64,  # Espaço máximo em disco dos comandos guardados
+    'preview_tile_mb': 32,  # Memória máxima das faixas já renderizadas do preview
 }
 
 # Comandos ESC/POS
@@ -34,4 +114,7 @@ ESCPOS_COMMANDS = {
     'align_left': b'\x1B\x61\x00',  # ESC a 0
     'feed_2': b'\x1B\x64\x02',  # ESC d 2
     'cut': b'\x1D\x56\x00',  # GS V 0
+    'raster_image': b'\x1D\x76\x30\x00',  # GS v 0 m (modo normal)
+    'feed_dots': b'\x1B\x4A',  # ESC J n (avança n pontos, n <= 255)
+    'column_image': b'\x1B\x2A\x21',  # ESC * 33 (24 pontos por coluna, densidade dupla)
 }
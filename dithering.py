@@ -0,0 +1,278 @@
+"""
+Motor de dithering para TopStart Thermal
+Algoritmos de conversão para preto e branco, com threshold e gamma configuráveis
+"""
+
+import time
+from PIL import Image
+
+# numpy é importado dentro das funções: só é carregado quando uma imagem é convertida
+
+# Algoritmos disponíveis (nome usado na config e na linha de comando)
+METHODS = ('threshold', 'floyd-steinberg', 'bayer2', 'bayer4', 'bayer8', 'atkinson', 'row-diffusion')
+
+_lut_cache = {}
+_bayer_cache = {}
+
+
+def _threshold_lut(threshold):
+    """Tabela de 256 posições: 0 abaixo do threshold, 255 a partir dele"""
+    lut = _lut_cache.get(('threshold', threshold))
+    if lut is None:
+        lut = [0 if x < threshold else 255 for x in range(256)]
+        _lut_cache[('threshold', threshold)] = lut
+    return lut
+
+
+def _gamma_lut(gamma):
+    """Tabela de 256 posições com a correção de gamma"""
+    lut = _lut_cache.get(('gamma', gamma))
+    if lut is None:
+        lut = [round(255 * (x / 255) ** gamma) for x in range(256)]
+        _lut_cache[('gamma', gamma)] = lut
+    return lut
+
+
+def bayer_matrix(size):
+    """
+    Matriz de Bayer normalizada (valores entre 0 e 1)
+    
+    Args:
+        size: Lado da matriz (potência de 2: 2, 4, 8...)
+    
+    Returns:
+        Array numpy float32 (size x size)
+    """
+    import numpy as np
+    
+    matrix = _bayer_cache.get(size)
+    if matrix is None:
+        base = np.array([[0, 2], [3, 1]])
+        while base.shape[0] < size:
+            base = np.block([
+                [4 * base, 4 * base + 2],
+                [4 * base + 3, 4 * base + 1],
+            ])
+        matrix = ((base + 0.5) / base.size).astype(np.float32)
+        _bayer_cache[size] = matrix
+    return matrix
+
+
+def threshold(gray, level=128):
+    """
+    Threshold simples via tabela (sem chamar Python por pixel)
+    
+    Args:
+        gray: PIL Image em modo 'L'
+        level: Pixels a partir deste valor ficam brancos
+    
+    Returns:
+        PIL Image em modo '1'
+    """
+    return gray.point(_threshold_lut(level), '1')
+
+
+def floyd_steinberg(gray, level=128):
+    """
+    Floyd–Steinberg do próprio Pillow (em C)
+    
+    O Pillow usa o limiar fixo de 128; o nível é aplicado deslocando os
+    tons antes da conversão.
+    """
+    if level != 128:
+        shift = 128 - level
+        gray = gray.point([min(255, max(0, x + shift)) for x in range(256)])
+    return gray.convert('1')
+
+
+def ordered(gray, size=4, level=128):
+    """
+    Dithering ordenado com matriz de Bayer repetida pela imagem (vetorizado)
+    
+    Args:
+        gray: PIL Image em modo 'L'
+        size: Lado da matriz de Bayer (2, 4 ou 8)
+        level: Tom médio do limiar
+    
+    Returns:
+        PIL Image em modo '1'
+    """
+    import numpy as np
+    
+    pixels = np.asarray(gray)
+    height, width = pixels.shape
+    
+    # Limiares em torno de level, repetidos em blocos até cobrir a imagem
+    thresholds = level + (bayer_matrix(size) - 0.5) * 255
+    tiles_y = -(-height // size)
+    tiles_x = -(-width // size)
+    tiled = np.tile(thresholds, (tiles_y, tiles_x))[:height, :width]
+    
+    return Image.fromarray(pixels >= tiled)
+
+
+def atkinson(gray, level=128):
+    """
+    Atkinson (difusão de 6/8 do erro, como no MacPaint) vetorizado por frentes diagonais
+    
+    Cada pixel depende apenas de vizinhos com x + 2y menor, então todos os
+    pixels de uma diagonal x + 2y = t são quantizados juntos: o laço tem
+    largura + 2 x altura passos em vez de um passo por pixel.
+    
+    Args:
+        gray: PIL Image em modo 'L'
+        level: Limiar de quantização
+    
+    Returns:
+        PIL Image em modo '1'
+    """
+    import numpy as np
+    
+    height, width = gray.height, gray.width
+    stride = width + 3  # 1 coluna de margem à esquerda, 2 à direita
+    
+    buffer = np.zeros((height + 2, stride), dtype=np.float32)
+    buffer[:height, 1:width + 1] = np.asarray(gray)
+    flat = buffer.reshape(-1)
+    
+    # Vizinhos que recebem 1/8 do erro: (x+1,y) (x+2,y) (x-1,y+1) (x,y+1) (x+1,y+1) (x,y+2)
+    neighbors = (1, 2, stride - 1, stride, stride + 1, 2 * stride)
+    
+    # Índice linear de (x, y) na diagonal t: y * stride + (t - 2y) + 1
+    row_step = np.arange(height) * (stride - 2)
+    
+    for t in range(width + 2 * (height - 1)):
+        y_start = max(0, (t - width + 2) // 2)
+        y_end = min(height - 1, t // 2)
+        index = row_step[y_start:y_end + 1] + (t + 1)
+        
+        values = flat[index]
+        quantized = np.where(values >= level, 255.0, 0.0)
+        error = (values - quantized) * 0.125
+        flat[index] = quantized
+        
+        for offset in neighbors:
+            flat[index + offset] += error
+    
+    return Image.fromarray(buffer[:height, 1:width + 1] >= 128)
+
+
+def row_diffusion(gray, level=128):
+    """
+    Difusão de erro rápida, processando uma linha inteira por vez
+    
+    O erro de cada pixel vai para a linha de baixo (1/4, 1/2, 1/4), o que
+    permite quantizar a linha toda de uma vez com numpy. Para não formar
+    faixas horizontais, o limiar de cada linha é modulado por uma linha da
+    matriz de Bayer 8x8.
+    
+    Args:
+        gray: PIL Image em modo 'L'
+        level: Tom médio do limiar
+    
+    Returns:
+        PIL Image em modo '1'
+    """
+    import numpy as np
+    
+    pixels = np.asarray(gray, dtype=np.float32)
+    height, width = pixels.shape
+    
+    bayer = bayer_matrix(8)
+    row_thresholds = level + (np.tile(bayer, (1, -(-width // 8)))[:, :width] - 0.5) * 127
+    
+    weights = np.array([0.25, 0.5, 0.25], dtype=np.float32)
+    output = np.empty((height, width), dtype=bool)
+    carry = np.zeros(width + 2, dtype=np.float32)
+    
+    for y in range(height):
+        values = pixels[y] + carry[1:-1]
+        white = values >= row_thresholds[y % 8]
+        output[y] = white
+        error = values - white * np.float32(255)
+        
+        # carry[x + 1] recebe 1/4 do erro de x - 1, 1/2 de x e 1/4 de x + 1
+        carry = np.convolve(error, weights)
+    
+    return Image.fromarray(output)
+
+
+def dither(gray, method='floyd-steinberg', level=128, gamma=1.0):
+    """
+    Converte uma imagem em escala de cinza para preto e branco
+    
+    Args:
+        gray: PIL Image em modo 'L'
+        method: Um dos nomes em METHODS
+        level: Limiar (threshold) de 0 a 255
+        gamma: Correção de gamma aplicada antes (<1 clareia os meios-tons, >1 escurece)
+    
+    Returns:
+        PIL Image em modo '1'
+    
+    Raises:
+        ValueError: Se o método não existir
+    """
+    if gray.mode != 'L':
+        gray = gray.convert('L')
+    
+    if gamma != 1.0:
+        gray = gray.point(_gamma_lut(gamma))
+    
+    if method == 'threshold':
+        return threshold(gray, level)
+    if method == 'floyd-steinberg':
+        return floyd_steinberg(gray, level)
+    if method in ('bayer2', 'bayer4', 'bayer8'):
+        return ordered(gray, int(method[5:]), level)
+    if method == 'atkinson':
+        return atkinson(gray, level)
+    if method == 'row-diffusion':
+        return row_diffusion(gray, level)
+    
+    raise ValueError(f"Método de dithering desconhecido: {method}")
+
+
+def benchmark(heights=(500, 2000, 16000), width=384, repeat=3):
+    """
+    Mede o tempo de cada algoritmo em imagens 384xN (gradiente com ruído)
+    
+    Args:
+        heights: Alturas testadas
+        width: Largura das imagens
+        repeat: Repetições (vale o menor tempo)
+    
+    Returns:
+        Dicionário {(método, altura): segundos}
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng(0)
+    timings = {}
+    for height in heights:
+        gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :].repeat(height, axis=0)
+        noise = rng.normal(0, 20, (height, width))
+        gray = Image.fromarray(np.clip(gradient + noise, 0, 255).astype(np.uint8))
+        
+        for method in METHODS:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                dither(gray, method)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[(method, height)] = best
+    
+    return timings
+
+
+if __name__ == "__main__":
+    import sys
+    
+    # Uso: python dithering.py [altura ...] — tempos por algoritmo em 384xN
+    heights = tuple(int(arg) for arg in sys.argv[1:]) or (500, 2000, 16000)
+    timings = benchmark(heights)
+    
+    print(f"{'método':<16}" + "".join(f"{f'384x{h}':>12}" for h in heights))
+    for method in METHODS:
+        print(f"{method:<16}" + "".join(f"{timings[(method, h)] * 1000:>10.1f}ms" for h in heights))
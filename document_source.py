@@ -0,0 +1,266 @@
+"""
+Documentos de várias páginas para TopStart Thermal
+TIFF e PDF lidos página por página, sob demanda, com memória constante
+"""
+
+import os
+from PIL import Image
+from config import DOCUMENT_CONFIG, IMAGE_CONFIG
+from instrumentation import logger, span
+
+DOCUMENT_EXTENSIONS = ('.pdf', '.tif', '.tiff')
+
+
+def is_document(path):
+    """Indica se o arquivo deve ser lido página por página (TIFF ou PDF)"""
+    return str(path).lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def _is_pdf(path):
+    return str(path).lower().endswith('.pdf')
+
+
+def _open_pdf(path):
+    """Abre um PDF com pypdfium2 (ou explica como instalar)"""
+    # pypdfium2 é opcional e só é importado ao abrir o primeiro PDF:
+    # sem ele, apenas TIFF de várias páginas é aceito
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ValueError("Para abrir PDF instale o pypdfium2: pip install pypdfium2") from None
+    return pdfium.PdfDocument(path)
+
+
+def page_count(path):
+    """
+    Número de páginas de um documento (1 para imagens comuns)
+    
+    Args:
+        path: Caminho do arquivo
+    
+    Returns:
+        Quantidade de páginas
+    """
+    if _is_pdf(path):
+        pdf = _open_pdf(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    
+    with Image.open(path) as image:
+        return getattr(image, 'n_frames', 1)
+
+
+def open_first_page(path, processor):
+    """
+    Abre a primeira página de um documento (para o preview)
+    
+    Em imagens comuns e TIFF equivale a processor.open_image; PDFs são
+    renderizados na largura do papel.
+    
+    Args:
+        path: Caminho do arquivo
+        processor: ImageProcessor
+    
+    Returns:
+        PIL Image da primeira página
+    
+    Raises:
+        ValueError: Se o documento não tiver páginas ou não puder ser aberto
+    """
+    if not _is_pdf(path):
+        return processor.open_image(path, grayscale=True)
+    
+    pages = _iter_pdf_pages(path, processor, 0, 1)
+    try:
+        page = next(pages, None)
+    finally:
+        pages.close()
+    
+    if page is None:
+        raise ValueError("Documento sem páginas")
+    return page
+
+
+def iter_pages(path, processor, first=0, last=None):
+    """
+    Abre as páginas de um documento uma de cada vez
+    
+    Em TIFF cada página é um quadro do mesmo arquivo, decodificado só
+    quando os pixels são usados; em PDF a página é renderizada direto na
+    largura do papel. A imagem entregue só vale até a próxima página ser
+    pedida: processe-a antes de continuar a iteração.
+    
+    Args:
+        path: Caminho do TIFF, PDF ou imagem comum
+        processor: ImageProcessor (limites e largura alvo)
+        first: Índice da primeira página
+        last: Índice após a última página (padrão: até o fim)
+    
+    Yields:
+        PIL Image da página
+    
+    Raises:
+        ValueError: Se uma página passar dos limites do processador ou
+            se o PDF não puder ser aberto
+    """
+    if _is_pdf(path):
+        yield from _iter_pdf_pages(path, processor, first, last)
+        return
+    
+    with processor.open_image(path, grayscale=True) as image:
+        frames = getattr(image, 'n_frames', 1)
+        for index in range(first, frames if last is None else min(last, frames)):
+            if index != image.tell():
+                image.seek(index)
+                processor.check_limits(image)
+            yield image
+
+
+def _iter_pdf_pages(path, processor, first, last):
+    """Renderiza as páginas de um PDF em escala de cinza, na largura do papel"""
+    pdf = _open_pdf(path)
+    try:
+        for index in range(first, len(pdf) if last is None else min(last, len(pdf))):
+            page = pdf[index]
+            try:
+                # Pixels por ponto: a página já sai com a largura alvo
+                scale = processor.target_width_px / page.get_width()
+                printed_mm = page.get_height() * scale / processor.pixels_per_mm
+                if printed_mm > processor.max_height_mm:
+                    raise ValueError(
+                        f"Página {index + 1} muito alta: a impressão teria {printed_mm:.1f}mm. "
+                        f"Limite: {processor.max_height_mm}mm"
+                    )
+                
+                with span('decode'):
+                    bitmap = page.render(scale=scale, grayscale=True)
+                    # Cópia: os pixels do bitmap pertencem ao pdfium e são liberados com ele
+                    image = bitmap.to_pil().copy()
+                    bitmap.close()
+            finally:
+                page.close()
+            
+            yield image
+    finally:
+        pdf.close()
+
+
+def render_pdf_thumbnail(path, size):
+    """
+    Miniatura da primeira página de um PDF
+    
+    Args:
+        path: Caminho do PDF
+        size: Tamanho máximo (largura, altura) em pixels
+    
+    Returns:
+        PIL Image
+    """
+    pdf = _open_pdf(path)
+    try:
+        page = pdf[0]
+        try:
+            scale = min(size[0] / page.get_width(), size[1] / page.get_height())
+            bitmap = page.render(scale=scale)
+            thumbnail = bitmap.to_pil().copy()
+            bitmap.close()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+    
+    return thumbnail
+
+
+def iter_processed_pages(path, processor, auto_top_fix=True, offset_mm=0, method=None):
+    """
+    Processa um documento página por página
+    
+    Args:
+        path: Caminho do documento
+        processor: ImageProcessor
+        auto_top_fix: Remover margem branca superior de cada página
+        offset_mm: Offset vertical em milímetros, aplicado a cada página
+        method: Conversão monocromática (padrão: IMAGE_CONFIG['default_mode'])
+    
+    Yields:
+        PIL Image em modo '1' de cada página
+    """
+    method = method or IMAGE_CONFIG['default_mode']
+    for page in iter_pages(path, processor):
+        processed = processor.process(page, auto_top_fix, offset_mm)
+        yield processor.convert_to_monochrome(processed, method)
+
+
+def iter_joined_bands(path, processor, method=None, gap_mm=None):
+    """
+    Une as páginas de um documento em uma única faixa contínua
+    
+    As margens brancas de cima e de baixo de cada página são removidas e
+    as páginas ficam separadas por gap_mm; páginas em branco são puladas.
+    As faixas são geradas uma página por vez, para impressão em streaming
+    (PrinterHandler.print_stream ou PrintSpooler.submit com stream=True).
+    
+    Args:
+        path: Caminho do documento
+        processor: ImageProcessor
+        method: Conversão monocromática (padrão: IMAGE_CONFIG['default_mode'])
+        gap_mm: Espaço entre páginas (padrão: configuração)
+    
+    Yields:
+        PIL Image em modo '1', na largura do papel
+    """
+    method = method or IMAGE_CONFIG['default_mode']
+    gap_mm = DOCUMENT_CONFIG['page_gap_mm'] if gap_mm is None else gap_mm
+    gap_rows = int(gap_mm * processor.pixels_per_mm)
+    
+    printed = 0
+    for index, page in enumerate(iter_pages(path, processor)):
+        content = processor.trim_blank_rows(processor.load_resized(page))
+        if content is None:
+            logger.debug("%s: página %d em branco", os.path.basename(path), index + 1)
+            continue
+        
+        if printed and gap_rows:
+            # Linhas brancas viram avanço de papel na codificação
+            yield Image.new('1', (content.width, gap_rows), 1)
+        
+        yield processor.convert_to_monochrome(content, method)
+        printed += 1
+
+
+def print_document(path, processor, printer_handler, join_pages=None, auto_top_fix=True,
+                   offset_mm=0, method=None):
+    """
+    Imprime um documento sem carregar mais de uma página por vez
+    
+    Cada página é processada e enviada antes da próxima ser decodificada.
+    Páginas separadas saem como impressões independentes (com corte);
+    unidas, saem em uma única impressão contínua.
+    
+    Args:
+        path: Caminho do documento
+        processor: ImageProcessor
+        printer_handler: PrinterHandler
+        join_pages: Unir as páginas em uma faixa contínua (padrão: configuração)
+        auto_top_fix: Remover margem branca superior (páginas separadas)
+        offset_mm: Offset vertical em milímetros (páginas separadas)
+        method: Conversão monocromática (padrão: IMAGE_CONFIG['default_mode'])
+    
+    Returns:
+        True se todas as páginas foram enviadas, False caso contrário
+    """
+    if join_pages is None:
+        join_pages = DOCUMENT_CONFIG['join_pages']
+    
+    if join_pages:
+        return printer_handler.print_stream(iter_joined_bands(path, processor, method))
+    
+    for number, page in enumerate(iter_processed_pages(path, processor, auto_top_fix, offset_mm, method), 1):
+        if not printer_handler.print_stream([page]):
+            logger.error("%s: falha ao enviar a página %d", os.path.basename(path), number)
+            return False
+    
+    return True
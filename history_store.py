@@ -0,0 +1,268 @@
+"""
+Histórico de imagens do TopStart Thermal
+Banco SQLite indexado por data de uso, com gravação em segundo plano
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from config import HISTORY_CONFIG
+from instrumentation import logger
+
+# Colunas de metadados que podem ser gravadas com record/update
+FIELDS = ('content_hash', 'width', 'height', 'processed_height', 'settings', 'thumbnail')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT,
+    width INTEGER,
+    height INTEGER,
+    processed_height INTEGER,
+    settings TEXT,
+    thumbnail TEXT,
+    last_used REAL NOT NULL,
+    use_count INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS history_last_used ON history (last_used DESC);
+CREATE INDEX IF NOT EXISTS history_content_hash ON history (content_hash);
+"""
+
+
+class HistoryStore:
+    def __init__(self, path=None, legacy_file=None, max_entries=None):
+        """
+        Histórico das imagens abertas
+        
+        Cada entrada guarda caminho, hash do conteúdo, dimensões, altura
+        processada, últimos ajustes usados e o caminho da miniatura. As
+        gravações vão para uma fila e são feitas por uma thread própria:
+        abrir uma imagem nunca espera o disco. As leituras usam o índice
+        por data de uso e trazem só as linhas pedidas.
+        
+        Args:
+            path: Arquivo do banco (padrão: configuração; ':memory:' para testes)
+            legacy_file: history.json antigo, importado uma vez (padrão: configuração)
+            max_entries: Entradas mantidas; as usadas há mais tempo são apagadas
+        """
+        self.path = path or HISTORY_CONFIG['db_file']
+        self.max_entries = max_entries or HISTORY_CONFIG['max_entries']
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        
+        with self._lock, self._conn:
+            if self.path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        
+        legacy_file = HISTORY_CONFIG['legacy_file'] if legacy_file is None else legacy_file
+        if legacy_file:
+            self._migrate_json(legacy_file)
+        
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+    
+    def _migrate_json(self, legacy_file):
+        """
+        Importa o history.json antigo (lista de caminhos, mais recente primeiro)
+        
+        O arquivo é renomeado para .migrated depois da importação, para não
+        ser lido de novo.
+        """
+        if not os.path.exists(legacy_file):
+            return
+        
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                paths = [path for path in json.load(f) if isinstance(path, str)]
+        except (OSError, ValueError) as e:
+            logger.warning("Histórico antigo ilegível (%s): %s", legacy_file, e)
+            return
+        
+        # Mantém a ordem: o primeiro da lista fica com o uso mais recente
+        now = time.time()
+        rows = [(path, now - index) for index, path in enumerate(paths)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO history (path, last_used) VALUES (?, ?)", rows
+            )
+        
+        try:
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+        except OSError as e:
+            logger.warning("Não foi possível renomear %s: %s", legacy_file, e)
+        logger.info("%d entrada(s) importada(s) de %s", len(rows), legacy_file)
+    
+    def recent(self, limit=None):
+        """
+        Entradas usadas mais recentemente
+        
+        Args:
+            limit: Quantidade máxima (padrão: HISTORY_CONFIG['visible'])
+        
+        Returns:
+            Lista de dicionários (settings já decodificado), do mais recente ao mais antigo
+        """
+        limit = limit or HISTORY_CONFIG['visible']
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM history ORDER BY last_used DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+    
+    def get(self, path):
+        """
+        Entrada de um arquivo
+        
+        Returns:
+            Dicionário ou None se o arquivo não estiver no histórico
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM history WHERE path = ?", (path,)).fetchone()
+        return self._entry(row) if row else None
+    
+    def find_by_hash(self, content_hash):
+        """
+        Entrada usada mais recentemente com um conteúdo (ex.: arquivo copiado ou renomeado)
+        
+        Returns:
+            Dicionário ou None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM history WHERE content_hash = ? ORDER BY last_used DESC LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        return self._entry(row) if row else None
+    
+    def count(self):
+        """Número de entradas"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    
+    @staticmethod
+    def _entry(row):
+        """Converte uma linha do banco em dicionário"""
+        entry = dict(row)
+        if entry.get('settings'):
+            try:
+                entry['settings'] = json.loads(entry['settings'])
+            except ValueError:
+                entry['settings'] = None
+        return entry
+    
+    def record(self, path, **fields):
+        """
+        Registra o uso de um arquivo (sem bloquear)
+        
+        Args:
+            path: Caminho do arquivo
+            **fields: Metadados (ver FIELDS); os não informados são mantidos
+        """
+        self._writes.put(('record', path, self._columns(fields), time.time()))
+    
+    def update(self, path, **fields):
+        """
+        Atualiza metadados de um arquivo já registrado, sem mudar a ordem (sem bloquear)
+        
+        Args:
+            path: Caminho do arquivo
+            **fields: Metadados (ver FIELDS)
+        """
+        columns = self._columns(fields)
+        if columns:
+            self._writes.put(('update', path, columns, None))
+    
+    def remove(self, path):
+        """Remove um arquivo do histórico (sem bloquear)"""
+        self._writes.put(('remove', path, {}, None))
+    
+    @staticmethod
+    def _columns(fields):
+        """Valida os metadados e serializa os ajustes em JSON"""
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Campo(s) de histórico desconhecido(s): {', '.join(sorted(unknown))}")
+        columns = dict(fields)
+        if columns.get('settings') is not None:
+            columns['settings'] = json.dumps(columns['settings'], sort_keys=True)
+        return columns
+    
+    def _write_loop(self):
+        """Thread de gravação: aplica as operações da fila em ordem, em lotes"""
+        while True:
+            batch = [self._writes.get()]
+            # Operações acumuladas vão na mesma transação
+            while batch[-1] is not None and len(batch) < 500:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = batch[-1] is None
+            operations = batch[:-1] if stop else batch
+            try:
+                if operations:
+                    self._apply(operations)
+            except sqlite3.Error as e:
+                logger.error("Erro ao gravar o histórico: %s", e)
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+            
+            if stop:
+                return
+    
+    def _apply(self, operations):
+        """Executa um lote de gravações em uma transação (thread de gravação)"""
+        with self._lock, self._conn:
+            recorded = False
+            for kind, path, columns, used_at in operations:
+                if kind == 'remove':
+                    self._conn.execute("DELETE FROM history WHERE path = ?", (path,))
+                elif kind == 'update':
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    self._conn.execute(
+                        f"UPDATE history SET {assignments} WHERE path = ?",
+                        (*columns.values(), path)
+                    )
+                else:
+                    self._upsert(path, columns, used_at)
+                    recorded = True
+            
+            # Limite de entradas: apagar as usadas há mais tempo
+            if recorded:
+                self._conn.execute(
+                    "DELETE FROM history WHERE path IN ("
+                    "SELECT path FROM history ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+    
+    def _upsert(self, path, columns, used_at):
+        """Insere ou atualiza o uso de um arquivo, mantendo os metadados não informados"""
+        names = "".join(f", {name}" for name in columns)
+        placeholders = ", ?" * len(columns)
+        updates = "".join(f", {name} = excluded.{name}" for name in columns)
+        self._conn.execute(
+            f"INSERT INTO history (path, last_used{names}) VALUES (?, ?{placeholders}) "
+            f"ON CONFLICT(path) DO UPDATE SET last_used = excluded.last_used, "
+            f"use_count = use_count + 1{updates}",
+            (path, used_at, *columns.values())
+        )
+    
+    def flush(self):
+        """Aguarda as gravações pendentes"""
+        self._writes.join()
+    
+    def close(self):
+        """Grava o que estiver pendente e fecha o banco"""
+        self._writes.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,433 @@
+"""
+Pasta monitorada (hot folder) do TopStart Thermal
+Imprime automaticamente as imagens gravadas em uma ou mais pastas, sem interface
+
+Uso:
+    python main.py --watch pasta_pdv/ [outra_pasta/] [--printer 192.168.0.50[:9100]]
+    python main.py --watch pasta_pdv/ --once    # Imprime o que já está na pasta e sai
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import DOCUMENT_CONFIG, HOT_FOLDER_CONFIG, IMAGE_CONFIG, PRINTER_CONFIG
+import document_source
+from image_cache import file_digest
+import instrumentation
+from instrumentation import JobTimings, logger
+from image_processor import ImageProcessor
+from printer_handler import PrinterHandler
+from print_spooler import PrintSpooler, JOB_DONE
+
+# watchdog é opcional (inotify no Linux, ReadDirectoryChangesW no Windows);
+# sem ele as pastas são varridas a cada poll_interval_s
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+WATCHED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp') + document_source.DOCUMENT_EXTENSIONS
+
+
+class PrintedStore:
+    def __init__(self, path):
+        """
+        Registro em SQLite dos conteúdos já impressos
+        
+        Args:
+            path: Arquivo do banco (':memory:' para testes)
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS printed ("
+                "hash TEXT PRIMARY KEY, path TEXT NOT NULL, printed_at REAL NOT NULL)"
+            )
+    
+    def contains(self, digest):
+        """Indica se um conteúdo já foi impresso"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM printed WHERE hash = ?", (digest,)).fetchone()
+        return row is not None
+    
+    def add(self, digest, path):
+        """Registra um conteúdo impresso"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO printed (hash, path, printed_at) VALUES (?, ?, ?)",
+                (digest, path, time.time())
+            )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _FolderEvents:
+    """Recebe os eventos do watchdog (interface dispatch de FileSystemEventHandler)"""
+    
+    # Aberturas e fechamentos sem escrita (inclusive a leitura do próprio serviço) não contam
+    EVENT_TYPES = ('created', 'modified', 'moved', 'closed', 'deleted')
+    
+    def __init__(self, hot_folder):
+        self.hot_folder = hot_folder
+    
+    def dispatch(self, event):
+        if event.is_directory or event.event_type not in self.EVENT_TYPES:
+            return
+        if event.event_type in ('moved', 'deleted'):
+            self.hot_folder.forget(os.fsdecode(event.src_path))
+        if event.event_type == 'deleted':
+            return
+        # Arquivos renomeados para a pasta (gravação atômica) chegam como 'moved'
+        path = getattr(event, 'dest_path', None) or event.src_path
+        self.hot_folder.touch(os.fsdecode(path))
+
+
+class HotFolder:
+    def __init__(self, folders, printer_handler=None, processor=None, workers=None,
+                 state_db=None, settle_s=None, poll_interval_s=None, use_watchdog=True):
+        """
+        Serviço que imprime os arquivos novos das pastas monitoradas
+        
+        Um arquivo é impresso quando fica settle_s sem mudar de tamanho nem
+        de data. O conteúdo é identificado pelo hash: o mesmo arquivo gravado
+        de novo (ou copiado com outro nome) não é impresso duas vezes, nem
+        depois de reiniciar o serviço. O registro é feito depois do envio,
+        então um arquivo interrompido por uma queda é impresso de novo.
+        
+        Os arquivos são processados por um pool de threads e impressos por
+        um único PrintSpooler, que mantém a impressora ocupada sem pausas
+        entre os trabalhos.
+        
+        Args:
+            folders: Pastas monitoradas (não recursivo)
+            printer_handler: PrinterHandler (padrão: impressora da configuração)
+            processor: ImageProcessor (padrão: largura do papel da configuração)
+            workers: Threads de processamento (padrão: configuração)
+            state_db: Banco com os hashes impressos (padrão: configuração)
+            settle_s: Tempo de estabilidade do arquivo em segundos (padrão: configuração)
+            poll_interval_s: Intervalo das verificações (padrão: configuração)
+            use_watchdog: Usar notificações do sistema quando o watchdog estiver instalado
+        """
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.printer_handler = printer_handler or PrinterHandler()
+        self.processor = processor or ImageProcessor(
+            PRINTER_CONFIG['paper_width_px'], PRINTER_CONFIG['pixels_per_mm']
+        )
+        self.spooler = PrintSpooler(self.printer_handler)
+        self.store = PrintedStore(state_db or HOT_FOLDER_CONFIG['state_db'])
+        self.settle_s = HOT_FOLDER_CONFIG['settle_s'] if settle_s is None else settle_s
+        self.poll_interval_s = poll_interval_s or HOT_FOLDER_CONFIG['poll_interval_s']
+        self.use_watchdog = use_watchdog and Observer is not None
+        
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers or HOT_FOLDER_CONFIG['workers'],
+            thread_name_prefix="hot-folder"
+        )
+        self._lock = threading.Lock()
+        self._candidates = {}  # caminho -> ((tamanho, mtime), desde quando está assim)
+        self._dispatched = {}  # caminho -> (tamanho, mtime) já enviado ao pool
+        self._in_flight = set()  # hashes em processamento ou impressão
+        self._busy = 0  # arquivos no pool
+        self._stop = threading.Event()
+        self._observer = None
+        self._thread = None
+        self.stats = {'printed': 0, 'duplicates': 0, 'failed': 0}
+    
+    def touch(self, path):
+        """Marca um arquivo para verificação (chamado pelos eventos e pela varredura)"""
+        name = os.path.basename(path)
+        if name.startswith(('.', '~')) or not name.lower().endswith(WATCHED_EXTENSIONS):
+            return
+        with self._lock:
+            self._candidates.setdefault(path, None)
+    
+    def forget(self, path):
+        """Esquece um arquivo que saiu da pasta (apagado ou renomeado)"""
+        with self._lock:
+            self._candidates.pop(path, None)
+            self._dispatched.pop(path, None)
+    
+    def scan(self):
+        """Varre as pastas procurando arquivos novos ou alterados"""
+        present = set()
+        scanned = []
+        for folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except OSError as e:
+                logger.warning("Pasta monitorada inacessível %s: %s", folder, e)
+                continue
+            scanned.append(folder)
+            
+            for entry in entries:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                present.add(entry.path)
+                if self._dispatched.get(entry.path) != (stat.st_size, stat.st_mtime_ns):
+                    self.touch(entry.path)
+        
+        # Arquivos que sumiram das pastas varridas deixam o registro (serviço de longa duração)
+        with self._lock:
+            gone = [
+                path for path in self._dispatched
+                if path not in present and os.path.dirname(path) in scanned
+            ]
+        for path in gone:
+            self.forget(path)
+    
+    def dispatch_stable(self):
+        """
+        Envia ao pool os arquivos que pararam de mudar
+        
+        Arquivos que continuam vazios depois de settle_s são ignorados até
+        mudarem de novo (ex.: arquivo criado e nunca gravado).
+        
+        Returns:
+            Quantos arquivos ainda aguardam estabilizar
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = list(self._candidates.items())
+        
+        for path, seen in candidates:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.forget(path)
+                continue
+            
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._dispatched.get(path) == signature:
+                # Evento sem mudança no arquivo (ex.: atributos)
+                with self._lock:
+                    self._candidates.pop(path, None)
+                continue
+            
+            if seen is None or seen[0] != signature:
+                with self._lock:
+                    self._candidates[path] = (signature, now)
+                continue
+            
+            if now - seen[1] < self.settle_s:
+                continue
+            
+            if signature[0] == 0:
+                # Vazio e estável: só volta a ser candidato quando for gravado
+                logger.debug("%s: arquivo vazio, ignorado", path)
+                with self._lock:
+                    self._candidates.pop(path, None)
+                    self._dispatched[path] = signature
+                continue
+            
+            with self._lock:
+                self._candidates.pop(path, None)
+                self._dispatched[path] = signature
+                self._busy += 1
+            self._pool.submit(self._handle, path)
+        
+        with self._lock:
+            return len(self._candidates)
+    
+    def _handle(self, path):
+        """Imprime um arquivo, a menos que o mesmo conteúdo já tenha sido impresso (pool)"""
+        digest = None
+        try:
+            digest = file_digest(path)
+            with self._lock:
+                duplicate = digest in self._in_flight or self.store.contains(digest)
+                if duplicate:
+                    self.stats['duplicates'] += 1
+                else:
+                    self._in_flight.add(digest)
+            if duplicate:
+                logger.debug("%s: conteúdo já impresso, ignorado", path)
+                digest = None  # O hash em andamento pertence a outra thread
+                return
+            
+            if self._print(path):
+                self.store.add(digest, path)
+                with self._lock:
+                    self.stats['printed'] += 1
+                logger.info("%s: impresso", path)
+            else:
+                with self._lock:
+                    self.stats['failed'] += 1
+                logger.error("%s: falha ao imprimir", path)
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+            logger.error("%s: %s", path, e)
+        finally:
+            with self._lock:
+                self._in_flight.discard(digest)
+                self._busy -= 1
+    
+    def _print(self, path):
+        """
+        Processa e envia um arquivo ao spooler, aguardando o fim da impressão
+        
+        Aguardar limita a memória a um trabalho por thread; com duas ou
+        mais threads o próximo arquivo já está na fila quando o atual
+        termina de ser enviado.
+        
+        Returns:
+            True se todas as páginas foram impressas
+        """
+        mode = IMAGE_CONFIG['default_mode']
+        name = os.path.basename(path)
+        
+        if document_source.is_document(path):
+            if DOCUMENT_CONFIG['join_pages']:
+                job_id = self.spooler.submit(
+                    document_source.iter_joined_bands(path, self.processor, mode),
+                    timings=JobTimings(name),
+                    stream=True
+                )
+                return self.spooler.wait(job_id) == JOB_DONE
+            
+            pages = document_source.iter_processed_pages(path, self.processor, method=mode)
+            for number, page in enumerate(pages, 1):
+                job_id = self.spooler.submit(page, timings=JobTimings(f"{name} p{number}"))
+                del page
+                if self.spooler.wait(job_id) != JOB_DONE:
+                    return False
+            return True
+        
+        timings = JobTimings(name)
+        with instrumentation.activate(timings), self.processor.open_image(path, grayscale=True) as image:
+            processed = self.processor.process(image)
+            mono = self.processor.convert_to_monochrome(processed, mode)
+        
+        job_id = self.spooler.submit(mono, timings=timings)
+        return self.spooler.wait(job_id) == JOB_DONE
+    
+    def _run(self):
+        """Thread do serviço: varredura (sem watchdog) e despacho dos arquivos estáveis"""
+        while not self._stop.is_set():
+            if not self.use_watchdog:
+                self.scan()
+            try:
+                self.dispatch_stable()
+            except Exception as e:
+                logger.error("Erro na pasta monitorada: %s", e)
+            self._stop.wait(self.poll_interval_s)
+    
+    def start(self):
+        """Começa a monitorar (arquivos que já estão nas pastas também são verificados)"""
+        if self.use_watchdog:
+            self._observer = Observer()
+            handler = _FolderEvents(self)
+            for folder in self.folders:
+                self._observer.schedule(handler, folder, recursive=False)
+            self._observer.start()
+        
+        self.scan()
+        self._thread = threading.Thread(target=self._run, name="hot-folder", daemon=True)
+        self._thread.start()
+        logger.info("Monitorando %s (%s)", ", ".join(self.folders),
+                    "watchdog" if self.use_watchdog else f"varredura a cada {self.poll_interval_s}s")
+    
+    def process_existing(self):
+        """Imprime os arquivos que já estão nas pastas e retorna quando terminar"""
+        self.scan()
+        while self.dispatch_stable():
+            time.sleep(self.poll_interval_s)
+        self.wait_idle()
+    
+    def wait_idle(self, timeout=None):
+        """
+        Aguarda os arquivos em processamento terminarem
+        
+        Returns:
+            True se o pool ficou vazio dentro do tempo
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self._busy == 0:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+    
+    def stop(self):
+        """Para de monitorar e espera os trabalhos em andamento"""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+        self.store.close()
+
+
+def main(argv=None):
+    """Ponto de entrada da pasta monitorada"""
+    parser = argparse.ArgumentParser(
+        prog="main.py --watch",
+        description="Imprime automaticamente as imagens gravadas nas pastas monitoradas"
+    )
+    parser.add_argument('folders', nargs='+', help="Pastas monitoradas")
+    parser.add_argument('--printer', metavar='HOST[:PORTA]',
+                        help="Impressora de rede (padrão: configuração ou impressora do Windows)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help=f"Threads de processamento (padrão: {HOT_FOLDER_CONFIG['workers']})")
+    parser.add_argument('--db', default=HOT_FOLDER_CONFIG['state_db'],
+                        help=f"Banco com os arquivos já impressos (padrão: {HOT_FOLDER_CONFIG['state_db']})")
+    parser.add_argument('--settle', type=float, default=None,
+                        help=f"Segundos sem mudanças antes de imprimir (padrão: {HOT_FOLDER_CONFIG['settle_s']})")
+    parser.add_argument('--polling', action='store_true', help="Varrer as pastas mesmo com o watchdog instalado")
+    parser.add_argument('--once', action='store_true', help="Imprime o que já está nas pastas e sai")
+    args = parser.parse_args(argv)
+    
+    instrumentation.configure_logging(os.environ.get('ZEROTOP_LOG', 'INFO'))
+    
+    missing = [folder for folder in args.folders if not os.path.isdir(folder)]
+    if missing:
+        parser.error(f"pasta(s) não encontrada(s): {', '.join(missing)}")
+    
+    printer_handler = PrinterHandler()
+    if args.printer:
+        host, _, port = args.printer.partition(':')
+        printer_handler.set_network_printer(host, int(port) if port else None)
+    
+    hot_folder = HotFolder(
+        args.folders,
+        printer_handler=printer_handler,
+        workers=args.workers,
+        state_db=args.db,
+        settle_s=args.settle,
+        use_watchdog=not args.polling and not args.once
+    )
+    
+    if args.once:
+        hot_folder.process_existing()
+    else:
+        hot_folder.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    
+    hot_folder.stop()
+    stats = hot_folder.stats
+    print(f"{stats['printed']} impresso(s), {stats['duplicates']} repetido(s), {stats['failed']} falha(s)")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Cache de imagens para TopStart Thermal
+Guarda resultados intermediários do processamento para evitar retrabalho
+
+Dois níveis, indexados pela origem e pelos parâmetros de cada etapa:
+    StageCache: imagens decodificadas/redimensionadas na memória (LRU),
+        com a identidade rápida do arquivo (file_identity)
+    PayloadStore: comandos ESC/POS finais em disco, para reimpressões,
+        com o hash do conteúdo (file_digest)
+"""
+
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from config import CACHE_CONFIG
+from instrumentation import logger
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    Hash SHA-256 do conteúdo de um arquivo
+    
+    Args:
+        path: Caminho do arquivo
+        chunk_size: Bytes lidos por vez
+    
+    Returns:
+        Hash em hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_identity(path):
+    """
+    Identidade rápida de um arquivo, sem ler o conteúdo
+    
+    Serve enquanto o processo roda (ex.: chaves do StageCache); o hash de
+    file_digest, mais lento, fica para o que é gravado em disco.
+    
+    Args:
+        path: Caminho do arquivo
+    
+    Returns:
+        Tupla (caminho absoluto, mtime em ns, tamanho)
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+class StageCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Inicializa o cache de etapas do pipeline (LRU com limite de memória)
+        
+        Args:
+            max_bytes: Memória máxima ocupada pelas imagens guardadas
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def image_size(image):
+        """
+        Estima a memória ocupada por uma imagem PIL
+        
+        Args:
+            image: PIL Image
+            
+        Returns:
+            Tamanho aproximado em bytes
+        """
+        return image.width * image.height * len(image.getbands())
+    
+    def get(self, key):
+        """
+        Busca uma imagem no cache
+        
+        Args:
+            key: Chave da etapa (tupla com origem e parâmetros)
+            
+        Returns:
+            PIL Image ou None se não estiver no cache
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key, image):
+        """
+        Guarda uma imagem no cache, descartando as menos usadas se necessário
+        
+        Args:
+            key: Chave da etapa
+            image: PIL Image
+        """
+        size = self.image_size(image)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            
+            self._entries[key] = (image, size)
+            self.current_bytes += size
+            
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+    
+    def get_or_compute(self, key, compute):
+        """
+        Retorna a imagem da etapa, calculando e guardando se necessário
+        
+        Args:
+            key: Chave da etapa
+            compute: Função sem argumentos que gera a imagem
+            
+        Returns:
+            PIL Image
+        """
+        image = self.get(key)
+        if image is None:
+            image = compute()
+            self.put(key, image)
+        return image
+    
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class PayloadStore:
+    # Cabeçalho dos arquivos; cada bloco vem depois com 4 bytes de tamanho
+    MAGIC = b'ZTP1'
+    
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """
+        Comandos ESC/POS já codificados, guardados em disco (LRU por data de uso)
+        
+        Os blocos são guardados separados, como saíram do codificador: o
+        cancelamento de um envio continua parando entre comandos completos.
+        
+        Args:
+            cache_dir: Pasta dos arquivos (padrão: payload_dir da config)
+            max_bytes: Espaço máximo em disco (padrão: payload_cache_mb da config)
+        """
+        self.cache_dir = cache_dir or CACHE_CONFIG['payload_dir']
+        self.max_bytes = max_bytes or CACHE_CONFIG['payload_cache_mb'] * 1024 * 1024
+        self._total_bytes = None  # Calculado na primeira gravação
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(*parts):
+        """
+        Chave de um payload a partir do hash da origem e de todos os parâmetros
+        
+        Args:
+            *parts: Valores que definem o resultado (hash, largura, modo, offset...)
+            
+        Returns:
+            Hash em hexadecimal
+        """
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+    
+    def path(self, key):
+        """Caminho do arquivo de um payload"""
+        return os.path.join(self.cache_dir, f"{key}.escpos")
+    
+    def get(self, key):
+        """
+        Lê um payload do disco
+        
+        Args:
+            key: Chave de make_key
+            
+        Returns:
+            Lista de bytes (blocos de comandos) ou None se não estiver no cache
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Uso recente: fica por último na ordem de descarte
+        except OSError:
+            return None
+        
+        chunks = self._decode(data)
+        if chunks is None:
+            logger.warning("Payload corrompido no cache, descartado: %s", path)
+            self._remove(path)
+        return chunks
+    
+    def put(self, key, chunks):
+        """
+        Grava um payload de forma atômica e descarta os mais antigos se passar do limite
+        
+        Args:
+            key: Chave de make_key
+            chunks: Iterável de bytes
+        """
+        data = self._encode(chunks)
+        if len(data) > self.max_bytes:
+            return
+        
+        path = self.path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Não foi possível gravar o payload no cache: %s", e)
+            return
+        
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += len(data)
+            
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _entries(self):
+        """Lista (caminho, tamanho, último uso) dos payloads gravados"""
+        entries = []
+        try:
+            scanned = list(os.scandir(self.cache_dir))
+        except OSError:
+            return entries
+        
+        for entry in scanned:
+            if not entry.name.endswith('.escpos'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+    
+    def _evict(self):
+        """Remove os payloads usados há mais tempo até caber no limite (com o lock)"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+        
+        self._total_bytes = total
+    
+    @staticmethod
+    def _remove(path):
+        """Apaga um arquivo do cache (True se conseguiu)"""
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+    
+    @classmethod
+    def _encode(cls, chunks):
+        """Serializa os blocos: cabeçalho e, para cada bloco, tamanho + dados"""
+        parts = [cls.MAGIC]
+        for chunk in chunks:
+            parts.append(struct.pack('>I', len(chunk)))
+            parts.append(chunk)
+        return b''.join(parts)
+    
+    @classmethod
+    def _decode(cls, data):
+        """Lê os blocos gravados por _encode (None se o arquivo estiver truncado)"""
+        if not data.startswith(cls.MAGIC):
+            return None
+        
+        chunks = []
+        position = len(cls.MAGIC)
+        while position < len(data):
+            if position + 4 > len(data):
+                return None
+            (size,) = struct.unpack_from('>I', data, position)
+            position += 4
+            if position + size > len(data):
+                return None
+            chunks.append(data[position:position + size])
+            position += size
+        return chunks
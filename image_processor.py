@@ -3,58 +3,387 @@ Processador de imagem para TopStart Thermal
 Responsável por ajustar, recortar e preparar imagens para impressão térmica
 """
 
+import math
 from PIL import Image, ImageOps
-import numpy as np
+from config import IMAGE_CONFIG, PRINTER_CONFIG
+import dithering
+from instrumentation import logger, span, timed
+
+# numpy é importado dentro dos métodos: só é carregado quando uma imagem é processada
+
+# Bytes por pixel dos formatos "raw" (arquivos não comprimidos lidos em faixas)
+_RAW_BYTES_PER_PIXEL = {
+    'L': 1, 'P': 1,
+    'RGB': 3, 'BGR': 3,
+    'RGBA': 4, 'BGRA': 4, 'RGBX': 4, 'BGRX': 4,
+}
 
 
 class ImageProcessor:
-    def __init__(self, target_width_px=464, pixels_per_mm=8):
+    def __init__(self, target_width_px=464, pixels_per_mm=8, max_image_pixels=None, max_height_mm=None):
         """
         Inicializa o processador de imagem
         
         Args:
             target_width_px: Largura alvo em pixels (464 para 58mm)
             pixels_per_mm: Pixels por milímetro (8 para 203 DPI)
+            max_image_pixels: Limite de pixels decodificados de uma vez (padrão: configuração)
+            max_height_mm: Altura impressa máxima (padrão: max_paper_height_mm da configuração)
         """
         self.target_width_px = target_width_px
         self.pixels_per_mm = pixels_per_mm
+        self.max_image_pixels = max_image_pixels or IMAGE_CONFIG['max_image_pixels']
+        self.max_height_mm = max_height_mm or PRINTER_CONFIG['max_paper_height_mm']
+        
+        # Imagens gigantes: processamento em faixas com memória limitada
+        self.strip_min_pixels = IMAGE_CONFIG['strip_min_pixels']
+        self.strip_bytes = IMAGE_CONFIG['strip_memory_mb'] * 1024 * 1024
+        
+        # Conversão monocromática
+        self.mono_threshold = IMAGE_CONFIG['mono_threshold']
+        self.gamma = IMAGE_CONFIG['gamma']
+        self.dither_method = IMAGE_CONFIG['dither_method']
+        
+        # Varredura grossa-para-fina em imagens muito altas (ex.: banners de 2000mm)
+        self.coarse_scan_min_height = 4000  # Altura a partir da qual usa a varredura reduzida
+        self.coarse_scan_factor = 16  # Linhas por bloco na cópia reduzida
+    
+    def open_image(self, path, grayscale=False):
+        """
+        Abre uma imagem preparando a decodificação em resolução reduzida
+        
+        A decodificação continua preguiçosa (acontece no primeiro acesso aos
+        pixels). Em JPEG o próprio decodificador reduz por 1/2, 1/4 ou 1/8,
+        parando no menor tamanho que ainda tenha a largura alvo.
+        
+        Args:
+            path: Caminho da imagem
+            grayscale: Em JPEG, decodificar só a luminância (para o pipeline em escala de cinza)
+            
+        Returns:
+            PIL Image aberta; info['original_size'] guarda o tamanho do
+            arquivo (o JPEG reduzido já tem o tamanho decodificado)
+            
+        Raises:
+            ValueError: Se a impressão passar de max_height_mm ou se a imagem
+                tiver que decodificar mais pixels que max_image_pixels de uma vez
+        """
+        image = self._open_unchecked(path)
+        image.info['original_size'] = image.size
+        
+        if image.format == 'JPEG' and image.width > self.target_width_px:
+            target_height = max(1, round(image.height * self.target_width_px / image.width))
+            image.draft('L' if grayscale else None, (self.target_width_px, target_height))
+        
+        try:
+            self.check_limits(image)
+        except ValueError:
+            image.close()
+            raise
+        
+        return image
+    
+    def printed_height_mm(self, width, height):
+        """
+        Altura impressa de uma imagem depois do redimensionamento para a largura alvo
+        
+        Args:
+            width: Largura original em pixels
+            height: Altura original em pixels
+            
+        Returns:
+            Altura em milímetros
+        """
+        printed_rows = height * self.target_width_px / width if width > self.target_width_px else height
+        return printed_rows / self.pixels_per_mm
     
-    def resize_to_width(self, image):
+    def check_limits(self, image):
+        """
+        Verifica os limites de uma imagem aberta, sem decodificar os pixels
+        
+        Args:
+            image: PIL Image aberta (ou página/quadro atual de um documento)
+            
+        Raises:
+            ValueError: Se a impressão passar de max_height_mm ou se a imagem
+                tiver que decodificar mais pixels que max_image_pixels de uma vez
+        """
+        width, height = image.size
+        
+        # Altura impressa: rejeitar antes de decodificar qualquer pixel
+        printed_mm = self.printed_height_mm(width, height)
+        if printed_mm > self.max_height_mm:
+            raise ValueError(
+                f"Imagem muito alta ({width}x{height}px): a impressão teria {printed_mm:.1f}mm. "
+                f"Limite: {self.max_height_mm}mm"
+            )
+        
+        # Proteção contra "decompression bombs": checar o cabeçalho antes de decodificar
+        # (arquivos não comprimidos são lidos em faixas e não decodificam tudo de uma vez)
+        if width * height > self.max_image_pixels and self._raw_layout(image) is None:
+            raise ValueError(
+                f"Imagem muito grande ({width}x{height}px). "
+                f"Limite: {self.max_image_pixels / 1_000_000:.0f} megapixels"
+            )
+    
+    @staticmethod
+    def _open_unchecked(path):
+        """
+        Abre a imagem mesmo acima do limite de pixels do Pillow
+        
+        Os limites são verificados por open_image, com as mensagens do
+        aplicativo (arquivos lidos em faixas podem passar do limite padrão).
+        Image.MAX_IMAGE_PIXELS não é alterado: é global e compartilhado com
+        as outras threads. Acima do limite, a imagem é aberta pelo plugin do
+        formato, que só lê o cabeçalho.
+        """
+        try:
+            return Image.open(path)
+        except Image.DecompressionBombError:
+            pass
+        
+        Image.init()
+        if hasattr(path, 'read'):
+            path.seek(0)
+            prefix = path.read(16)
+        else:
+            with open(path, 'rb') as f:
+                prefix = f.read(16)
+        
+        for format_id in Image.ID:
+            factory, accept = Image.OPEN[format_id]
+            accepted = accept(prefix) if accept is not None else True
+            if not accepted or isinstance(accepted, str):
+                continue
+            if hasattr(path, 'seek'):
+                path.seek(0)
+            try:
+                return factory(path)
+            except (SyntaxError, IndexError, TypeError, ValueError, OSError):
+                continue
+        
+        raise Image.UnidentifiedImageError(f"Formato de imagem não reconhecido: {path}")
+    
+    def _raw_layout(self, image):
+        """
+        Posição dos pixels de um arquivo não comprimido (BMP, PPM, TIFF sem compressão)
+        
+        Args:
+            image: PIL Image aberta e ainda não decodificada
+            
+        Returns:
+            Tupla (offset, rawmode, bytes por linha, orientação) ou None se
+            o arquivo não puder ser lido em faixas
+        """
+        tiles = getattr(image, 'tile', None)
+        if not tiles or len(tiles) != 1 or not getattr(image, 'filename', None):
+            return None
+        
+        codec, extents, offset, args = tiles[0]
+        if codec != 'raw' or tuple(extents) != (0, 0, image.width, image.height):
+            return None
+        
+        if isinstance(args, str):
+            args = (args,)
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+        
+        if not stride:
+            if rawmode not in _RAW_BYTES_PER_PIXEL:
+                return None
+            stride = image.width * _RAW_BYTES_PER_PIXEL[rawmode]
+        
+        return offset, rawmode, stride, orientation
+    
+    def _read_rows(self, image, layout, top, bottom):
+        """
+        Decodifica só as linhas [top, bottom) de uma imagem
+        
+        Com layout (arquivo não comprimido), lê apenas essas linhas do
+        arquivo; sem ele, decodifica a imagem inteira uma vez e recorta.
+        
+        Args:
+            image: PIL Image aberta
+            layout: Retorno de _raw_layout ou None
+            top: Primeira linha
+            bottom: Linha final (exclusiva)
+            
+        Returns:
+            PIL Image com as linhas pedidas
+        """
+        if layout is None:
+            return self.load(image).crop((0, top, image.width, bottom))
+        
+        offset, rawmode, stride, orientation = layout
+        rows = bottom - top
+        # Em arquivos de baixo para cima (BMP) a faixa começa pela última linha
+        first_row = image.height - bottom if orientation < 0 else top
+        
+        with span('decode'):
+            # Só os bytes da faixa; o plugin do formato não é usado de novo
+            # (alguns, como o TIFF, ignoram um tile menor que a imagem)
+            with open(image.filename, 'rb') as f:
+                f.seek(offset + first_row * stride)
+                data = f.read(rows * stride)
+            if len(data) < rows * stride:
+                raise OSError(f"Arquivo truncado: {image.filename}")
+            
+            strip = Image.frombuffer(image.mode, (image.width, rows), data, 'raw', rawmode, stride, orientation)
+            if image.mode == 'P':
+                strip.palette = image.palette.copy()
+        return strip
+    
+    def load_resized(self, image):
+        """
+        Decodifica e redimensiona para a largura alvo em escala de cinza
+        
+        Imagens com mais de strip_min_pixels são processadas em faixas
+        (resize_to_width_in_strips); as demais por resize_to_width.
+        
+        Args:
+            image: PIL Image (ex.: retornada por open_image)
+            
+        Returns:
+            PIL Image em modo 'L' com a largura alvo
+        """
+        if getattr(image, 'tile', None) and image.width * image.height > self.strip_min_pixels:
+            return self.resize_to_width_in_strips(image)
+        
+        return self.resize_to_width(self.load(image), grayscale=True)
+    
+    def resize_to_width_in_strips(self, image):
+        """
+        Mesmo resultado de resize_to_width(load(image), grayscale=True), em faixas
+        
+        A imagem original é lida, convertida, reduzida e redimensionada na
+        horizontal em faixas de até strip_memory_mb; só o buffer já na
+        largura alvo (cuja altura é limitada por max_height_mm) fica inteiro
+        na memória.
+        
+        Args:
+            image: PIL Image aberta (arquivos não comprimidos são lidos por partes)
+            
+        Returns:
+            PIL Image em modo 'L' com a largura alvo
+        """
+        import numpy as np
+        
+        width, height = image.size
+        target = self.target_width_px
+        layout = self._raw_layout(image)
+        
+        # Linhas da imagem original por faixa (4 bytes por pixel no Pillow)
+        strip_rows = max(1, self.strip_bytes // (width * 4))
+        
+        if width <= target:
+            # Sem redimensionamento: converter e centralizar faixa por faixa
+            output = np.full((height, target), 255, dtype=np.uint8)
+            left = int((target - width) / 2)
+            for top in range(0, height, strip_rows):
+                bottom = min(top + strip_rows, height)
+                with span('resize'):
+                    gray = self._read_rows(image, layout, top, bottom).convert('L')
+                    output[top:bottom, left:left + width] = np.asarray(gray)
+            return Image.fromarray(output)
+        
+        # Mesmas contas de resize_to_width: pré-redução por blocos e LANCZOS final
+        output_height = int(height * (target / width))
+        factor = width // target if width // target >= 2 else 1
+        reduced_height = math.ceil(height / factor)
+        strip_rows = max(factor, strip_rows // factor * factor)
+        
+        # O LANCZOS do Pillow faz dois passos: horizontal (linha a linha) e
+        # vertical. O horizontal roda faixa por faixa sobre um buffer já na
+        # largura alvo; o vertical roda uma vez sobre ele, com os mesmos
+        # coeficientes do redimensionamento da imagem inteira
+        narrow = np.empty((reduced_height, target), dtype=np.uint8)
+        for top in range(0, height, strip_rows):
+            source = self._read_rows(image, layout, top, min(top + strip_rows, height))
+            with span('resize'):
+                if source.mode not in ('RGB', 'L'):
+                    source = source.convert('L')
+                if factor >= 2:
+                    source = source.reduce(factor)
+                if source.mode != 'L':
+                    source = source.convert('L')
+                
+                row = top // factor
+                narrow[row:row + source.height] = np.asarray(
+                    source.resize((target, source.height), Image.Resampling.LANCZOS)
+                )
+        
+        with span('resize'):
+            return Image.fromarray(narrow).resize((target, output_height), Image.Resampling.LANCZOS)
+    
+    def load(self, image):
+        """
+        Decodifica os pixels de uma imagem aberta de forma preguiçosa
+        
+        Args:
+            image: PIL Image (ex.: retornada por open_image)
+            
+        Returns:
+            A mesma imagem, já decodificada
+        """
+        with span('decode'):
+            image.load()
+        return image
+    
+    @timed('resize')
+    def resize_to_width(self, image, grayscale=False):
         """
         Redimensiona proporcionalmente para largura máxima de 464px, centralizando sempre.
         Args:
             image: PIL Image
+            grayscale: Converter para escala de cinza ('L') no caminho
         Returns:
             PIL Image centralizada
         """
-        if image.mode not in ('RGB', 'L'):
+        if grayscale and image.mode not in ('RGB', 'L'):
+            # RGBA e P viram L direto (o alfa é descartado, como na conversão para RGB)
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
             image = image.convert('RGB')
         
-        print(f"[DEBUG] Imagem original: {image.width}x{image.height}px")
-        print(f"[DEBUG] Largura alvo: {self.target_width_px}px")
+        logger.debug("Imagem original: %dx%dpx, largura alvo: %dpx",
+                     image.width, image.height, self.target_width_px)
         
         # Se a imagem for mais larga, reduz proporcionalmente
         if image.width > self.target_width_px:
             scale = self.target_width_px / image.width
             new_width = self.target_width_px
             new_height = int(image.height * scale)
-            print(f"[DEBUG] Reduzindo para: {new_width}x{new_height}px")
+            logger.debug("Reduzindo para: %dx%dpx", new_width, new_height)
+            
+            # Pré-redução rápida (média por blocos) até a menor largura >= alvo;
+            # o LANCZOS final trabalha sobre poucos pixels
+            factor = image.width // self.target_width_px
+            if factor >= 2:
+                image = image.reduce(factor)
+            
+            # Conversão depois da pré-redução: lê bem menos pixels RGB
+            if grayscale and image.mode != 'L':
+                image = image.convert('L')
+            
             resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
         # Se for menor, mantém tamanho e centraliza
         elif image.width < self.target_width_px:
+            if grayscale and image.mode != 'L':
+                image = image.convert('L')
             new_height = image.height
-            new_img = Image.new('RGB', (self.target_width_px, new_height), 'white')
+            new_img = Image.new(image.mode, (self.target_width_px, new_height), 'white')
             offset_x = int((self.target_width_px - image.width) / 2)
-            print(f"[DEBUG] Centralizando com offset X: {offset_x}px")
+            logger.debug("Centralizando com offset X: %dpx", offset_x)
             new_img.paste(image, (offset_x, 0))  # Centraliza
             resized = new_img
         else:
-            print(f"[DEBUG] Largura já está correta")
-            resized = image
+            logger.debug("Largura já está correta")
+            resized = image.convert('L') if grayscale and image.mode != 'L' else image
         
-        print(f"[DEBUG] Imagem final: {resized.width}x{resized.height}px")
         return resized
     
+    @timed('trim')
     def remove_top_margin(self, image, threshold=250):
         """
         Remove margem branca superior da imagem
@@ -66,6 +395,8 @@ class ImageProcessor:
         Returns:
             PIL Image com margem superior removida
         """
+        import numpy as np
+        
         # Converter para grayscale para análise
         if image.mode != 'L':
             gray_image = image.convert('L')
@@ -73,18 +404,11 @@ class ImageProcessor:
             gray_image = image
         
         # Converter para array numpy
-        img_array = np.array(gray_image)
+        img_array = np.asarray(gray_image)
         
-        # Encontrar primeira linha com pixels escuros
-        top_line = 0
-        for y in range(img_array.shape[0]):
-            # Contar pixels escuros na linha
-            dark_pixels = np.sum(img_array[y] < threshold)
-            
-            # Se encontrar pixels escuros suficientes (>1% da largura)
-            if dark_pixels > (img_array.shape[1] * 0.01):
-                top_line = y
-                break
+        # Encontrar primeira linha com pixels escuros (>1% da largura)
+        first_row = self._find_content_row(img_array, threshold)
+        top_line = first_row if first_row is not None else 0
         
         # Se encontrou conteúdo, recortar
         if top_line > 0:
@@ -94,6 +418,7 @@ class ImageProcessor:
         
         return image
     
+    @timed('offset')
     def apply_offset(self, image, offset_mm):
         """
         Aplica offset vertical manual
@@ -114,7 +439,7 @@ class ImageProcessor:
         if offset_px > 0:
             # Adicionar espaço branco no topo
             new_height = image.height + offset_px
-            new_image = Image.new('RGB', (image.width, new_height), 'white')
+            new_image = Image.new(image.mode, (image.width, new_height), 'white')
             new_image.paste(image, (0, offset_px))
             return new_image
         else:
@@ -125,13 +450,61 @@ class ImageProcessor:
             else:
                 return image
     
+    def trim_and_offset(self, image, auto_top_fix=True, offset_mm=0, threshold=250):
+        """
+        Remove a margem superior e aplica o offset em um único buffer
+        
+        Equivale a remove_top_margin seguido de apply_offset, sem criar a
+        imagem recortada intermediária.
+        
+        Args:
+            image: PIL Image (de preferência já em escala de cinza)
+            auto_top_fix: Remover margem branca superior
+            offset_mm: Offset vertical em milímetros (positivo = para baixo, negativo = para cima)
+            threshold: Valor de luminosidade para considerar como branco
+            
+        Returns:
+            PIL Image em modo 'L'
+        """
+        import numpy as np
+        
+        if image.mode != 'L':
+            image = image.convert('L')
+        
+        pixels = np.asarray(image)
+        width, height = image.size
+        
+        top_line = 0
+        if auto_top_fix:
+            with span('trim'):
+                top_line = self._find_content_row(pixels, threshold) or 0
+        
+        with span('offset'):
+            offset_px = int(offset_mm * self.pixels_per_mm)
+            if offset_px < 0:
+                # Remover pixels do topo (se ainda sobrar imagem)
+                if -offset_px < height - top_line:
+                    top_line -= offset_px
+                offset_px = 0
+            
+            if offset_px == 0:
+                return image.crop((0, top_line, width, height)) if top_line > 0 else image
+            
+            # Linhas brancas do offset e conteúdo copiados direto para a saída
+            buffer = np.empty((offset_px + height - top_line, width), dtype=np.uint8)
+            buffer[:offset_px] = 255
+            buffer[offset_px:] = pixels[top_line:]
+            return Image.fromarray(buffer)
+    
+    @timed('monochrome')
     def convert_to_monochrome(self, image, method='threshold'):
         """
         Converte imagem para monocromático para impressão térmica
         
         Args:
             image: PIL Image
-            method: 'threshold' ou 'dither'
+            method: 'threshold', 'dither' (algoritmo da configuração) ou um
+                dos algoritmos de dithering.METHODS
             
         Returns:
             PIL Image em modo '1' (preto e branco puro)
@@ -142,16 +515,37 @@ class ImageProcessor:
         else:
             gray = image
         
-        if method == 'threshold':
-            # Threshold simples em 50%
-            mono = gray.point(lambda x: 0 if x < 128 else 255, '1')
-        elif method == 'dither':
-            # Dithering (Floyd-Steinberg)
-            mono = gray.convert('1')
-        else:
-            mono = gray.convert('1')
+        if method == 'dither':
+            method = self.dither_method
+        
+        return dithering.dither(gray, method, self.mono_threshold, self.gamma)
+    
+    def trim_blank_rows(self, image, threshold=250):
+        """
+        Remove as margens brancas de cima e de baixo
+        
+        Args:
+            image: PIL Image
+            threshold: Valor de luminosidade para considerar como branco
+            
+        Returns:
+            PIL Image em modo 'L' só com as linhas de conteúdo, ou None se a imagem estiver em branco
+        """
+        import numpy as np
+        
+        if image.mode != 'L':
+            image = image.convert('L')
         
-        return mono
+        with span('trim'):
+            pixels = np.asarray(image)
+            top_line = self._find_content_row(pixels, threshold)
+            if top_line is None:
+                return None
+            bottom_line = self._find_content_row(pixels, threshold, from_bottom=True) + 1
+        
+        if top_line == 0 and bottom_line == image.height:
+            return image
+        return image.crop((0, top_line, image.width, bottom_line))
     
     def detect_content_height(self, image, threshold=250):
         """
@@ -164,32 +558,116 @@ class ImageProcessor:
         Returns:
             Altura do conteúdo em pixels
         """
+        import numpy as np
+        
         # Converter para grayscale
         if image.mode != 'L':
             gray_image = image.convert('L')
         else:
             gray_image = image
         
-        img_array = np.array(gray_image)
-        
-        # Encontrar última linha com conteúdo
-        bottom_line = image.height
-        for y in range(img_array.shape[0] - 1, -1, -1):
-            dark_pixels = np.sum(img_array[y] < threshold)
-            if dark_pixels > (img_array.shape[1] * 0.01):
-                bottom_line = y + 1
-                break
+        img_array = np.asarray(gray_image)
         
         # Encontrar primeira linha com conteúdo
-        top_line = 0
-        for y in range(img_array.shape[0]):
-            dark_pixels = np.sum(img_array[y] < threshold)
-            if dark_pixels > (img_array.shape[1] * 0.01):
-                top_line = y
-                break
+        top_line = self._find_content_row(img_array, threshold)
+        if top_line is None:
+            # Sem conteúdo: altura total (mesmo resultado da varredura antiga)
+            return image.height
+        
+        # Encontrar última linha com conteúdo
+        bottom_line = self._find_content_row(img_array, threshold, from_bottom=True) + 1
         
         return bottom_line - top_line
     
+    def _content_row_mask(self, img_array, threshold):
+        """
+        Marca as linhas que contêm conteúdo (mais de 1% de pixels escuros)
+        
+        Args:
+            img_array: Array numpy 2D em escala de cinza
+            threshold: Valor de luminosidade para considerar como branco
+            
+        Returns:
+            Array booleano com uma posição por linha
+        """
+        import numpy as np
+        
+        dark_pixels = np.count_nonzero(img_array < threshold, axis=1)
+        return dark_pixels > (img_array.shape[1] * 0.01)
+    
+    def _find_content_row(self, img_array, threshold, from_bottom=False):
+        """
+        Encontra a primeira (ou última) linha com conteúdo
+        
+        Args:
+            img_array: Array numpy 2D em escala de cinza
+            threshold: Valor de luminosidade para considerar como branco
+            from_bottom: Se True, procura a última linha com conteúdo
+            
+        Returns:
+            Índice da linha ou None se a imagem não tiver conteúdo
+        """
+        import numpy as np
+        
+        if img_array.shape[0] >= self.coarse_scan_min_height:
+            return self._find_content_row_coarse(img_array, threshold, from_bottom)
+        
+        mask = self._content_row_mask(img_array, threshold)
+        if from_bottom:
+            mask = mask[::-1]
+        
+        # argmax retorna a primeira ocorrência de True
+        row = int(np.argmax(mask))
+        if not mask[row]:
+            return None
+        
+        return img_array.shape[0] - 1 - row if from_bottom else row
+    
+    def _find_content_row_coarse(self, img_array, threshold, from_bottom=False):
+        """
+        Varredura grossa-para-fina para imagens muito altas
+        
+        Reduz a imagem em blocos de linhas guardando o pixel mais escuro de
+        cada coluna. Uma linha com conteúdo sempre deixa o seu bloco com
+        pelo menos a mesma quantidade de colunas escuras, então os blocos
+        candidatos nunca perdem conteúdo; cada candidato é refinado na
+        resolução original, dando exatamente o mesmo resultado da varredura
+        linha a linha.
+        
+        Args:
+            img_array: Array numpy 2D em escala de cinza
+            threshold: Valor de luminosidade para considerar como branco
+            from_bottom: Se True, procura a última linha com conteúdo
+            
+        Returns:
+            Índice da linha ou None se a imagem não tiver conteúdo
+        """
+        import numpy as np
+        
+        height, width = img_array.shape
+        factor = self.coarse_scan_factor
+        block_starts = np.arange(0, height, factor)
+        
+        # Cópia reduzida: mínimo de cada bloco de linhas, por coluna
+        full_rows = (height // factor) * factor
+        reduced = img_array[:full_rows].reshape(-1, factor, width).min(axis=1)
+        if full_rows < height:
+            remainder = img_array[full_rows:].min(axis=0, keepdims=True)
+            reduced = np.concatenate([reduced, remainder])
+        candidates = np.flatnonzero(self._content_row_mask(reduced, threshold))
+        if from_bottom:
+            candidates = candidates[::-1]
+        
+        # Refinar na resolução original
+        for block in candidates:
+            start = int(block_starts[block])
+            stop = min(start + factor, height)
+            rows = np.flatnonzero(self._content_row_mask(img_array[start:stop], threshold))
+            if rows.size:
+                return start + int(rows[-1] if from_bottom else rows[0])
+        
+        return None
+    
     def auto_crop_content(self, image):
         """
         Recorta automaticamente para manter apenas o conteúdo
@@ -211,3 +689,78 @@ class ImageProcessor:
             image = image.crop((0, 0, image.width, content_height))
         
         return image
+    
+    def process(self, image, auto_top_fix=True, offset_mm=0):
+        """
+        Executa o pipeline completo de ajuste (mesmas etapas da interface)
+        
+        Args:
+            image: PIL Image
+            auto_top_fix: Remover margem branca superior
+            offset_mm: Offset vertical em milímetros
+            
+        Returns:
+            PIL Image em escala de cinza ('L'), redimensionada, recortada e com offset aplicado
+        """
+        # Uma conversão para escala de cinza no início; as etapas seguintes
+        # trabalham sobre um único canal (imagens gigantes são lidas em faixas)
+        image = self.load_resized(image)
+        return self.trim_and_offset(image, auto_top_fix, offset_mm)
+    
+    def iter_monochrome_bands(self, image, band_height=256, auto_top_fix=True,
+                              offset_mm=0, method='threshold', threshold=250):
+        """
+        Pipeline em faixas: decodifica, redimensiona, remove a margem,
+        aplica offset e converte para monocromático uma faixa por vez
+        
+        Produz o mesmo resultado de process → convert_to_monochrome, sem
+        manter as cópias intermediárias da imagem inteira.
+        
+        Args:
+            image: PIL Image (pode ser aberta de forma preguiçosa)
+            band_height: Altura de cada faixa em pixels
+            auto_top_fix: Remover margem branca superior
+            offset_mm: Offset vertical em milímetros
+            method: 'threshold', 'dither' ou um dos algoritmos de dithering.METHODS
+            threshold: Valor de luminosidade para considerar como branco
+            
+        Yields:
+            PIL Image em modo '1' com até band_height linhas
+        """
+        import numpy as np
+        
+        resized = self.load_resized(image)
+        width, height = resized.size
+        
+        # Procurar a primeira linha com conteúdo faixa por faixa
+        top_line = 0
+        if auto_top_fix:
+            with span('trim'):
+                for band_top in range(0, height, band_height):
+                    band = resized.crop((0, band_top, width, min(band_top + band_height, height)))
+                    if band.mode != 'L':
+                        band = band.convert('L')
+                    row = self._find_content_row(np.asarray(band), threshold)
+                    if row is not None:
+                        top_line = band_top + row
+                        break
+        
+        # Offset: positivo adiciona linhas brancas, negativo remove do topo
+        offset_px = int(offset_mm * self.pixels_per_mm)
+        if offset_px < 0 and -offset_px < height - top_line:
+            top_line -= offset_px
+        
+        for band_top in range(0, max(offset_px, 0), band_height):
+            yield Image.new('1', (width, min(band_height, offset_px - band_top)), 1)
+        
+        if method == 'threshold':
+            # Threshold é ponto a ponto: cada faixa é convertida isoladamente
+            for band_top in range(top_line, height, band_height):
+                band = resized.crop((0, band_top, width, min(band_top + band_height, height)))
+                yield self.convert_to_monochrome(band, method)
+        else:
+            # Dithering espalha o erro entre linhas: converter o conteúdo de
+            # uma vez (já na largura final) e só então fatiar
+            mono = self.convert_to_monochrome(resized.crop((0, top_line, width, height)), method)
+            for band_top in range(0, mono.height, band_height):
+                yield mono.crop((0, band_top, width, min(band_top + band_height, mono.height)))
@@ -0,0 +1,172 @@
+"""
+Instrumentação do TopStart Thermal
+Logging estruturado, tempos por etapa e captura opcional com cProfile
+"""
+
+import functools
+import io
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Logger do aplicativo; nível definido por configure_logging (variável ZEROTOP_LOG)
+logger = logging.getLogger('zerotop')
+
+# Etapas medidas, na ordem em que acontecem
+STAGES = ('decode', 'resize', 'trim', 'offset', 'monochrome', 'encode', 'transmit')
+
+_local = threading.local()
+
+
+def configure_logging(level=None):
+    """
+    Ativa a saída do logger 'zerotop' no stderr
+    
+    Sem configuração, apenas avisos e erros aparecem (como os antigos print).
+    
+    Args:
+        level: Nível ('DEBUG', 'INFO', ...) (padrão: variável ZEROTOP_LOG ou WARNING)
+    """
+    level = level or os.environ.get('ZEROTOP_LOG', 'WARNING')
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+class JobTimings:
+    def __init__(self, label=''):
+        """
+        Tempos acumulados das etapas de um trabalho
+        
+        Args:
+            label: Identificação do trabalho nos logs
+        """
+        self.label = label
+        self.stages = {}  # etapa -> segundos (somados quando a etapa roda em faixas)
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        # Enviado entre processos no modo batch: o lock não é serializável
+        return {'label': self.label, 'stages': self.stages}
+    
+    def __setstate__(self, state):
+        self.label = state['label']
+        self.stages = state['stages']
+        self._lock = threading.Lock()
+    
+    def add(self, stage, seconds):
+        """Soma o tempo de uma etapa (pode ser chamada de threads diferentes)"""
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+    
+    @property
+    def total(self):
+        """Soma dos tempos de todas as etapas, em segundos"""
+        return sum(self.stages.values())
+    
+    def summary(self):
+        """Texto curto com o tempo de cada etapa, ex.: 'resize 3.1 ms · encode 0.4 ms'"""
+        ordered = sorted(self.stages.items(), key=lambda item: (
+            STAGES.index(item[0]) if item[0] in STAGES else len(STAGES)
+        ))
+        return " · ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in ordered)
+
+
+@contextmanager
+def activate(timings):
+    """
+    Faz as etapas executadas nesta thread contarem para um trabalho
+    
+    Args:
+        timings: JobTimings que recebe os tempos
+    """
+    previous = getattr(_local, 'timings', None)
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def span(stage):
+    """
+    Mede uma etapa do pipeline
+    
+    Sem trabalho ativo e com o logger abaixo de DEBUG, não mede nada.
+    
+    Args:
+        stage: Nome da etapa (ver STAGES)
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None and not logger.isEnabledFor(logging.DEBUG):
+        yield
+        return
+    
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings.add(stage, elapsed)
+        logger.debug("%s: %.1f ms", stage, elapsed * 1000)
+
+
+def timed(stage):
+    """
+    Decorador que mede cada chamada da função como uma etapa
+    
+    Args:
+        stage: Nome da etapa (ver STAGES)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish(timings):
+    """
+    Registra no log os tempos de um trabalho concluído
+    
+    Args:
+        timings: JobTimings do trabalho
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("%s: %s (total %.1f ms)", timings.label, timings.summary(), timings.total * 1000)
+
+
+@contextmanager
+def profiled(path, top=15):
+    """
+    Executa um trecho com cProfile e grava as estatísticas
+    
+    Args:
+        path: Arquivo .prof de saída (abrir com python -m pstats ou snakeviz)
+        top: Quantas funções (por tempo acumulado) mostrar no log
+    
+    Yields:
+        cProfile.Profile em execução
+    """
+    import cProfile
+    import pstats
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        logger.info("Perfil gravado em %s\n%s", path, report.getvalue())
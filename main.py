@@ -4,13 +4,23 @@ ZeroTop Thermal 58mm - Aplicativo para correção de margem superior em impresso
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from tkinterdnd2 import DND_FILES, TkinterDnD
 from PIL import Image, ImageTk, ImageOps
 import os
-import json
+import sys
 import ctypes
+import queue
+import threading
+from config import CACHE_CONFIG, DOCUMENT_CONFIG, HISTORY_CONFIG, IMAGE_CONFIG, UI_CONFIG
+from history_store import HistoryStore
+import document_source
+from image_cache import PayloadStore, StageCache, file_digest, file_identity
+import instrumentation
+from instrumentation import JobTimings, logger
 from image_processor import ImageProcessor
 from printer_handler import PrinterHandler
+from preview_worker import PreviewViewport, PreviewWorker
+from print_spooler import PrintSpooler, JOB_SENDING, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+from thumbnail_cache import ThumbnailCache
 
 
 def load_icon_image(icon_name, size=(32, 32)):
@@ -66,12 +76,20 @@ class TopStartThermalApp:
         self.original_image = None
         self.processed_image = None
         self.current_file = None
+        self.source_id = None  # Identidade rápida do arquivo (caminho, mtime, tamanho): chaves das etapas
+        self.content_hash = None  # Hash do conteúdo, calculado em segundo plano: chaves dos comandos em disco
+        self.page_total = 1  # Páginas do documento carregado (TIFF/PDF); o preview mostra a primeira
+        self._load_generation = 0  # Carregamentos pedidos: só o último é mostrado
+        self._preview_source = None  # Origem mostrada no preview: outra origem volta o zoom ao padrão
         self.auto_top_fix = tk.BooleanVar(value=True)
+        self.join_pages = tk.BooleanVar(value=DOCUMENT_CONFIG['join_pages'])
         self.manual_offset = tk.IntVar(value=0)
         self.num_copies = tk.IntVar(value=1)
-        self.history_file = "history.json"
-        self.image_history = self.load_history()
+        # Na abertura só as entradas exibidas são lidas do histórico
+        self.history = HistoryStore()
+        self.image_history = [entry['path'] for entry in self.history.recent(HISTORY_CONFIG['visible'])]
         self.thumbnail_buttons = []
+        self.thumbnail_cache = ThumbnailCache(size=(60, 60))
         
         # Carregar ícones
         self.icon_printer_header = load_icon_image("printer.ico", (48, 48))
@@ -82,11 +100,29 @@ class TopStartThermalApp:
         # Processadores
         self.image_processor = ImageProcessor(self.PAPER_WIDTH_PX, self.PIXELS_PER_MM)
         self.printer_handler = PrinterHandler()
+        self.stage_cache = StageCache(CACHE_CONFIG['stage_cache_mb'] * 1024 * 1024)
+        self._pipeline_lock = threading.Lock()  # Preview (worker) e impressão compartilham as etapas
+        self.payload_cache = PayloadStore()  # Comandos ESC/POS prontos: reimpressão sem reprocessar
+        self.print_spooler = PrintSpooler(self.printer_handler, payload_cache=self.payload_cache)
+        self._ui_events = queue.Queue()  # Callbacks de outras threads para a thread do Tk
         
         self.setup_ui()
         
+        # Preview renderizado fora da thread do Tk
+        self.preview_worker = PreviewWorker(
+            self.root,
+            self._render_preview,
+            self._show_preview,
+            on_error=lambda e: messagebox.showerror("Erro", f"Erro ao processar imagem: {str(e)}")
+        )
+        
         # Atalho: Enter para imprimir
         self.root.bind('<Return>', lambda event: self.print_image())
+        
+        self._poll_ui_events()
+        
+        # Miniaturas do histórico depois que a janela for exibida
+        self.root.after(100, self._start_thumbnail_loading)
     
     def setup_styles(self):
         """Configura estilos personalizados para a interface - Tema Vintage Windows"""
@@ -237,30 +273,22 @@ class TopStartThermalApp:
             thumbnails_container = ttk.Frame(history_frame)
             thumbnails_container.pack(fill=tk.X)
             
+            # Placeholders; as miniaturas são carregadas depois que a janela aparece
+            self.thumbnail_placeholder = ImageTk.PhotoImage(Image.new('RGB', (60, 60), '#d3d0c7'))
             self.thumbnail_buttons = []
-            for idx, img_path in enumerate(self.image_history[:5]):  # Mostrar até 5 recentes
-                if os.path.exists(img_path):
-                    try:
-                        # Criar miniatura
-                        img = Image.open(img_path)
-                        img.thumbnail((60, 60), Image.Resampling.LANCZOS)
-                        photo = ImageTk.PhotoImage(img)
-                        
-                        # Botão com miniatura
-                        btn = tk.Button(
-                            thumbnails_container,
-                            image=photo,
-                            command=lambda p=img_path: self.load_image_from_path(p),
-                            relief='raised',
-                            borderwidth=2,
-                            bg='#ffffff',
-                            cursor='hand2'
-                        )
-                        btn.image = photo  # Manter referência
-                        btn.pack(side=tk.LEFT, padx=2, pady=2)
-                        self.thumbnail_buttons.append(btn)
-                    except:
-                        pass
+            for idx, img_path in enumerate(self.image_history):
+                # Botão com miniatura
+                btn = tk.Button(
+                    thumbnails_container,
+                    image=self.thumbnail_placeholder,
+                    command=lambda p=img_path: self.load_image_from_path(p),
+                    relief='raised',
+                    borderwidth=2,
+                    bg='#ffffff',
+                    cursor='hand2'
+                )
+                btn.pack(side=tk.LEFT, padx=2, pady=2)
+                self.thumbnail_buttons.append(btn)
         
         # Controles adicionais
         controls_frame = ttk.LabelFrame(left_column, text="Controles", padding="10")
@@ -275,6 +303,14 @@ class TopStartThermalApp:
         )
         auto_fix_check.pack(anchor=tk.W, pady=5)
         
+        # Documentos de várias páginas
+        join_pages_check = ttk.Checkbutton(
+            controls_frame,
+            text="Unir páginas (TIFF/PDF) em uma faixa contínua",
+            variable=self.join_pages
+        )
+        join_pages_check.pack(anchor=tk.W, pady=5)
+        
         # Offset manual
         offset_frame = ttk.Frame(controls_frame)
         offset_frame.pack(fill=tk.X, pady=5)
@@ -320,6 +356,32 @@ class TopStartThermalApp:
         )
         self.info_label.pack(fill=tk.X)
         
+        # Estado da fila de impressão
+        self.print_status_label = tk.Label(
+            info_frame,
+            text="",
+            font=("MS Sans Serif", 8),
+            bg="#f0eee4",
+            fg="#215dc6",
+            justify=tk.LEFT,
+            anchor=tk.W,
+            wraplength=280
+        )
+        self.print_status_label.pack(fill=tk.X)
+        
+        # Tempos por etapa do último trabalho
+        self.timings_label = tk.Label(
+            info_frame,
+            text="",
+            font=("MS Sans Serif", 8),
+            bg="#f0eee4",
+            fg="#555555",
+            justify=tk.LEFT,
+            anchor=tk.W,
+            wraplength=280
+        )
+        self.timings_label.pack(fill=tk.X)
+        
         # Botão de impressão (parte inferior da coluna esquerda)
         self.print_btn = ttk.Button(
             left_column,
@@ -342,6 +404,12 @@ class TopStartThermalApp:
         preview_border = tk.Frame(preview_frame, bg="#b0b0b0", relief='sunken', borderwidth=2)
         preview_border.pack(pady=5, padx=5, fill=tk.BOTH, expand=True)
         
+        # Barras de rolagem do preview (recibos longos e zoom)
+        preview_yscroll = ttk.Scrollbar(preview_border, orient=tk.VERTICAL)
+        preview_yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        preview_xscroll = ttk.Scrollbar(preview_border, orient=tk.HORIZONTAL)
+        preview_xscroll.pack(side=tk.BOTTOM, fill=tk.X)
+        
         # Canvas para preview com estilo pontilhado
         self.preview_canvas = tk.Canvas(
             preview_border,
@@ -349,14 +417,26 @@ class TopStartThermalApp:
             width=550,
             height=600,
             highlightthickness=0,
-            relief='flat'
+            relief='flat',
+            xscrollcommand=preview_xscroll.set,
+            yscrollcommand=preview_yscroll.set
         )
         self.preview_canvas.pack(padx=3, pady=3, fill=tk.BOTH, expand=True)
         
         # Desenhar borda pontilhada no canvas
         self.preview_canvas.bind('<Configure>', self._draw_dotted_border)
         
+        # Só as faixas visíveis são renderizadas; roda rola, Ctrl+roda dá zoom
+        self.preview_viewport = PreviewViewport(self.preview_canvas, on_layout=self._draw_top_marker)
+        preview_yscroll.configure(
+            command=lambda *args: self.preview_viewport.on_scrollbar(self.preview_canvas.yview, *args)
+        )
+        preview_xscroll.configure(
+            command=lambda *args: self.preview_viewport.on_scrollbar(self.preview_canvas.xview, *args)
+        )
+        
         # Configurar drag and drop no canvas
+        from tkinterdnd2 import DND_FILES
         self.preview_canvas.drop_target_register(DND_FILES)
         self.preview_canvas.dnd_bind('<<Drop>>', self.on_drop)
         
@@ -405,38 +485,22 @@ class TopStartThermalApp:
             tags="dotted_border"
         )
     
-    def load_history(self):
-        """Carrega histórico de imagens do arquivo JSON"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except:
-            pass
-        return []
-    
-    def save_history(self):
-        """Salva histórico de imagens no arquivo JSON"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.image_history, f, ensure_ascii=False, indent=2)
-        except:
-            pass
-    
     def add_to_history(self, file_path):
-        """Adiciona arquivo ao histórico (máximo 10 itens)"""
-        # Remover se já existe
+        """Registra o arquivo no histórico (gravado em segundo plano)"""
+        # Dimensões do arquivo, não as da decodificação reduzida do JPEG
+        width, height = self.original_image.info.get('original_size', self.original_image.size)
+        self.history.record(
+            file_path,
+            width=width,
+            height=height,
+            thumbnail=self.thumbnail_cache.cache_path(file_path)
+        )
+        
+        # Remover se já existe e adicionar no início (lista exibida)
         if file_path in self.image_history:
             self.image_history.remove(file_path)
-        
-        # Adicionar no início
         self.image_history.insert(0, file_path)
-        
-        # Limitar a 10 itens
-        self.image_history = self.image_history[:10]
-        
-        # Salvar
-        self.save_history()
+        self.image_history = self.image_history[:HISTORY_CONFIG['visible']]
         
         # Atualizar combobox se existir
         if hasattr(self, 'history_combo'):
@@ -470,10 +534,12 @@ class TopStartThermalApp:
         file_path = filedialog.askopenfilename(
             title="Selecione uma imagem",
             filetypes=[
-                ("Imagens", "*.png *.jpg *.jpeg *.bmp"),
+                ("Imagens e documentos", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.pdf"),
                 ("PNG", "*.png"),
                 ("JPEG", "*.jpg *.jpeg"),
                 ("BMP", "*.bmp"),
+                ("TIFF", "*.tif *.tiff"),
+                ("PDF", "*.pdf"),
                 ("Todos os arquivos", "*.*")
             ]
         )
@@ -482,157 +548,502 @@ class TopStartThermalApp:
             self.load_image(file_path)
     
     def load_image(self, file_path):
-        """Carrega e processa a imagem"""
+        """Carrega a imagem ou documento em segundo plano (sem bloquear a interface)"""
+        self._load_generation += 1
+        threading.Thread(
+            target=self._load_source, args=(file_path, self._load_generation), name="source-loader", daemon=True
+        ).start()
+    
+    def _load_source(self, file_path, generation):
+        """Abre o arquivo e depois calcula o hash do conteúdo (thread do carregador)"""
         try:
-            # Carregar imagem original
-            self.current_file = file_path
-            self.original_image = Image.open(file_path)
-            
-            # Adicionar ao histórico
-            self.add_to_history(file_path)
-            
-            # Processar imagem
-            self.process_image()
-            
-            # Atualizar preview
-            self.update_preview()
-            
-            # Habilitar botão de impressão
-            self.print_btn.config(state='normal')
-            
+            if document_source.is_document(file_path):
+                # TIFF/PDF: preview da primeira página; as demais são lidas só na impressão
+                page_total = document_source.page_count(file_path)
+                image = document_source.open_first_page(file_path, self.image_processor)
+            else:
+                page_total = 1
+                image = self.image_processor.open_image(file_path, grayscale=True)
+            # Reabrir o mesmo arquivo reaproveita as etapas em cache
+            source_id = file_identity(file_path)
         except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar imagem: {str(e)}")
+            message = f"Erro ao carregar imagem: {str(e)}"
+            self._post_ui(lambda: messagebox.showerror("Erro", message))
+            return
+        
+        self._post_ui(lambda: self._show_source(file_path, generation, image, page_total, source_id))
+        
+        # Hash do conteúdo (comandos gravados em disco): depois do preview, na mesma thread
+        try:
+            digest = file_digest(file_path)
+        except OSError as e:
+            logger.warning("Não foi possível ler %s: %s", file_path, e)
+            return
+        self._post_ui(lambda: self._set_content_hash(file_path, source_id, digest))
     
-    def process_image(self):
-        """Processa a imagem aplicando correções"""
-        if not self.original_image:
+    def _show_source(self, file_path, generation, image, page_total, source_id):
+        """Passa a usar o arquivo aberto pelo carregador (thread do Tk)"""
+        if generation != self._load_generation:
+            # Outro arquivo foi pedido enquanto este era aberto
             return
         
-        # Redimensionar para largura correta (464px)
-        self.processed_image = self.image_processor.resize_to_width(self.original_image)
+        self.current_file = file_path
+        self.page_total = page_total
+        self.original_image = image
+        self.source_id = source_id
+        self.content_hash = None
         
-        # Aplicar auto top fix se habilitado
-        if self.auto_top_fix.get():
-            self.processed_image = self.image_processor.remove_top_margin(self.processed_image)
+        # Adicionar ao histórico
+        self.add_to_history(file_path)
         
-        # Aplicar offset manual
-        offset_mm = self.manual_offset.get()
-        if offset_mm != 0:
-            self.processed_image = self.image_processor.apply_offset(
-                self.processed_image,
-                offset_mm
-            )
+        # Processar e atualizar preview em segundo plano
+        self.update_preview(immediate=True)
+        
+        # Habilitar botão de impressão
+        self.print_btn.config(state='normal')
     
-    def update_preview(self):
-        """Atualiza o preview da imagem"""
-        if not self.original_image:
-            return
+    def _set_content_hash(self, file_path, source_id, digest):
+        """Guarda o hash se o arquivo ainda for o carregado (thread do Tk)"""
+        self.history.update(file_path, content_hash=digest)
+        if source_id == self.source_id:
+            self.content_hash = digest
+    
+    def _pipeline_key(self, source_id, auto_top_fix, offset_mm):
+        """Chave da etapa de offset; as etapas seguintes acrescentam seus parâmetros"""
+        return (source_id, self.PAPER_WIDTH_PX, auto_top_fix, offset_mm)
+    
+    def _payload_key(self, mode):
+        """
+        Chave dos comandos ESC/POS: hash do conteúdo e todos os parâmetros de processamento e codificação
+        
+        Returns:
+            Chave, ou None se o hash ainda está sendo calculado (sem cache nesse trabalho)
+        """
+        if self.content_hash is None:
+            return None
+        
+        processor = self.image_processor
+        return PayloadStore.make_key(
+            ('mono', mode, processor.mono_threshold, processor.gamma, processor.dither_method)
+            + (self.content_hash, self.PAPER_WIDTH_PX, self.auto_top_fix.get(), self.manual_offset.get())
+            + self.printer_handler.encoding_key()
+        )
+    
+    def _cached_pipeline(self, source, source_id, auto_top_fix, offset_mm, is_cancelled=None):
+        """
+        Executa o pipeline reaproveitando as etapas já calculadas
+        
+        Cada etapa é guardada com a identidade da imagem original e os
+        parâmetros que ela usa; mudar o offset não redimensiona de novo.
+        A imagem é convertida para escala de cinza uma única vez, no
+        redimensionamento.
+        
+        Args:
+            is_cancelled: Função sem argumentos verificada entre as etapas;
+                se retornar True o pipeline para e retorna None
+        """
+        processor = self.image_processor
+        
+        # Redimensionar para largura correta (384px), já em escala de cinza
+        resized = self.stage_cache.get_or_compute(
+            ('resized', source_id, self.PAPER_WIDTH_PX),
+            lambda: processor.load_resized(source)
+        )
         
-        # Reprocessar com configurações atuais
-        self.process_image()
+        if not auto_top_fix and offset_mm == 0:
+            return resized
         
-        # Limpar canvas
-        self.preview_canvas.delete("all")
+        # Pedido obsoleto: o redimensionamento fica no cache para o próximo
+        if is_cancelled is not None and is_cancelled():
+            return None
         
-        # Remover placeholder se existir
-        self.preview_canvas.delete("placeholder")
+        # Auto top fix e offset manual em um único buffer
+        return self.stage_cache.get_or_compute(
+            ('offset', source_id, self.PAPER_WIDTH_PX, auto_top_fix, offset_mm),
+            lambda: processor.trim_and_offset(resized, auto_top_fix, offset_mm)
+        )
+    
+    def update_preview(self, immediate=False):
+        """
+        Pede a atualização do preview da imagem
         
-        # Obter dimensões do canvas
-        canvas_width = self.preview_canvas.winfo_width()
-        canvas_height = self.preview_canvas.winfo_height()
+        O processamento roda no PreviewWorker; sequências rápidas de eventos
+        (ex.: segurar o spinbox de offset) viram um único render.
+        """
+        if not self.original_image:
+            return
         
-        # Se o canvas ainda não foi renderizado, usar valores padrão
-        if canvas_width <= 1:
-            canvas_width = 550
-            canvas_height = 600
+        # Capturar as configurações atuais (variáveis Tk só na thread principal)
+        params = (
+            self.original_image,
+            self.source_id,
+            self.auto_top_fix.get(),
+            self.manual_offset.get(),
+        )
+        self.preview_worker.request(params, immediate=immediate)
+    
+    def _render_preview(self, params, is_cancelled):
+        """Reprocessa a imagem para o preview (thread do worker)"""
+        source, source_id, auto_top_fix, offset_mm = params
+        
+        with self._pipeline_lock:
+            # A espera pelo lock (ex.: impressão em andamento) pode tornar o pedido obsoleto
+            if is_cancelled():
+                return None
+            processed = self._cached_pipeline(
+                source, source_id, auto_top_fix, offset_mm, is_cancelled
+            )
         
-        # Criar preview redimensionado para caber no canvas
-        preview_image = self.processed_image.copy()
-        preview_image.thumbnail((canvas_width - 40, canvas_height - 40), Image.Resampling.LANCZOS)
+        if processed is None:
+            return None
         
-        # Converter para PhotoImage
-        self.photo_preview = ImageTk.PhotoImage(preview_image)
+        # As faixas visíveis são redimensionadas pelo viewport, sob demanda
+        return processed, (source_id, auto_top_fix, offset_mm)
+    
+    def _show_preview(self, result):
+        """Mostra o preview pronto no canvas (thread do Tk)"""
+        self.processed_image, key = result
         
-        # Calcular posição centralizada
-        center_x = canvas_width // 2
-        start_y = 30
+        # Limpar canvas (placeholder, borda e barra decorativas)
+        self.preview_canvas.delete("all")
         
-        # Desenhar no canvas (centralizado)
-        self.preview_canvas.create_image(
-            center_x, start_y,
-            anchor=tk.N,
-            image=self.photo_preview
+        # Arquivo novo: zoom de largura total e topo; ajustes mantêm a posição
+        reset = key[0] != self._preview_source
+        self._preview_source = key[0]
+        self.preview_viewport.show(self.processed_image, key, reset=reset)
+        
+        # Altura processada e ajustes atuais no histórico
+        if self.current_file:
+            self.history.update(
+                self.current_file,
+                processed_height=self.processed_image.height,
+                settings={
+                    'auto_top_fix': self.auto_top_fix.get(),
+                    'offset_mm': self.manual_offset.get(),
+                    'mode': IMAGE_CONFIG['default_mode'],
+                    'copies': self.num_copies.get(),
+                    'join_pages': self.join_pages.get(),
+                }
+            )
+        
+        # Atualizar informações
+        height_mm = self.processed_image.height / self.PIXELS_PER_MM
+        pages = f"\nPáginas: {self.page_total} (preview da primeira)" if self.page_total > 1 else ""
+        self.info_label.config(
+            text=f"Dimensões: {self.processed_image.width}x{self.processed_image.height}px\n"
+                 f"Altura: {height_mm:.1f}mm | Largura: {self.PAPER_WIDTH_MM}mm{pages}"
         )
         
-        # Desenhar indicador de topo (linha vermelha)
-        margin = 20
+    def _draw_top_marker(self):
+        """Desenha o indicador de início da impressão acima da imagem do preview"""
+        self.preview_canvas.delete("top_marker")
+        left, top, right = self.preview_viewport.image_bounds()
+        
+        # Linha vermelha na altura de Y=0, na largura da imagem
         self.preview_canvas.create_line(
-            margin, start_y, canvas_width - margin, start_y,
+            left, top, right, top,
             fill="red",
             width=2,
-            dash=(5, 5)
+            dash=(5, 5),
+            tags="top_marker"
         )
         
         # Texto indicador de topo
         self.preview_canvas.create_text(
-            center_x, start_y - 20,
+            (left + right) // 2, top - 20,
             text="INÍCIO DA IMPRESSÃO (Y=0)",
             fill="red",
             font=("MS Sans Serif", 7, "bold"),
-            anchor=tk.N
-        )
-        
-        # Atualizar informações
-        height_mm = self.processed_image.height / self.PIXELS_PER_MM
-        self.info_label.config(
-            text=f"Dimensões: {self.processed_image.width}x{self.processed_image.height}px\n"
-                 f"Altura: {height_mm:.1f}mm | Largura: {self.PAPER_WIDTH_MM}mm"
+            anchor=tk.N,
+            tags="top_marker"
         )
-        
-        # Atualizar barra de progresso decorativa (simular 100%)
-        canvas_width = self.preview_canvas.winfo_width()
-        if canvas_width > 1:
-            self.preview_canvas.coords(self.progress_bar, 20, 580, canvas_width - 20, 595)
     
     def print_image(self):
-        """Envia imagem para impressão"""
-        if not self.processed_image:
+        """Envia imagem para a fila de impressão (sem bloquear a interface)"""
+        if not self.original_image:
             messagebox.showwarning("Aviso", "Carregue uma imagem primeiro!")
             return
         
+        if self.page_total > 1:
+            self.print_document()
+            return
+        
         try:
-            # Converter para monocromático para impressão térmica
-            print_image = self.image_processor.convert_to_monochrome(self.processed_image)
+            # Etapas que ainda não estão em cache são medidas para este trabalho
+            timings = JobTimings(os.path.basename(self.current_file or ""))
+            mode = IMAGE_CONFIG['default_mode']
+            
+            # Reimpressão: o spooler busca os comandos ESC/POS já gravados com esta chave
+            cache_key = self._payload_key(mode)
+            
+            # Processamento e conversão rodam na thread de codificação do
+            # spooler; aqui só capturamos os controles atuais (variáveis Tk)
+            params = (
+                self.original_image,
+                self.source_id,
+                self.auto_top_fix.get(),
+                self.manual_offset.get(),
+                mode,
+            )
             
             # Obter quantidade de cópias
             num_copies = self.num_copies.get()
             
-            # Imprimir múltiplas cópias
-            success_count = 0
-            for i in range(num_copies):
-                success = self.printer_handler.print_image(print_image)
-                if success:
-                    success_count += 1
+            # Um único trabalho: a imagem é codificada uma vez para todas as cópias
+            self.print_spooler.submit(
+                None,
+                copies=num_copies,
+                on_status=lambda job_id, status, error: self._post_ui(
+                    lambda: self._on_print_status(num_copies, job_id, status, error, timings)
+                ),
+                timings=timings,
+                cache_key=cache_key,
+                render=lambda: self._render_print_image(*params)
+            )
             
-            if success_count == num_copies:
-                messagebox.showinfo("Sucesso", f"{num_copies} cópia(s) enviada(s) com sucesso!")
-            elif success_count > 0:
-                messagebox.showwarning("Parcial", f"{success_count} de {num_copies} cópia(s) impressa(s)")
-            else:
-                messagebox.showerror("Erro", "Falha ao enviar para impressora")
+            self.print_status_label.config(text=f"{num_copies} cópia(s) na fila de impressão")
                 
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao imprimir: {str(e)}")
     
+    def _render_print_image(self, source, source_id, auto_top_fix, offset_mm, mode):
+        """Imagem monocromática para impressão, com as etapas em cache (thread do spooler)"""
+        with self._pipeline_lock:
+            processed = self._cached_pipeline(source, source_id, auto_top_fix, offset_mm)
+        
+        # Converter para monocromático para impressão térmica
+        return self.stage_cache.get_or_compute(
+            ('mono', mode) + self._pipeline_key(source_id, auto_top_fix, offset_mm),
+            lambda: self.image_processor.convert_to_monochrome(processed, mode)
+        )
+    
+    def print_document(self):
+        """
+        Imprime todas as páginas do TIFF/PDF carregado, uma página por vez
+        
+        Unidas, as páginas formam um único trabalho em streaming; separadas,
+        cada página é processada só depois que a anterior foi enviada.
+        """
+        path = self.current_file
+        num_copies = self.num_copies.get()
+        mode = IMAGE_CONFIG['default_mode']
+        
+        if self.join_pages.get():
+            timings = JobTimings(os.path.basename(path))
+            self.print_spooler.submit(
+                document_source.iter_joined_bands(path, self.image_processor, mode),
+                copies=num_copies,
+                on_status=lambda job_id, status, error: self._post_ui(
+                    lambda: self._on_print_status(num_copies, job_id, status, error, timings)
+                ),
+                timings=timings,
+                stream=True
+            )
+            self.print_status_label.config(text=f"{self.page_total} página(s) unidas na fila de impressão")
+            return
+        
+        threading.Thread(
+            target=self._submit_pages,
+            args=(path, num_copies, self.auto_top_fix.get(), self.manual_offset.get(), mode),
+            name="document-pages",
+            daemon=True
+        ).start()
+        self.print_status_label.config(text=f"{self.page_total} página(s) na fila de impressão")
+    
+    def _submit_pages(self, path, num_copies, auto_top_fix, offset_mm, mode):
+        """Envia as páginas ao spooler, uma de cada vez (thread de documento)"""
+        try:
+            pages = document_source.iter_processed_pages(
+                path, self.image_processor, auto_top_fix, offset_mm, mode
+            )
+            for number, page in enumerate(pages, 1):
+                timings = JobTimings(f"{os.path.basename(path)} p{number}")
+                job_id = self.print_spooler.submit(
+                    page,
+                    copies=num_copies,
+                    on_status=lambda job_id, status, error, timings=timings: self._post_ui(
+                        lambda: self._on_print_status(num_copies, job_id, status, error, timings)
+                    ),
+                    timings=timings
+                )
+                del page
+                
+                # A próxima página só é decodificada depois do envio desta
+                if self.print_spooler.wait(job_id) != JOB_DONE:
+                    return
+        except Exception as e:
+            # e deixa de existir ao fim do except: a mensagem é montada agora
+            message = f"Erro ao imprimir documento: {str(e)}"
+            self._post_ui(lambda: messagebox.showerror("Erro", message))
+    
+    def _on_print_status(self, num_copies, job_id, status, error, timings=None):
+        """Atualiza a interface com o estado de um trabalho do spooler (thread do Tk)"""
+        if timings is not None and status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED):
+            self.timings_label.config(
+                text=f"Último trabalho ({timings.total * 1000:.0f} ms): {timings.summary()}"
+            )
+        
+        if status == JOB_SENDING:
+            self.print_status_label.config(text=f"Enviando trabalho #{job_id} ({num_copies} cópia(s))...")
+        elif status == JOB_DONE:
+            self.print_status_label.config(text=f"{num_copies} cópia(s) enviada(s) com sucesso!")
+        elif status == JOB_CANCELLED:
+            self.print_status_label.config(text=f"Trabalho #{job_id} cancelado")
+        elif status == JOB_FAILED:
+            self.print_status_label.config(text="Falha ao enviar para impressora")
+            detail = f"\n{error}" if error else ""
+            messagebox.showerror("Erro", f"Falha ao enviar para impressora{detail}")
+    
+    def _start_thumbnail_loading(self):
+        """Carrega as miniaturas do histórico em segundo plano"""
+        paths = self.image_history[:len(self.thumbnail_buttons)]
+        threading.Thread(
+            target=self._load_thumbnails,
+            args=(list(zip(self.thumbnail_buttons, paths)),),
+            name="thumbnail-loader",
+            daemon=True
+        ).start()
+    
+    def _load_thumbnails(self, items):
+        """Gera ou lê do cache cada miniatura (thread de carregamento)"""
+        for btn, img_path in items:
+            try:
+                thumbnail = self.thumbnail_cache.get(img_path)
+            except Exception:
+                # Arquivo removido ou ilegível: tirar o botão
+                self._post_ui(lambda b=btn: self._remove_thumbnail(b))
+                continue
+            
+            self._post_ui(lambda b=btn, t=thumbnail: self._set_thumbnail(b, t))
+    
+    def _set_thumbnail(self, btn, thumbnail):
+        """Troca o placeholder pela miniatura (thread do Tk)"""
+        photo = ImageTk.PhotoImage(thumbnail)
+        btn.config(image=photo)
+        btn.image = photo  # Manter referência
+    
+    def _remove_thumbnail(self, btn):
+        """Remove o botão de uma imagem que não pode ser carregada (thread do Tk)"""
+        btn.destroy()
+        if btn in self.thumbnail_buttons:
+            self.thumbnail_buttons.remove(btn)
+    
+    def _post_ui(self, callback):
+        """Agenda um callback vindo de outra thread para a thread do Tk"""
+        self._ui_events.put(callback)
+    
+    def _poll_ui_events(self):
+        """Executa os callbacks pendentes de outras threads"""
+        while True:
+            try:
+                callback = self._ui_events.get_nowait()
+            except queue.Empty:
+                break
+            callback()
+        
+        self.root.after(100, self._poll_ui_events)
+    
+
+def startup_check(argv):
+    """
+    Mede o tempo até a janela estar desenhada e falha se passar do orçamento
+    
+    A abertura é medida em um processo novo (main.py --startup-probe), do
+    momento em que ele é criado até a janela estar desenhada, incluindo a
+    inicialização do interpretador e os imports.
+    
+    Uso: python main.py --startup-check [orçamento_ms]
+    
+    Returns:
+        Código de saída (0 = dentro do orçamento, 1 = acima)
+    """
+    import subprocess
+    import time
+    
+    budget_ms = float(argv[0]) if argv else UI_CONFIG['startup_budget_ms']
+    
+    # Executável gerado pelo PyInstaller: ele próprio é o aplicativo
+    command = [sys.executable] if getattr(sys, 'frozen', False) else [sys.executable, os.path.abspath(__file__)]
+    
+    start = time.perf_counter()
+    probe = subprocess.Popen(command + ['--startup-probe'], stdout=subprocess.PIPE, text=True)
+    # Outras mensagens na saída do processo são ignoradas
+    ready = False
+    for line in probe.stdout:
+        if line.strip() == 'ready':
+            ready = True
+            break
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    loaded = probe.stdout.readline().split()
+    probe.wait()
+    
+    if not ready:
+        print(f"FALHOU: a janela não abriu (código {probe.returncode})")
+        return 1
+    
+    print(f"Tempo até a janela: {elapsed_ms:.0f} ms (orçamento: {budget_ms:.0f} ms)")
+    
+    # Módulos que deveriam ser carregados só no primeiro uso
+    if loaded:
+        print(f"Aviso: carregados na abertura: {', '.join(loaded)}")
+    
+    if elapsed_ms > budget_ms:
+        print("FALHOU: abertura acima do orçamento")
+        return 1
+    
+    return 0
+
+
+def startup_probe():
+    """
+    Processo medido por startup_check: abre a janela, avisa e fecha
+    
+    Escreve 'ready' assim que a janela está desenhada e, na linha seguinte,
+    os módulos pesados que já foram carregados.
+    """
+    enable_dpi_awareness()
+    from tkinterdnd2 import TkinterDnD
+    root = TkinterDnD.Tk()
+    TopStartThermalApp(root)
+    root.update()
+    print('ready', flush=True)
+    
+    loaded = [name for name in ('numpy', 'escpos', 'win32print', 'PIL.ImageWin') if name in sys.modules]
+    print(' '.join(loaded), flush=True)
+    root.destroy()
+    return 0
 
 
 def main():
+    # Logging: ZEROTOP_LOG=DEBUG mostra os tempos de cada etapa
+    instrumentation.configure_logging()
+    
+    # Modo batch: processa arquivos sem abrir a interface
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    
+    # Pasta monitorada (sem interface)
+    if len(sys.argv) > 1 and sys.argv[1] == '--watch':
+        from hot_folder import main as watch_main
+        sys.exit(watch_main(sys.argv[2:]))
+    
+    # Verificação do tempo de abertura
+    if len(sys.argv) > 1 and sys.argv[1] == '--startup-check':
+        sys.exit(startup_check(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == '--startup-probe':
+        sys.exit(startup_probe())
+    
     # Habilitar DPI awareness ANTES de criar a janela Tkinter
     enable_dpi_awareness()
     
+    from tkinterdnd2 import TkinterDnD
     root = TkinterDnD.Tk()
     app = TopStartThermalApp(root)
     root.mainloop()
+    
+    # Gravações pendentes do histórico
+    app.history.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""
+Backend de rede para TopStart Thermal
+Envia comandos ESC/POS para impressoras Ethernet (socket RAW, porta 9100)
+"""
+
+import select
+import socket
+import threading
+import time
+from config import NETWORK_CONFIG
+from instrumentation import logger
+
+
+class ConnectionPool:
+    def __init__(self, connect_timeout=None, write_timeout=None, idle_timeout=None, max_idle=None,
+                 send_buffer=None):
+        """
+        Inicializa o pool de conexões TCP (mantém sockets abertos entre trabalhos)
+        
+        Args:
+            connect_timeout: Tempo máximo para conectar, em segundos
+            write_timeout: Tempo máximo de cada escrita, em segundos
+            idle_timeout: Sockets parados há mais tempo que isso são fechados
+            max_idle: Máximo de sockets ociosos guardados por impressora
+            send_buffer: Buffer de envio de cada socket, em bytes (0 = padrão do sistema)
+        """
+        self.connect_timeout = connect_timeout or NETWORK_CONFIG['connect_timeout']
+        self.write_timeout = write_timeout or NETWORK_CONFIG['write_timeout']
+        self.idle_timeout = idle_timeout or NETWORK_CONFIG['idle_timeout']
+        self.max_idle = max_idle or NETWORK_CONFIG['max_idle_connections']
+        self.send_buffer = NETWORK_CONFIG['send_buffer_kb'] * 1024 if send_buffer is None else send_buffer
+        self._idle = {}  # (host, port) -> [(socket, instante em que ficou ocioso)]
+        self._lock = threading.Lock()
+    
+    def acquire(self, host, port):
+        """
+        Obtém uma conexão com a impressora, reaproveitando uma ociosa se possível
+        
+        Args:
+            host: Endereço da impressora
+            port: Porta TCP
+        
+        Returns:
+            Tupla (socket, reaproveitado)
+        """
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                idle = self._idle.get((host, port))
+                if not idle:
+                    break
+                sock, since = idle.pop()
+            
+            if now - since <= self.idle_timeout and self._is_alive(sock):
+                return sock, True
+            self.discard(sock)
+        
+        sock = socket.create_connection((host, port), timeout=self.connect_timeout)
+        sock.settimeout(self.write_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self.send_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        return sock, False
+    
+    def release(self, host, port, sock):
+        """
+        Devolve uma conexão saudável ao pool
+        
+        Args:
+            host: Endereço da impressora
+            port: Porta TCP
+            sock: Socket usado no trabalho
+        """
+        with self._lock:
+            idle = self._idle.setdefault((host, port), [])
+            if len(idle) < self.max_idle:
+                idle.append((sock, time.monotonic()))
+                return
+        
+        self.discard(sock)
+    
+    def discard(self, sock):
+        """Fecha uma conexão sem devolvê-la ao pool"""
+        try:
+            sock.close()
+        except OSError:
+            pass
+    
+    def close_all(self):
+        """Fecha todas as conexões ociosas"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        
+        for sockets in idle.values():
+            for sock, _ in sockets:
+                self.discard(sock)
+    
+    def _is_alive(self, sock):
+        """
+        Verifica se a impressora não fechou a conexão enquanto estava ociosa
+        
+        Bytes de status enviados pela impressora são descartados.
+        """
+        try:
+            while True:
+                readable, _, _ = select.select([sock], [], [], 0)
+                if not readable:
+                    return True
+                if not sock.recv(4096):
+                    return False
+        except OSError:
+            return False
+
+
+# Pool compartilhado: conexões sobrevivem entre trabalhos e instâncias do backend
+_default_pool = ConnectionPool()
+
+
+class NetworkPrinterBackend:
+    def __init__(self, host, port=None, pool=None):
+        """
+        Inicializa o backend para uma impressora de rede
+        
+        Args:
+            host: Endereço da impressora
+            port: Porta TCP (padrão: 9100)
+            pool: ConnectionPool (padrão: pool compartilhado do módulo)
+        """
+        self.host = host
+        self.port = port or NETWORK_CONFIG['port']
+        self.pool = pool or _default_pool
+    
+    def __repr__(self):
+        return f"NetworkPrinterBackend({self.host}:{self.port})"
+    
+    def send(self, chunks):
+        """
+        Envia comandos ESC/POS pela conexão TCP
+        
+        Cada bloco é escrito diretamente no socket, sem concatenar nem
+        copiar os buffers. Se uma conexão reaproveitada falhar antes do
+        primeiro bloco ser entregue, reconecta e tenta de novo; falhas no
+        meio do trabalho não são repetidas para não imprimir partes em
+        duplicidade.
+        
+        Args:
+            chunks: Iterável de bytes
+        
+        Returns:
+            True se sucesso, False caso contrário
+        """
+        try:
+            sock, reused = self.pool.acquire(self.host, self.port)
+        except OSError as e:
+            logger.error("Erro ao conectar em %s:%s: %s", self.host, self.port, e)
+            return False
+        
+        sent_any = False
+        try:
+            for chunk in chunks:
+                try:
+                    sock.sendall(chunk)
+                except OSError:
+                    if sent_any or not reused:
+                        raise
+                    # Conexão antiga derrubada pela impressora: reconectar uma vez
+                    self.pool.discard(sock)
+                    sock, reused = self.pool.acquire(self.host, self.port)
+                    sock.sendall(chunk)
+                sent_any = True
+        
+        except OSError as e:
+            self.pool.discard(sock)
+            logger.error("Erro ao enviar para %s:%s: %s", self.host, self.port, e)
+            return False
+        
+        except BaseException:
+            # Erro ao gerar os blocos: o trabalho ficou pela metade
+            self.pool.discard(sock)
+            raise
+        
+        self.pool.release(self.host, self.port, sock)
+        return True
+    
+    def probe(self):
+        """
+        Verifica se a impressora aceita conexões (sem enviar nada)
+        
+        Returns:
+            True se a conexão foi aberta (ou reaproveitada), False caso contrário
+        """
+        try:
+            sock, _ = self.pool.acquire(self.host, self.port)
+        except OSError:
+            return False
+        
+        self.pool.release(self.host, self.port, sock)
+        return True
@@ -0,0 +1,444 @@
+"""
+Worker de preview para TopStart Thermal
+Processa o preview fora da thread do Tk, com debounce e cancelamento, e
+desenha só as faixas visíveis da imagem processada, com scroll e zoom
+"""
+
+import math
+import queue
+import threading
+from PIL import Image, ImageTk
+from config import CACHE_CONFIG, UI_CONFIG
+from image_cache import StageCache
+
+
+class PreviewWorker:
+    def __init__(self, root, render, on_result, on_error=None, debounce_ms=120, poll_ms=30):
+        """
+        Inicializa o worker de preview
+        
+        Args:
+            root: Janela Tk (usada para agendar callbacks com root.after)
+            render: Função (params, is_cancelled) executada na thread do worker;
+                deve retornar o resultado ou None se foi cancelada
+            on_result: Callback chamado na thread do Tk com o resultado mais recente
+            on_error: Callback chamado na thread do Tk com a exceção do render
+            debounce_ms: Espera antes de renderizar; pedidos nesse intervalo são agrupados
+            poll_ms: Intervalo de verificação de resultados prontos
+        """
+        self.root = root
+        self.render = render
+        self.on_result = on_result
+        self.on_error = on_error
+        self.debounce_ms = debounce_ms
+        self.poll_ms = poll_ms
+        
+        self._generation = 0
+        self._finished_generation = 0  # Último pedido concluído pela thread
+        self._pending_after = None
+        self._polling = False
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        
+        self._thread = threading.Thread(target=self._run, name="preview-worker", daemon=True)
+        self._thread.start()
+    
+    def request(self, params, immediate=False):
+        """
+        Pede um novo preview (chamar na thread do Tk)
+        
+        Qualquer render anterior ainda não entregue passa a ser descartado.
+        
+        Args:
+            params: Parâmetros repassados à função render
+            immediate: Ignorar o debounce (ex.: imagem recém-carregada)
+        """
+        self._generation += 1
+        generation = self._generation
+        
+        if self._pending_after is not None:
+            self.root.after_cancel(self._pending_after)
+        
+        delay = 0 if immediate else self.debounce_ms
+        self._pending_after = self.root.after(delay, lambda: self._submit(generation, params))
+    
+    def is_current(self, generation):
+        """Indica se a geração ainda é a do pedido mais recente"""
+        return generation == self._generation
+    
+    def _submit(self, generation, params):
+        """Envia o pedido ao worker após o debounce"""
+        self._pending_after = None
+        self._requests.put((generation, params))
+        
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+    
+    def _run(self):
+        """Loop da thread do worker"""
+        while True:
+            generation, params = self._requests.get()
+            
+            # Pular pedidos acumulados: só o último interessa
+            while True:
+                try:
+                    generation, params = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+            
+            if self.is_current(generation):
+                try:
+                    result = self.render(params, lambda: not self.is_current(generation))
+                    if result is not None and self.is_current(generation):
+                        self._results.put((generation, result, None))
+                except Exception as e:
+                    self._results.put((generation, None, e))
+            
+            self._finished_generation = generation
+    
+    def _poll(self):
+        """Entrega resultados prontos na thread do Tk"""
+        while True:
+            try:
+                generation, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            
+            # Resultado obsoleto: um pedido mais novo já foi feito
+            if not self.is_current(generation):
+                continue
+            
+            if error is not None:
+                if self.on_error:
+                    self.on_error(error)
+            else:
+                self.on_result(result)
+        
+        # Continuar verificando enquanto houver trabalho pendente
+        busy = (self._pending_after is not None
+                or self._finished_generation != self._generation
+                or not self._results.empty())
+        if busy:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+
+class PreviewTiles:
+    def __init__(self, tile_height=None, max_bytes=None):
+        """
+        Faixas do preview renderizadas sob demanda
+        
+        A imagem processada é dividida em faixas horizontais de altura fixa
+        na tela; cada faixa é redimensionada sozinha e guardada em cache por
+        (imagem, zoom, índice, qualidade). O custo de um redesenho depende
+        do tamanho da área visível, não da altura do recibo.
+        
+        Args:
+            tile_height: Altura das faixas em pixels de tela (padrão: configuração)
+            max_bytes: Memória máxima das faixas guardadas (padrão: configuração)
+        """
+        self.tile_height = tile_height or UI_CONFIG['preview_tile_px']
+        self.cache = StageCache(max_bytes or CACHE_CONFIG['preview_tile_mb'] * 1024 * 1024)
+        self.image = None
+        self.key = None
+    
+    def set_image(self, image, key):
+        """
+        Troca a imagem mostrada
+        
+        Args:
+            image: PIL Image processada (largura do papel)
+            key: Identifica a imagem nas chaves do cache (origem e ajustes)
+        """
+        self.image = image
+        self.key = key
+    
+    def display_size(self, zoom):
+        """Tamanho (largura, altura) da imagem inteira na tela com o zoom"""
+        return max(1, round(self.image.width * zoom)), max(1, round(self.image.height * zoom))
+    
+    def tile_count(self, zoom):
+        """Número de faixas da imagem com o zoom"""
+        return math.ceil(self.display_size(zoom)[1] / self.tile_height)
+    
+    def visible_tiles(self, zoom, top, bottom):
+        """
+        Índices das faixas que cruzam um intervalo vertical da tela
+        
+        Args:
+            zoom: Escala (pixels de tela por pixel da imagem)
+            top, bottom: Intervalo em pixels de tela, a partir do topo da imagem
+        
+        Returns:
+            range de índices
+        """
+        first = max(0, int(top // self.tile_height))
+        last = min(self.tile_count(zoom), int(math.ceil(bottom / self.tile_height)))
+        return range(first, max(first, last))
+    
+    def tile(self, zoom, index, fast=False):
+        """
+        Renderiza (ou busca no cache) uma faixa
+        
+        Args:
+            zoom: Escala (pixels de tela por pixel da imagem)
+            index: Índice da faixa
+            fast: Reamostragem rápida (BOX reduzindo, NEAREST ampliando),
+                usada durante scroll e zoom; senão LANCZOS
+        
+        Returns:
+            PIL Image da faixa, na largura da imagem na tela
+        """
+        quality = 'fast' if fast else 'fine'
+        key = (self.key, zoom, index, quality)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        width, height = self.display_size(zoom)
+        top = index * self.tile_height
+        rows = min(self.tile_height, height - top)
+        
+        # Linhas da imagem de origem cobertas pela faixa (fracionárias)
+        box = (0, top / zoom, self.image.width, min((top + rows) / zoom, self.image.height))
+        if fast:
+            resample = Image.Resampling.BOX if zoom < 1 else Image.Resampling.NEAREST
+        else:
+            resample = Image.Resampling.LANCZOS
+        
+        tile = self.image.resize((width, rows), resample, box=box)
+        self.cache.put(key, tile)
+        return tile
+
+
+class PreviewViewport:
+    def __init__(self, canvas, tiles=None, top_margin=30, refine_ms=None, on_layout=None):
+        """
+        Preview com scroll e zoom em um tk.Canvas
+        
+        Só as faixas visíveis (e uma a mais de cada lado) ficam no canvas.
+        Durante scroll e zoom as faixas novas saem com reamostragem rápida;
+        depois de refine_ms sem interação as visíveis são refeitas em alta
+        qualidade. Roda: scroll vertical; Shift+roda: horizontal;
+        Ctrl+roda: zoom em torno do cursor.
+        
+        Args:
+            canvas: tk.Canvas (com xscrollcommand/yscrollcommand já ligados às barras)
+            tiles: PreviewTiles (padrão: um novo)
+            top_margin: Espaço acima da imagem, em pixels de tela
+            refine_ms: Ociosidade antes do refinamento (padrão: configuração)
+            on_layout: Chamado sem argumentos quando a posição ou o tamanho da
+                imagem muda (para redesenhar indicadores, ver image_bounds)
+        """
+        self.canvas = canvas
+        self.tiles = tiles or PreviewTiles()
+        self.top_margin = top_margin
+        self.refine_ms = UI_CONFIG['preview_refine_ms'] if refine_ms is None else refine_ms
+        self.on_layout = on_layout
+        self.zoom = None
+        self._left = 0
+        self._items = {}  # índice -> (id no canvas, PhotoImage, rápida?)
+        self._refine_after = None
+        
+        canvas.bind('<Configure>', self._on_resize, add='+')
+        canvas.bind('<MouseWheel>', self._on_wheel)
+        canvas.bind('<Shift-MouseWheel>', lambda event: self._on_wheel(event, horizontal=True))
+        canvas.bind('<Control-MouseWheel>', self._on_zoom_wheel)
+        # X11: a roda chega como botões 4 e 5
+        canvas.bind('<Button-4>', lambda event: self._scroll(-1))
+        canvas.bind('<Button-5>', lambda event: self._scroll(1))
+        canvas.bind('<Control-Button-4>', lambda event: self.zoom_at(self._step(), event.x, event.y))
+        canvas.bind('<Control-Button-5>', lambda event: self.zoom_at(1 / self._step(), event.x, event.y))
+    
+    @property
+    def active(self):
+        return self.tiles.image is not None and self.zoom is not None
+    
+    def _size(self):
+        """Tamanho atual do canvas (valores padrão antes de ser exibido)"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        return (width, height) if width > 1 else (550, 600)
+    
+    def fit_zoom(self):
+        """Zoom que faz a imagem ocupar a largura do canvas"""
+        width, _ = self._size()
+        return self._clamp((width - 40) / self.tiles.image.width)
+    
+    @staticmethod
+    def _clamp(zoom):
+        # Arredondado: zooms iguais reaproveitam as faixas do cache
+        zoom = min(max(zoom, UI_CONFIG['preview_zoom_min']), UI_CONFIG['preview_zoom_max'])
+        return round(zoom, 3)
+    
+    @staticmethod
+    def _step():
+        return UI_CONFIG['preview_zoom_step']
+    
+    def show(self, image, key, reset=False):
+        """
+        Mostra uma imagem processada
+        
+        Args:
+            image: PIL Image processada
+            key: Identifica a imagem nas chaves do cache de faixas
+            reset: Voltar ao zoom de largura total e ao topo (ex.: arquivo novo);
+                senão zoom e posição são mantidos (ex.: mudança de offset)
+        """
+        self.tiles.set_image(image, key)
+        self._clear()
+        if reset or self.zoom is None:
+            self.zoom = self.fit_zoom()
+            self._update_scrollregion()
+            self.canvas.xview_moveto(0)
+            self.canvas.yview_moveto(0)
+        else:
+            self._update_scrollregion()
+        self.redraw(fast=False)
+    
+    def _clear(self):
+        """Remove as faixas desenhadas"""
+        self.canvas.delete('preview_tile')
+        self._items.clear()
+    
+    def _update_scrollregion(self):
+        """Ajusta a área rolável ao tamanho da imagem com o zoom atual"""
+        canvas_width, _ = self._size()
+        width, height = self.tiles.display_size(self.zoom)
+        # Imagem mais estreita que o canvas fica centralizada
+        self._left = max(20, (canvas_width - width) // 2)
+        self.canvas.configure(scrollregion=(
+            0, 0, max(canvas_width, width + 2 * self._left), height + self.top_margin + 20
+        ))
+        if self.on_layout:
+            self.on_layout()
+    
+    def image_bounds(self):
+        """Posição da imagem no canvas: (esquerda, topo, direita) em coordenadas do canvas"""
+        width, _ = self.tiles.display_size(self.zoom)
+        return self._left, self.top_margin, self._left + width
+    
+    def redraw(self, fast=True):
+        """
+        Desenha as faixas visíveis
+        
+        Args:
+            fast: Faixas ainda não desenhadas saem com reamostragem rápida e o
+                refinamento é agendado; com False todas as visíveis ficam em
+                alta qualidade
+        """
+        if not self.active:
+            return
+        
+        _, canvas_height = self._size()
+        view_top = self.canvas.canvasy(0) - self.top_margin
+        margin = self.tiles.tile_height
+        wanted = self.tiles.visible_tiles(
+            self.zoom, view_top - margin, view_top + canvas_height + margin
+        )
+        
+        # Faixas que saíram da área visível liberam o canvas
+        for index in [index for index in self._items if index not in wanted]:
+            self.canvas.delete(self._items.pop(index)[0])
+        
+        pending = False
+        for index in wanted:
+            current = self._items.get(index)
+            if current is not None and (fast or not current[2]):
+                pending = pending or current[2]
+                continue
+            
+            tile = self.tiles.tile(self.zoom, index, fast=fast)
+            photo = ImageTk.PhotoImage(tile)
+            if current is not None:
+                self.canvas.itemconfigure(current[0], image=photo)
+                item = current[0]
+            else:
+                item = self.canvas.create_image(
+                    self._left, self.top_margin + index * self.tiles.tile_height,
+                    anchor='nw', image=photo, tags='preview_tile'
+                )
+                # Indicadores (linha de topo etc.) continuam por cima
+                self.canvas.tag_lower(item)
+            self._items[index] = (item, photo, fast)
+            pending = pending or fast
+        
+        if self._refine_after is not None:
+            self.canvas.after_cancel(self._refine_after)
+            self._refine_after = None
+        if pending:
+            self._refine_after = self.canvas.after(self.refine_ms, self._refine)
+    
+    def _refine(self):
+        """Refaz as faixas visíveis em alta qualidade após a interação"""
+        self._refine_after = None
+        self.redraw(fast=False)
+    
+    def _on_resize(self, event):
+        if not self.active:
+            return
+        # A centralização depende da largura do canvas
+        self._clear()
+        self._update_scrollregion()
+        self.redraw(fast=True)
+    
+    def _on_wheel(self, event, horizontal=False):
+        # Windows/macOS: delta em múltiplos de 120 (ou 1 no macOS)
+        units = -1 if event.delta > 0 else 1
+        self._scroll(units * max(1, abs(event.delta) // 120), horizontal)
+    
+    def _on_zoom_wheel(self, event):
+        factor = self._step() if event.delta > 0 else 1 / self._step()
+        self.zoom_at(factor, event.x, event.y)
+    
+    def _scroll(self, units, horizontal=False):
+        if not self.active:
+            return
+        if horizontal:
+            self.canvas.xview_scroll(units * 3, 'units')
+        else:
+            self.canvas.yview_scroll(units * 3, 'units')
+        self.redraw(fast=True)
+    
+    def on_scrollbar(self, view, *args):
+        """
+        Comando das barras de rolagem
+        
+        Args:
+            view: canvas.xview ou canvas.yview
+            *args: Argumentos repassados pela barra
+        """
+        view(*args)
+        self.redraw(fast=True)
+    
+    def zoom_at(self, factor, x, y):
+        """
+        Multiplica o zoom mantendo fixo o ponto sob o cursor
+        
+        Args:
+            factor: Fator de zoom (>1 aproxima)
+            x, y: Posição do cursor no canvas (coordenadas da janela)
+        """
+        if not self.active:
+            return
+        
+        zoom = self._clamp(self.zoom * factor)
+        if zoom == self.zoom:
+            return
+        
+        # Pixel da imagem sob o cursor antes do zoom
+        left, top, _ = self.image_bounds()
+        image_x = (self.canvas.canvasx(x) - left) / self.zoom
+        image_y = (self.canvas.canvasy(y) - top) / self.zoom
+        
+        self.zoom = zoom
+        self._clear()
+        self._update_scrollregion()
+        
+        left, top, _ = self.image_bounds()
+        region = [float(value) for value in self.canvas.cget('scrollregion').split()]
+        self.canvas.xview_moveto(max(0.0, (left + image_x * zoom - x) / region[2]))
+        self.canvas.yview_moveto(max(0.0, (top + image_y * zoom - y) / region[3]))
+        self.redraw(fast=True)
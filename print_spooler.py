@@ -0,0 +1,298 @@
+"""
+Spooler de impressão para TopStart Thermal
+Fila de trabalhos em segundo plano para não bloquear a interface
+"""
+
+import itertools
+import queue
+import threading
+from collections import deque
+import instrumentation
+from config import ESCPOS_COMMANDS
+from instrumentation import JobTimings, logger
+
+# Estados de um trabalho
+JOB_QUEUED = 'queued'
+JOB_SENDING = 'sending'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+
+class PrintJob:
+    def __init__(self, job_id, image, copies=1, copy_separator=None, on_status=None, timings=None,
+                 stream=False, cache_key=None, payload=None, render=None):
+        """
+        Trabalho de impressão na fila do spooler
+        
+        Args:
+            job_id: Identificador do trabalho
+            image: PIL Image monocromática (ou iterável de faixas, com stream=True)
+            copies: Número de cópias (codificadas uma vez, enviadas no mesmo trabalho)
+            copy_separator: Entre cópias: 'cut', 'feed' ou 'none' (padrão: configuração)
+            on_status: Callback (job_id, status, error) chamado a cada mudança de estado
+            timings: JobTimings que recebe os tempos de codificação e envio
+            stream: As faixas são geradas e codificadas durante o envio
+            cache_key: Chave dos comandos codificados no PayloadStore (busca e gravação)
+            payload: Comandos de imagem já codificados (dispensa a imagem)
+            render: Função sem argumentos que gera a imagem na thread de codificação
+        """
+        self.id = job_id
+        self.image = image
+        self.render = render
+        self.stream = stream
+        self.cache_key = cache_key
+        self.payload = payload
+        self.copies = copies
+        self.copy_separator = copy_separator
+        self.on_status = on_status
+        self.timings = timings or JobTimings(f"trabalho {job_id}")
+        self.status = JOB_QUEUED
+        self.error = None
+        self.cancel_requested = False
+        self.finished = threading.Event()
+
+
+class PrintSpooler:
+    def __init__(self, printer_handler, prefetch=2, keep_finished=256, payload_cache=None):
+        """
+        Inicializa o spooler
+        
+        Uma thread codifica os trabalhos em ESC/POS e outra transmite; o
+        próximo trabalho já está codificado quando o atual termina de ser
+        enviado, então trabalhos em sequência saem sem pausas.
+        
+        Args:
+            printer_handler: PrinterHandler usado para codificar e enviar
+            prefetch: Quantos trabalhos codificados podem aguardar o envio
+            keep_finished: Quantos trabalhos concluídos manter para consulta de estado
+            payload_cache: PayloadStore onde guardar os trabalhos com cache_key
+        """
+        self.printer_handler = printer_handler
+        self.payload_cache = payload_cache
+        self._jobs = {}
+        self._finished_ids = deque()
+        self.keep_finished = keep_finished
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._encode_queue = queue.Queue()
+        self._send_queue = queue.Queue(maxsize=prefetch)
+        
+        self._encoder = threading.Thread(target=self._encode_loop, name="spooler-encoder", daemon=True)
+        self._sender = threading.Thread(target=self._send_loop, name="spooler-sender", daemon=True)
+        self._encoder.start()
+        self._sender.start()
+    
+    def submit(self, image, copies=1, copy_separator=None, on_status=None, timings=None, stream=False,
+               cache_key=None, payload=None, render=None):
+        """
+        Adiciona um trabalho à fila sem bloquear
+        
+        Args:
+            image: PIL Image monocromática, ou com stream=True um iterável de
+                faixas monocromáticas (ex.: document_source.iter_joined_bands)
+            copies: Número de cópias (codificadas uma vez, enviadas no mesmo trabalho)
+            copy_separator: Entre cópias: 'cut', 'feed' ou 'none' (padrão: configuração)
+            on_status: Callback (job_id, status, error); chamado na thread do spooler
+            timings: JobTimings com as etapas já medidas (ex.: processamento da imagem)
+            stream: Gerar e codificar as faixas só durante o envio, uma por vez
+                (memória constante para documentos longos)
+            cache_key: Chave no payload_cache: os comandos gravados são reaproveitados
+                (sem chamar render) e os codificados agora são guardados
+            payload: Comandos de imagem já codificados (ex.: PayloadStore.get);
+                nesse caso image pode ser None e nada é codificado de novo
+            render: Função sem argumentos que gera a imagem monocromática;
+                roda na thread de codificação (image pode ser None), então
+                quem envia não espera o processamento
+        
+        Returns:
+            ID do trabalho
+        """
+        with self._lock:
+            job = PrintJob(next(self._ids), image, copies, copy_separator, on_status, timings, stream,
+                           cache_key, payload, render)
+            self._jobs[job.id] = job
+        
+        self._notify(job, JOB_QUEUED)
+        self._encode_queue.put(job)
+        return job.id
+    
+    def cancel(self, job_id):
+        """
+        Cancela um trabalho
+        
+        Trabalhos na fila são descartados; durante o envio, a transmissão
+        para no fim do bloco atual e o papel é avançado e cortado.
+        
+        Args:
+            job_id: ID do trabalho
+        
+        Returns:
+            True se o cancelamento foi registrado, False se o trabalho já terminou
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished.is_set():
+            return False
+        
+        job.cancel_requested = True
+        return True
+    
+    def status(self, job_id):
+        """
+        Retorna o estado de um trabalho
+        
+        Args:
+            job_id: ID do trabalho
+        
+        Returns:
+            Estado ('queued', 'sending', 'done', 'failed', 'cancelled') ou None
+        """
+        job = self._jobs.get(job_id)
+        return job.status if job else None
+    
+    def wait(self, job_id, timeout=None):
+        """
+        Aguarda o fim de um trabalho (para scripts e modo sem interface)
+        
+        Args:
+            job_id: ID do trabalho
+            timeout: Tempo máximo em segundos
+        
+        Returns:
+            Estado final do trabalho ou None se o tempo acabou
+        """
+        job = self._jobs.get(job_id)
+        if job is None or not job.finished.wait(timeout):
+            return None
+        return job.status
+    
+    def _notify(self, job, status, error=None):
+        """Atualiza o estado do trabalho e chama o callback"""
+        job.status = status
+        job.error = error
+        
+        if status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED):
+            job.image = None
+            job.render = None
+            instrumentation.finish(job.timings)
+            job.finished.set()
+            with self._lock:
+                self._finished_ids.append(job.id)
+                while len(self._finished_ids) > self.keep_finished:
+                    self._jobs.pop(self._finished_ids.popleft(), None)
+        
+        if job.on_status:
+            try:
+                job.on_status(job.id, status, error)
+            except Exception as e:
+                logger.error("Erro no callback do trabalho %s: %s", job.id, e)
+    
+    def _encode_loop(self):
+        """Thread de codificação: prepara os bytes ESC/POS do próximo trabalho"""
+        while True:
+            job = self._encode_queue.get()
+            if job.cancel_requested:
+                self._notify(job, JOB_CANCELLED)
+                continue
+            
+            # Trabalhos em streaming são codificados durante o envio, faixa por faixa
+            chunks = None
+            raw = not job.stream and self.printer_handler.has_raw_transport()
+            try:
+                with instrumentation.activate(job.timings):
+                    # Reimpressão: comandos gravados dispensam processamento e codificação
+                    # (lidos aqui, não na thread de quem enviou)
+                    if raw and job.payload is None and job.cache_key and self.payload_cache is not None:
+                        job.payload = self.payload_cache.get(job.cache_key)
+                    
+                    # Processamento adiado pelo remetente (desnecessário com payload em cache)
+                    if job.render is not None and job.payload is None:
+                        job.image = job.render()
+                    
+                    if raw:
+                        chunks = list(self.printer_handler.wrap_image_commands(
+                            self._image_commands(job),
+                            copies=job.copies,
+                            copy_separator=job.copy_separator
+                        ))
+            except Exception as e:
+                self._notify(job, JOB_FAILED, e)
+                continue
+            
+            # Bloqueia quando já há trabalhos suficientes aguardando envio
+            self._send_queue.put((job, chunks))
+    
+    def _image_commands(self, job):
+        """Comandos de imagem do trabalho: payload recebido ou codificado agora (e guardado)"""
+        if job.payload is not None:
+            return job.payload
+        
+        body = list(self.printer_handler.iter_image_commands([job.image]))
+        if job.cache_key and self.payload_cache is not None:
+            self.payload_cache.put(job.cache_key, body)
+        return body
+    
+    def _send_loop(self):
+        """Thread de envio: transmite os trabalhos em ordem"""
+        while True:
+            job, chunks = self._send_queue.get()
+            if job.cancel_requested:
+                self._notify(job, JOB_CANCELLED)
+                continue
+            
+            self._notify(job, JOB_SENDING)
+            
+            try:
+                if job.stream:
+                    # Processamento e codificação acontecem durante o envio: sem etapa 'transmit'
+                    with instrumentation.activate(job.timings):
+                        success = self._send_stream(job)
+                else:
+                    with instrumentation.activate(job.timings), instrumentation.span('transmit'):
+                        success = self._send_encoded(job, chunks)
+            except Exception as e:
+                self._notify(job, JOB_FAILED, e)
+                continue
+            
+            if job.cancel_requested:
+                self._notify(job, JOB_CANCELLED)
+            elif success:
+                self._notify(job, JOB_DONE)
+            else:
+                self._notify(job, JOB_FAILED)
+    
+    def _send_encoded(self, job, chunks):
+        """Envia um trabalho já codificado (ou imprime a imagem sem transporte RAW)"""
+        if chunks is not None:
+            return self.printer_handler.send_raw(self._chunks_until_cancelled(job, chunks))
+        return self.printer_handler.print_image(job.image, job.copies, job.copy_separator)
+    
+    def _send_stream(self, job):
+        """Codifica e envia as faixas de um trabalho em streaming à medida que são geradas"""
+        if not self.printer_handler.has_raw_transport():
+            return self.printer_handler.print_stream(job.image, job.copies, job.copy_separator)
+        
+        chunks = self.printer_handler.iter_esc_pos_chunks(
+            job.image,
+            copies=job.copies,
+            copy_separator=job.copy_separator
+        )
+        return self.printer_handler.send_raw(self._stream_until_cancelled(job, chunks))
+    
+    def _stream_until_cancelled(self, job, chunks):
+        """Repassa os blocos até um cancelamento; nesse caso termina com avanço e corte"""
+        for chunk in chunks:
+            if job.cancel_requested:
+                chunks.close()
+                yield ESCPOS_COMMANDS['feed_2'] + ESCPOS_COMMANDS['cut']
+                return
+            yield chunk
+    
+    def _chunks_until_cancelled(self, job, chunks):
+        """Repassa os blocos até um cancelamento; o rodapé (avanço e corte) sempre é enviado"""
+        for chunk in chunks[:-1]:
+            if job.cancel_requested:
+                break
+            yield chunk
+        
+        yield chunks[-1]
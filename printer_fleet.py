@@ -0,0 +1,506 @@
+"""
+Várias impressoras para TopStart Thermal
+Distribui os trabalhos entre impressoras iguais com asyncio: balanceamento
+pela fila e pela velocidade medida, desvio das impressoras com falha e
+afinidade por grupo (ex.: pedidos da cozinha -> impressora da cozinha)
+
+Uso:
+    python printer_fleet.py                          # Demonstração com 3 impressoras simuladas
+    python printer_fleet.py --speeds 30000,30000,10000 --jobs 90 --fail 1
+    python printer_fleet.py --printer 192.168.0.50 --printer 192.168.0.51 --jobs 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from collections import deque
+from PIL import Image
+from config import FLEET_CONFIG, PRINTER_CONFIG
+import instrumentation
+from instrumentation import logger
+from network_printer import NetworkPrinterBackend
+from printer_handler import PrinterHandler
+from stand_in_printer import StandInPrinter
+from print_spooler import JOB_QUEUED, JOB_SENDING, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+
+
+class FleetJob:
+    def __init__(self, job_id, done, group=None, image=None, chunks=None, copies=1):
+        """
+        Trabalho distribuído entre as impressoras
+        
+        Args:
+            job_id: Número do trabalho; também é a ordem de envio dentro do grupo
+            done: asyncio.Future resolvido com True (impresso) ou False
+            group: Grupo de afinidade (None = sem ordem garantida)
+            image: PIL Image monocromática (codificada na hora do envio)
+            chunks: Comandos ESC/POS já codificados (dispensa a imagem)
+            copies: Número de cópias (só com image)
+        """
+        self.id = job_id
+        self.done = done
+        self.group = group
+        self.image = image
+        self.chunks = chunks
+        self.copies = copies
+        self.status = JOB_QUEUED
+        self.printer = None  # Nome da impressora que recebeu o trabalho
+        self.attempts = 0
+        
+        if chunks is not None:
+            self.size = sum(len(chunk) for chunk in chunks)
+        else:
+            # Estimativa até a codificação: uma linha raster por linha da imagem
+            self.size = (image.width + 7) // 8 * image.height * copies
+
+
+class FleetPrinter:
+    def __init__(self, name, backend, bytes_per_s=None):
+        """
+        Uma impressora da frota
+        
+        Args:
+            name: Nome usado nas regras de afinidade e nos logs
+            backend: Objeto com send(chunks) -> bool e, opcionalmente,
+                probe() -> bool (ex.: NetworkPrinterBackend)
+            bytes_per_s: Velocidade inicial estimada (padrão: configuração)
+        """
+        self.name = name
+        self.backend = backend
+        # Velocidade: bytes e segundos dos últimos envios, com peso decrescente
+        self._window_bytes = bytes_per_s or FLEET_CONFIG['initial_bytes_per_s']
+        self._window_seconds = 1.0
+        self.healthy = True
+        self.queue = deque()
+        self.current = None
+        self.jobs_done = 0
+        self.bytes_sent = 0
+        self.failures = 0
+        self.wake = asyncio.Event()
+    
+    def __repr__(self):
+        return f"FleetPrinter({self.name})"
+    
+    @property
+    def bytes_per_s(self):
+        """Velocidade medida"""
+        return self._window_bytes / self._window_seconds
+    
+    @property
+    def backlog_bytes(self):
+        """Bytes na fila, incluindo o trabalho sendo enviado"""
+        current = self.current.size if self.current is not None else 0
+        return current + sum(job.size for job in self.queue)
+    
+    def expected_wait(self, size=0):
+        """Segundos estimados até terminar a fila e mais `size` bytes"""
+        return (self.backlog_bytes + size) / self.bytes_per_s
+    
+    def record(self, size, seconds, measure=True):
+        """
+        Registra um envio concluído
+        
+        Args:
+            size: Bytes enviados
+            seconds: Duração do envio
+            measure: Atualizar a velocidade medida
+        """
+        self.jobs_done += 1
+        self.bytes_sent += size
+        if measure:
+            # Razão das somas: envios curtos (absorvidos pelos buffers) pesam pouco
+            decay = 1 - FLEET_CONFIG['throughput_alpha']
+            self._window_bytes = self._window_bytes * decay + size
+            self._window_seconds = self._window_seconds * decay + seconds
+    
+    def probe(self):
+        """Testa a impressora (thread); sem probe no backend, considera disponível"""
+        probe = getattr(self.backend, 'probe', None)
+        return probe() if probe is not None else True
+
+
+class PrinterFleet:
+    def __init__(self, printers, affinity=None, printer_handler=None, prefetch=None, max_attempts=None,
+                 health_interval_s=None):
+        """
+        Distribui trabalhos entre impressoras iguais
+        
+        Cada impressora tem uma fila curta e uma tarefa asyncio que envia
+        um trabalho por vez (o envio em si roda em uma thread). Os demais
+        trabalhos aguardam em ordem e vão para a impressora que fica livre,
+        escolhida pela fila e pela velocidade medida: impressoras mais
+        rápidas recebem mais trabalhos.
+        
+        Trabalhos do mesmo grupo saem na ordem em que foram enviados:
+        enquanto um grupo tem trabalho pendente, os seguintes vão para a
+        mesma impressora. Com afinidade, o grupo usa as impressoras
+        indicadas enquanto houver uma saudável.
+        
+        Uma falha de envio tira a impressora da frota: o trabalho e a fila
+        dela voltam para a espera, na ordem original, e a impressora é
+        testada a cada health_interval_s até voltar. Sem nenhuma impressora
+        saudável, os trabalhos aguardam.
+        
+        Os métodos devem ser chamados na thread do loop; de outras threads
+        use asyncio.run_coroutine_threadsafe(fleet.print(...), loop).
+        
+        Args:
+            printers: Lista de FleetPrinter
+            affinity: Grupo -> nome ou lista de nomes de impressoras (padrão: configuração)
+            printer_handler: PrinterHandler usado para codificar as imagens
+            prefetch: Trabalhos na fila de cada impressora além do atual (padrão: configuração)
+            max_attempts: Envios de um trabalho antes de desistir (padrão: configuração)
+            health_interval_s: Intervalo dos testes das impressoras com falha (padrão: configuração)
+        
+        Raises:
+            ValueError: Se não houver impressoras ou a afinidade citar uma desconhecida
+        """
+        if not printers:
+            raise ValueError("Nenhuma impressora na frota")
+        
+        self.printers = {printer.name: printer for printer in printers}
+        affinity = FLEET_CONFIG['affinity'] if affinity is None else affinity
+        self.affinity = {
+            group: (names,) if isinstance(names, str) else tuple(names)
+            for group, names in affinity.items()
+        }
+        unknown = {name for names in self.affinity.values() for name in names} - set(self.printers)
+        if unknown:
+            raise ValueError(f"Afinidade com impressora(s) desconhecida(s): {', '.join(sorted(unknown))}")
+        
+        self.printer_handler = printer_handler or PrinterHandler()
+        self.prefetch = FLEET_CONFIG['prefetch'] if prefetch is None else prefetch
+        self.max_attempts = max_attempts or FLEET_CONFIG['max_attempts']
+        self.health_interval_s = health_interval_s or FLEET_CONFIG['health_interval_s']
+        self._ids = itertools.count(1)
+        self._waiting = []  # Trabalhos ainda sem impressora, em ordem de envio
+        self._lanes = {}  # grupo -> (impressora, último trabalho do grupo entregue a ela)
+        self._pending = set()
+        self._tasks = []
+    
+    @classmethod
+    def from_config(cls, printer_handler=None):
+        """
+        Cria a frota com as impressoras de rede de FLEET_CONFIG['printers']
+        
+        Returns:
+            PrinterFleet
+        """
+        printers = [
+            FleetPrinter(entry.get('name') or entry['host'], NetworkPrinterBackend(entry['host'], entry.get('port')))
+            for entry in FLEET_CONFIG['printers']
+        ]
+        return cls(printers, printer_handler=printer_handler)
+    
+    async def start(self):
+        """Inicia as tarefas de envio e de teste das impressoras"""
+        for printer in self.printers.values():
+            self._tasks.append(asyncio.create_task(self._worker(printer), name=f"fleet-{printer.name}"))
+        self._tasks.append(asyncio.create_task(self._health_loop(), name="fleet-health"))
+    
+    async def close(self, wait=True):
+        """
+        Para a frota
+        
+        Args:
+            wait: Aguardar os trabalhos pendentes antes de parar; sem isso,
+                os que ainda não foram enviados são cancelados
+        """
+        if wait:
+            await self.join()
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        for job in list(self._pending):
+            self._finish(job, JOB_CANCELLED)
+    
+    def submit(self, image=None, chunks=None, group=None, copies=1):
+        """
+        Adiciona um trabalho sem esperar a impressão
+        
+        Args:
+            image: PIL Image monocromática
+            chunks: Comandos ESC/POS já codificados (em vez de image)
+            group: Grupo de afinidade; trabalhos do mesmo grupo saem em ordem
+            copies: Número de cópias (só com image)
+        
+        Returns:
+            FleetJob (aguarde job.done para saber o resultado)
+        
+        Raises:
+            ValueError: Se não for informado exatamente um entre image e chunks
+        """
+        if (image is None) == (chunks is None):
+            raise ValueError("Informe image ou chunks")
+        
+        done = asyncio.get_running_loop().create_future()
+        job = FleetJob(next(self._ids), done, group, image, list(chunks) if chunks is not None else None, copies)
+        self._pending.add(job)
+        self._waiting.append(job)
+        self._dispatch()
+        return job
+    
+    async def print(self, image=None, chunks=None, group=None, copies=1):
+        """
+        Envia um trabalho e aguarda a impressão
+        
+        Returns:
+            True se impresso, False caso contrário
+        """
+        return await self.submit(image, chunks, group, copies).done
+    
+    async def join(self):
+        """Aguarda todos os trabalhos pendentes"""
+        while self._pending:
+            await asyncio.gather(*(job.done for job in list(self._pending)))
+    
+    @property
+    def waiting(self):
+        """Trabalhos aguardando uma impressora"""
+        return len(self._waiting)
+    
+    def stats(self):
+        """
+        Estado de cada impressora
+        
+        Returns:
+            Dicionário {nome: {'healthy', 'queued', 'jobs', 'bytes', 'bytes_per_s', 'failures'}}
+        """
+        return {
+            name: {
+                'healthy': printer.healthy,
+                'queued': len(printer.queue) + (printer.current is not None),
+                'jobs': printer.jobs_done,
+                'bytes': printer.bytes_sent,
+                'bytes_per_s': printer.bytes_per_s,
+                'failures': printer.failures,
+            }
+            for name, printer in self.printers.items()
+        }
+    
+    def _has_room(self, printer):
+        return printer.healthy and len(printer.queue) < self.prefetch + (printer.current is None)
+    
+    def _choose(self, job):
+        """Impressora para um trabalho, ou None se ele deve continuar aguardando"""
+        lane = self._lanes.get(job.group) if job.group is not None else None
+        if lane is not None and not lane[1].done.done() and lane[0].healthy:
+            # Grupo com trabalho pendente: mesma impressora, para manter a ordem
+            return lane[0] if self._has_room(lane[0]) else None
+        
+        healthy = [printer for printer in self.printers.values() if printer.healthy]
+        preferred = [printer for printer in healthy if printer.name in self.affinity.get(job.group, ())]
+        if not healthy:
+            return None
+        
+        # A que terminaria antes; se estiver sem vaga, vale mais esperar por ela
+        # do que mandar para uma impressora livre porém mais lenta
+        best = min(preferred or healthy, key=lambda printer: (printer.expected_wait(job.size), len(printer.queue)))
+        return best if self._has_room(best) else None
+    
+    def _dispatch(self):
+        """Entrega os trabalhos em espera às impressoras com vaga, em ordem"""
+        blocked = set()  # Grupos com um trabalho retido: os seguintes não podem passar na frente
+        waiting = []
+        for job in self._waiting:
+            printer = None if job.group in blocked else self._choose(job)
+            if printer is None:
+                if job.group is not None:
+                    blocked.add(job.group)
+                waiting.append(job)
+                continue
+            
+            if job.group is not None:
+                self._lanes[job.group] = (printer, job)
+            job.printer = printer.name
+            printer.queue.append(job)
+            printer.wake.set()
+        self._waiting = waiting
+    
+    def _finish(self, job, status):
+        """Conclui um trabalho e libera a ordem do grupo"""
+        job.status = status
+        job.image = None
+        self._pending.discard(job)
+        if not job.done.done():
+            job.done.set_result(status == JOB_DONE)
+        
+        lane = self._lanes.get(job.group)
+        if lane is not None and lane[1] is job:
+            del self._lanes[job.group]
+    
+    async def _worker(self, printer):
+        """Envia os trabalhos da fila de uma impressora, um por vez"""
+        steady = False  # Envio logo após outro: buffers cheios, a medição vale
+        while True:
+            if not printer.queue:
+                steady = False
+                printer.wake.clear()
+                await printer.wake.wait()
+                continue
+            
+            job = printer.queue.popleft()
+            printer.current = job
+            try:
+                sent = await self._send(printer, job, steady)
+            except Exception as e:
+                logger.error("Trabalho %d: erro ao codificar: %s", job.id, e)
+                sent = None
+            finally:
+                printer.current = None
+            
+            if sent is None:
+                # Erro ao codificar: problema do trabalho, não da impressora
+                self._finish(job, JOB_FAILED)
+                steady = False
+            elif sent:
+                self._finish(job, JOB_DONE)
+                steady = True
+            else:
+                self._fail_over(printer, job)
+            
+            # Vaga liberada (com sucesso ou falha): entregar os trabalhos em espera
+            self._dispatch()
+    
+    async def _send(self, printer, job, steady):
+        """Codifica (se necessário) e envia um trabalho; retorna True se enviado"""
+        job.status = JOB_SENDING
+        job.attempts += 1
+        
+        if job.chunks is None:
+            job.chunks = await asyncio.to_thread(
+                lambda: list(self.printer_handler.iter_esc_pos_chunks([job.image], copies=job.copies))
+            )
+            job.size = sum(len(chunk) for chunk in job.chunks)
+            job.image = None
+        
+        start = time.perf_counter()
+        try:
+            sent = await asyncio.to_thread(printer.backend.send, job.chunks)
+        except Exception as e:
+            logger.error("%s: erro ao enviar o trabalho %d: %s", printer.name, job.id, e)
+            sent = False
+        
+        if sent:
+            # Após uma pausa o primeiro envio só enche os buffers: não mede a impressora
+            printer.record(job.size, time.perf_counter() - start, measure=steady)
+        return sent
+    
+    def _fail_over(self, printer, job):
+        """Tira a impressora da frota e devolve o trabalho e a fila dela à espera, em ordem"""
+        printer.healthy = False
+        printer.failures += 1
+        moved = [job] + list(printer.queue)
+        printer.queue.clear()
+        logger.warning("%s falhou; %d trabalho(s) redistribuído(s)", printer.name, len(moved))
+        
+        for moved_job in moved:
+            if moved_job.attempts >= self.max_attempts:
+                logger.error("Trabalho %d: %d tentativa(s) sem sucesso", moved_job.id, moved_job.attempts)
+                self._finish(moved_job, JOB_FAILED)
+            else:
+                moved_job.status = JOB_QUEUED
+                moved_job.printer = None
+                self._waiting.append(moved_job)
+        self._waiting.sort(key=lambda waiting: waiting.id)
+        
+        if not any(other.healthy for other in self.printers.values()):
+            logger.warning("Nenhuma impressora disponível: trabalhos aguardando")
+    
+    async def _health_loop(self):
+        """Testa as impressoras com falha e devolve à frota as que responderem"""
+        while True:
+            await asyncio.sleep(self.health_interval_s)
+            
+            recovered = False
+            for printer in self.printers.values():
+                if not printer.healthy and await asyncio.to_thread(printer.probe):
+                    printer.healthy = True
+                    recovered = True
+                    logger.info("%s voltou a responder", printer.name)
+            
+            if recovered:
+                self._dispatch()
+
+
+def _ticket(rows, seed):
+    """Cupom sintético: texto simulado em faixas, na largura do papel"""
+    rng = random.Random(seed)
+    image = Image.new('1', (PRINTER_CONFIG['paper_width_px'], rows), 1)
+    for top in range(8, rows - 16, 24):
+        image.paste(0, (8, top, rng.randint(80, image.width - 8), top + 16))
+    return image
+
+
+async def _demo(args):
+    """Envia cupons sintéticos para a frota e mostra a distribuição"""
+    stand_ins = []
+    if args.printer:
+        printers = []
+        for address in args.printer:
+            host, _, port = address.partition(':')
+            printers.append(FleetPrinter(address, NetworkPrinterBackend(host, int(port) if port else None)))
+    else:
+        speeds = [int(speed) for speed in args.speeds.split(',')]
+        stand_ins = [StandInPrinter(bytes_per_s=speed) for speed in speeds]
+        printers = [
+            FleetPrinter(f"impressora-{index}", NetworkPrinterBackend(stand_in.host, stand_in.port))
+            for index, stand_in in enumerate(stand_ins, 1)
+        ]
+    
+    # A cozinha prefere a última impressora; seus cupons saem em ordem
+    kitchen = printers[-1].name
+    fleet = PrinterFleet(printers, affinity={'cozinha': kitchen}, health_interval_s=1.0)
+    await fleet.start()
+    
+    start = time.perf_counter()
+    jobs = [
+        fleet.submit(_ticket(random.Random(index).randint(200, 800), index),
+                     group='cozinha' if index % 3 == 0 else None)
+        for index in range(args.jobs)
+    ]
+    
+    if args.fail and stand_ins:
+        await asyncio.sleep(0.5)
+        print(f"Desligando impressora-{args.fail}...")
+        stand_ins[args.fail - 1].close()
+    
+    await fleet.close()
+    elapsed = time.perf_counter() - start
+    
+    printed = sum(job.status == JOB_DONE for job in jobs)
+    print(f"{printed}/{len(jobs)} cupom(ns) em {elapsed:.2f}s")
+    for name, stats in fleet.stats().items():
+        state = "ok" if stats['healthy'] else "FALHA"
+        print(f"  {name:<22} {state:<6} {stats['jobs']:4d} trabalho(s) "
+              f"{stats['bytes'] / 1024:8.0f} KB  {stats['bytes_per_s'] / 1024:7.1f} KB/s")
+    
+    for stand_in in stand_ins:
+        stand_in.close()
+    return 0 if printed == len(jobs) else 1
+
+
+def main(argv=None):
+    """Ponto de entrada da demonstração da frota"""
+    parser = argparse.ArgumentParser(description="Distribui cupons entre várias impressoras térmicas")
+    parser.add_argument('--printer', action='append', metavar='HOST[:PORTA]',
+                        help="Impressora de rede (repetir para cada uma); sem isso, usa impressoras simuladas")
+    parser.add_argument('--speeds', default='30000,30000,30000',
+                        help="Bytes/s de cada impressora simulada, separados por vírgula")
+    parser.add_argument('--jobs', type=int, default=60, help="Número de cupons sintéticos")
+    parser.add_argument('--fail', type=int, default=0, metavar='N',
+                        help="Desliga a impressora simulada N no meio dos envios")
+    args = parser.parse_args(argv)
+    
+    instrumentation.configure_logging('INFO')
+    return asyncio.run(_demo(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
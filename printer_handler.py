@@ -3,17 +3,40 @@ Handler de impressão para TopStart Thermal
 Responsável por enviar imagens para impressoras térmicas ESC/POS
 """
 
+import json
 import os
 import platform
+import time
 from PIL import Image
+from config import ESCPOS_COMMANDS, PRINTER_CONFIG, PRINTER_PROFILES, NETWORK_CONFIG
+from instrumentation import logger, timed
+from network_printer import NetworkPrinterBackend
 
-# Imports opcionais do Windows (apenas quando necessário)
-try:
-    import win32print  # type: ignore
-    import win32ui  # type: ignore
-    WIN32_AVAILABLE = True
-except ImportError:
-    WIN32_AVAILABLE = False
+# Imports opcionais do Windows (carregados no primeiro uso, ver _load_win32)
+win32print = None
+win32ui = None
+WIN32_AVAILABLE = None  # None = ainda não verificado
+
+
+def _load_win32():
+    """
+    Importa o pywin32 na primeira vez que for necessário
+    
+    Returns:
+        True se win32print/win32ui estão disponíveis
+    """
+    global win32print, win32ui, WIN32_AVAILABLE
+    
+    if WIN32_AVAILABLE is None:
+        try:
+            import win32print as _win32print  # type: ignore
+            import win32ui as _win32ui  # type: ignore
+            win32print, win32ui = _win32print, _win32ui
+            WIN32_AVAILABLE = True
+        except ImportError:
+            WIN32_AVAILABLE = False
+    
+    return WIN32_AVAILABLE
 
 
 class PrinterHandler:
@@ -21,6 +44,19 @@ class PrinterHandler:
         """Inicializa o handler de impressão"""
         self.printer_name = None
         self.connection = None
+        self.band_height = PRINTER_CONFIG['raster_band_height']
+        
+        # Linhas brancas enviadas como avanço de papel (ver iter_image_commands)
+        self.blank_feed_min_rows = PRINTER_CONFIG['blank_feed_min_rows']
+        collapse_mm = PRINTER_CONFIG['collapse_blank_mm']
+        self.collapse_blank_rows = (
+            int(collapse_mm * PRINTER_CONFIG['pixels_per_mm']) if collapse_mm is not None else None
+        )
+        self.backend = None  # Transporte RAW explícito (ex.: impressora de rede)
+        self.set_profile(PRINTER_CONFIG['profile'])
+        
+        if NETWORK_CONFIG['host']:
+            self.set_network_printer(NETWORK_CONFIG['host'], NETWORK_CONFIG['port'])
         
     def list_printers(self):
         """
@@ -31,12 +67,12 @@ class PrinterHandler:
         """
         printers = []
         
-        if platform.system() == 'Windows' and WIN32_AVAILABLE:
+        if platform.system() == 'Windows' and _load_win32():
             try:
                 # Listar impressoras instaladas
                 printers = [printer[2] for printer in win32print.EnumPrinters(2)]
             except Exception as e:
-                print(f"Aviso: Erro ao listar impressoras: {e}")
+                logger.warning("Erro ao listar impressoras: %s", e)
         
         return printers
     
@@ -49,12 +85,105 @@ class PrinterHandler:
         """
         self.printer_name = printer_name
     
-    def print_image(self, image):
+    def set_profile(self, name):
+        """
+        Define o perfil da impressora (ver PRINTER_PROFILES)
+        
+        Args:
+            name: Nome do perfil
+            
+        Raises:
+            ValueError: Se o perfil não existir
+        """
+        if name not in PRINTER_PROFILES:
+            raise ValueError(f"Perfil de impressora desconhecido: {name}")
+        
+        self.profile = name
+        self.image_encoder = PRINTER_PROFILES[name]['image_encoder']
+    
+    def printer_id(self):
+        """
+        Identificação da impressora atual (chave do benchmark de codificadores)
+        
+        Returns:
+            'host:porta' para impressoras de rede, senão o nome da impressora
+        """
+        if isinstance(self.backend, NetworkPrinterBackend):
+            return f"{self.backend.host}:{self.backend.port}"
+        return self.printer_name or 'default'
+    
+    def resolve_encoder(self):
+        """
+        Codificador de imagem usado pela impressora atual
+        
+        No perfil 'auto' escolhe o mais rápido no benchmark gravado em
+        encoder_benchmark_file; sem resultado para a impressora, usa raster.
+        
+        Returns:
+            'raster' ou 'column'
+        """
+        if self.image_encoder != 'auto':
+            return self.image_encoder
+        
+        results = load_encoder_benchmark().get(self.printer_id())
+        if not results:
+            return 'raster'
+        return min(('raster', 'column'), key=lambda encoder: results.get(encoder, float('inf')))
+    
+    def benchmark_encoders(self, image=None, repeat=1):
+        """
+        Mede o envio da mesma imagem com cada codificador e grava o resultado
+        
+        O tempo é o de send_raw; impressoras com buffer pequeno seguram o
+        envio até imprimir, então ele acompanha a velocidade de impressão.
+        
+        Args:
+            image: PIL Image monocromática de teste (padrão: faixa de 100mm com padrão xadrez)
+            repeat: Envios por codificador (vale o menor tempo)
+            
+        Returns:
+            Dicionário {codificador: segundos}, ou None se o envio falhou
+        """
+        if image is None:
+            import numpy as np
+            width = PRINTER_CONFIG['paper_width_px']
+            rows = np.arange(100 * PRINTER_CONFIG['pixels_per_mm'])[:, None]
+            image = Image.fromarray(((rows // 8 + np.arange(width)[None, :] // 8) % 2).astype(bool))
+        
+        results = {}
+        for encoder in ('raster', 'column'):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                if not self.send_raw(self.iter_esc_pos_chunks([image], encoder=encoder)):
+                    return None
+                elapsed = time.perf_counter() - start
+                results[encoder] = min(results.get(encoder, elapsed), elapsed)
+        
+        stored = load_encoder_benchmark()
+        stored[self.printer_id()] = results
+        with open(PRINTER_CONFIG['encoder_benchmark_file'], 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=2)
+        
+        return results
+    
+    def set_network_printer(self, host, port=None):
+        """
+        Usa uma impressora de rede (socket RAW, porta 9100) para os envios
+        
+        Args:
+            host: Endereço da impressora
+            port: Porta TCP (padrão: 9100)
+        """
+        self.backend = NetworkPrinterBackend(host, port)
+    
+    def print_image(self, image, copies=1, copy_separator=None):
         """
         Imprime imagem em impressora térmica
         
         Args:
             image: PIL Image (preferencialmente monocromática)
+            copies: Número de cópias, enviadas em um único trabalho
+            copy_separator: Entre cópias: 'cut', 'feed' ou 'none' (padrão: configuração)
             
         Returns:
             True se sucesso, False caso contrário
@@ -64,15 +193,25 @@ class PrinterHandler:
             if self._print_with_escpos(image):
                 return True
             
-            # Método 2: Tentar impressão RAW no Windows
+            # Método 2: Enviar bytes ESC/POS diretamente (rede ou RAW no Windows)
+            if self.has_raw_transport():
+                chunks = self.iter_esc_pos_chunks([image], copies=copies, copy_separator=copy_separator)
+                if self.send_raw(chunks):
+                    return True
+                
+                # Impressora de rede definida: não desviar para outra impressora
+                if self.backend is not None:
+                    return False
+            
             if platform.system() == 'Windows':
-                if self._print_raw_windows(image):
+                # Método 3: Impressão via GDI do Windows
+                if self._print_raw_windows(image, copies):
                     return True
             
-            # Método 3: Fallback - salvar e abrir com visualizador padrão
+            # Método 4: Fallback - salvar e abrir com visualizador padrão
             # (não é ideal, mas funciona para testes)
-            print("Aviso: Nenhum método de impressão direta disponível.")
-            print("Salvando imagem para impressão manual...")
+            logger.warning("Nenhum método de impressão direta disponível. "
+                           "Salvando imagem para impressão manual...")
             
             temp_file = "temp_print.png"
             image.save(temp_file)
@@ -84,7 +223,7 @@ class PrinterHandler:
             return True
             
         except Exception as e:
-            print(f"Erro ao imprimir: {e}")
+            logger.exception("Erro ao imprimir: %s", e)
             return False
     
     def _print_with_escpos(self, image):
@@ -113,20 +252,134 @@ class PrinterHandler:
         except ImportError:
             return False
         except Exception as e:
-            print(f"Erro com escpos: {e}")
+            logger.error("Erro com escpos: %s", e)
+            return False
+    
+    def has_raw_transport(self):
+        """
+        Indica se há um transporte que aceita bytes ESC/POS diretamente
+        
+        Returns:
+            True se send_raw pode ser usado
+        """
+        if self.backend is not None:
+            return True
+        
+        return platform.system() == 'Windows' and _load_win32()
+    
+    def send_raw(self, chunks):
+        """
+        Envia comandos ESC/POS já codificados para a impressora
+        
+        Args:
+            chunks: Iterável de bytes, escritos na ordem
+            
+        Returns:
+            True se sucesso, False caso contrário
+        """
+        if self.backend is not None:
+            return self.backend.send(chunks)
+        
+        if platform.system() == 'Windows':
+            return self._print_raw_bytes_windows(chunks)
+        
+        return False
+    
+    def print_stream(self, bands, copies=1, copy_separator=None):
+        """
+        Imprime uma sequência de faixas monocromáticas à medida que são geradas
+        
+        Com transporte RAW disponível, cada faixa é codificada e enviada
+        antes da próxima ser processada. Sem ele, as faixas são unidas em
+        uma imagem e impressas pelos métodos de print_image.
+        
+        Args:
+            bands: Iterável de PIL Image em modo '1' (ex.: iter_monochrome_bands)
+            copies: Número de cópias
+            copy_separator: Linhas de avanço entre cópias (None = padrão da config)
+            
+        Returns:
+            True se sucesso, False caso contrário
+        """
+        if self.has_raw_transport():
+            return self.send_raw(self.iter_esc_pos_chunks(
+                bands,
+                copies=copies,
+                copy_separator=copy_separator
+            ))
+        
+        return self.print_image(self.join_bands(bands), copies, copy_separator)
+    
+    def join_bands(self, bands):
+        """
+        Une faixas monocromáticas em uma única imagem
+        
+        Args:
+            bands: Iterável de PIL Image em modo '1'
+            
+        Returns:
+            PIL Image em modo '1'
+        """
+        bands = list(bands)
+        width = max((band.width for band in bands), default=0)
+        joined = Image.new('1', (width, sum(band.height for band in bands)), 1)
+        
+        top = 0
+        for band in bands:
+            joined.paste(band, (0, top))
+            top += band.height
+        
+        return joined
+    
+    def _print_raw_bytes_windows(self, chunks):
+        """
+        Envia bytes ESC/POS diretamente ao spooler do Windows (tipo RAW)
+        
+        Args:
+            chunks: Iterável de bytes com comandos ESC/POS; cada bloco é
+                escrito assim que fica disponível
+            
+        Returns:
+            True se sucesso, False caso contrário
+        """
+        if not _load_win32():
+            return False
+        
+        try:
+            printer_name = self.printer_name or win32print.GetDefaultPrinter()
+            hprinter = win32print.OpenPrinter(printer_name)
+            
+            try:
+                win32print.StartDocPrinter(hprinter, 1, ("TopStart Thermal Print", None, "RAW"))
+                try:
+                    win32print.StartPagePrinter(hprinter)
+                    for chunk in chunks:
+                        win32print.WritePrinter(hprinter, chunk)
+                    win32print.EndPagePrinter(hprinter)
+                finally:
+                    win32print.EndDocPrinter(hprinter)
+                
+                return True
+                
+            finally:
+                win32print.ClosePrinter(hprinter)
+                
+        except Exception as e:
+            logger.error("Erro na impressão RAW (ESC/POS): %s", e)
             return False
     
-    def _print_raw_windows(self, image):
+    def _print_raw_windows(self, image, copies=1):
         """
         Tenta imprimir usando RAW no Windows
         
         Args:
             image: PIL Image
+            copies: Número de cópias (uma página por cópia no mesmo documento)
             
         Returns:
             True se sucesso, False caso contrário
         """
-        if not WIN32_AVAILABLE:
+        if not _load_win32():
             return False
             
         try:
@@ -145,16 +398,19 @@ class PrinterHandler:
                 
                 # Iniciar documento
                 hdc.StartDoc("TopStart Thermal Print")
-                hdc.StartPage()
                 
-                # Converter imagem para bitmap
+                # Converter imagem para bitmap (uma vez para todas as cópias)
                 dib = ImageWin.Dib(image)
                 
-                # Imprimir no topo (0, 0)
-                dib.draw(hdc.GetHandleOutput(), (0, 0, image.width, image.height))
+                for _ in range(copies):
+                    hdc.StartPage()
+                    
+                    # Imprimir no topo (0, 0)
+                    dib.draw(hdc.GetHandleOutput(), (0, 0, image.width, image.height))
+                    
+                    hdc.EndPage()
                 
                 # Finalizar
-                hdc.EndPage()
                 hdc.EndDoc()
                 
                 return True
@@ -163,7 +419,7 @@ class PrinterHandler:
                 win32print.ClosePrinter(hprinter)
                 
         except Exception as e:
-            print(f"Erro na impressão RAW: {e}")
+            logger.error("Erro na impressão RAW: %s", e)
             return False
     
     def print_test_page(self):
@@ -190,31 +446,406 @@ class PrinterHandler:
         
         return self.print_image(test_image)
     
-    def get_esc_pos_commands(self, image):
+    @timed('encode')
+    def pack_raster_rows(self, image):
         """
-        Gera comandos ESC/POS para imprimir a imagem
+        Empacota a imagem monocromática em bytes de raster (1 bit por ponto)
+        
+        Args:
+            image: PIL Image (modo '1', como retornada por convert_to_monochrome)
+            
+        Returns:
+            Array numpy uint8 (altura x bytes por linha), bit 1 = ponto preto
+        """
+        import numpy as np
+        
+        if image.mode != '1':
+            image = image.convert('1')
+        
+        # No modo '1' True é branco; na impressora o bit 1 aquece o ponto
+        ink = ~np.asarray(image)
+        
+        # Linhas inteiras de uma vez; largura completada com bits brancos
+        return np.packbits(ink, axis=1)
+    
+    def iter_raster_bands(self, image, band_height=None):
+        """
+        Gera blocos GS v 0 com faixas horizontais da imagem
         
         Args:
             image: PIL Image (monocromática)
+            band_height: Linhas por bloco (padrão: raster_band_height da config)
+            
+        Yields:
+            Bytes de um comando GS v 0 completo por faixa
+        """
+        yield from self._iter_raster_blocks(self.pack_raster_rows(image), band_height or self.band_height)
+    
+    def _iter_raster_blocks(self, packed, band_height):
+        """
+        Divide linhas já empacotadas em comandos GS v 0
+        
+        Args:
+            packed: Array numpy uint8 (linhas x bytes por linha)
+            band_height: Linhas por bloco
+            
+        Yields:
+            Bytes de um comando GS v 0 completo por bloco
+        """
+        height, bytes_per_row = packed.shape
+        
+        for top in range(0, height, band_height):
+            band = packed[top:top + band_height]
+            rows = band.shape[0]
+            header = ESCPOS_COMMANDS['raster_image'] + bytes((
+                bytes_per_row & 0xFF, bytes_per_row >> 8,
+                rows & 0xFF, rows >> 8,
+            ))
+            yield header + band.tobytes()
+    
+    def iter_image_commands(self, bands, band_height=None, encoder=None):
+        """
+        Gera os comandos de impressão das faixas com o codificador da impressora
+        
+        Args:
+            bands: Iterável de PIL Image monocromáticas, na ordem de impressão
+            band_height: Linhas por bloco GS v 0 (padrão: configuração)
+            encoder: 'raster' ou 'column' (padrão: perfil da impressora)
+            
+        Yields:
+            Bytes de comandos de imagem e avanço de papel
+        """
+        if (encoder or self.resolve_encoder()) == 'column':
+            return self.iter_column_commands(bands)
+        return self.iter_raster_commands(bands, band_height)
+    
+    def iter_raster_commands(self, bands, band_height=None):
+        """
+        Gera comandos GS v 0 das faixas, trocando linhas brancas por avanço de papel
+        
+        Sequências de pelo menos blank_feed_min_rows linhas totalmente
+        brancas viram ESC J n (3 bytes a cada 255 linhas) em vez de dados
+        raster. Com collapse_blank_rows, espaços internos (entre dois
+        conteúdos) maiores que o limite são encurtados; o offset no início
+        e o espaço no final não mudam.
+        
+        Args:
+            bands: Iterável de PIL Image monocromáticas, na ordem de impressão
+            band_height: Linhas por bloco GS v 0 (padrão: configuração)
+            
+        Yields:
+            Bytes de comandos GS v 0 e ESC J
+        """
+        band_height = band_height or self.band_height
+        
+        if not self.blank_feed_min_rows:
+            for band in bands:
+                yield from self.iter_raster_bands(band, band_height)
+            return
+        
+        pending = 0  # Linhas brancas ainda não enviadas (podem continuar na próxima faixa)
+        seen_content = False
+        bytes_per_row = 0
+        
+        for band in bands:
+            packed = self.pack_raster_rows(band)
+            height, bytes_per_row = packed.shape
+            
+            position = 0
+            for start, stop in self._content_runs(packed):
+                pending += start - position
+                yield from self._blank_commands(pending, bytes_per_row, internal=seen_content)
+                pending = 0
+                
+                yield from self._iter_raster_blocks(packed[start:stop], band_height)
+                seen_content = True
+                position = stop
+            
+            pending += height - position
+        
+        # Espaço no final da imagem: avançado por inteiro
+        yield from self._blank_commands(pending, bytes_per_row, internal=False)
+    
+    def _content_runs(self, packed):
+        """
+        Encontra os trechos da faixa que devem ser enviados como raster
+        
+        Sequências brancas curtas (menos de blank_feed_min_rows linhas) no
+        meio da faixa continuam dentro do raster; as que tocam as bordas
+        ficam de fora, pois podem continuar na faixa vizinha.
+        
+        Args:
+            packed: Array numpy uint8 (linhas x bytes por linha)
             
         Returns:
-            Bytes com comandos ESC/POS
+            Lista de (linha inicial, linha final) dos trechos com conteúdo
         """
-        commands = bytearray()
+        import numpy as np
+        
+        height = packed.shape[0]
+        blank = ~packed.any(axis=1)
+        if not blank.any():
+            return [(0, height)]
         
-        # Initialize printer
-        commands.extend(b'\x1B\x40')  # ESC @
+        # Início e fim de cada sequência de linhas brancas
+        changes = np.diff(np.concatenate(([0], blank.view(np.int8), [0])))
+        starts = np.flatnonzero(changes == 1)
+        stops = np.flatnonzero(changes == -1)
         
-        # Set line spacing to 0
-        commands.extend(b'\x1B\x33\x00')  # ESC 3 0
+        keep = (stops - starts >= self.blank_feed_min_rows) | (starts == 0) | (stops == height)
+        starts, stops = starts[keep], stops[keep]
+        
+        # Conteúdo = intervalos entre as sequências brancas mantidas
+        return [
+            (int(start), int(stop))
+            for start, stop in zip(np.concatenate(([0], stops)), np.concatenate((starts, [height])))
+            if stop > start
+        ]
+    
+    def _blank_commands(self, rows, bytes_per_row, internal):
+        """
+        Comandos para uma sequência de linhas brancas
+        
+        Args:
+            rows: Número de linhas brancas
+            bytes_per_row: Bytes por linha raster (para sequências curtas)
+            internal: A sequência fica entre dois conteúdos (pode ser encurtada)
+            
+        Yields:
+            Bytes com comandos ESC J n ou um bloco raster branco
+        """
+        if rows <= 0:
+            return
+        
+        if rows < self.blank_feed_min_rows:
+            # Curta demais: mais simples mandar as linhas brancas no raster
+            import numpy as np
+            yield from self._iter_raster_blocks(np.zeros((rows, bytes_per_row), dtype=np.uint8), rows)
+            return
+        
+        if internal and self.collapse_blank_rows is not None:
+            rows = min(rows, self.collapse_blank_rows)
+        
+        while rows > 0:
+            dots = min(rows, 255)
+            yield ESCPOS_COMMANDS['feed_dots'] + bytes((dots,))
+            rows -= dots
+    
+    @timed('encode')
+    def pack_column_stripes(self, ink):
+        """
+        Empacota linhas no formato de colunas do ESC * 33
+        
+        Cada coluna de uma faixa de 24 linhas vira 3 bytes, de cima para
+        baixo, com o bit mais significativo no ponto de cima.
+        
+        Args:
+            ink: Array numpy bool (altura múltipla de 24 x largura), True = ponto preto
+            
+        Returns:
+            Array numpy uint8 (faixas x largura*3)
+        """
+        import numpy as np
+        
+        height, width = ink.shape
+        # (faixa, byte, bit, coluna) -> (faixa, coluna, byte, bit)
+        stripes = ink.reshape(height // 24, 3, 8, width).transpose(0, 3, 1, 2)
+        return np.packbits(stripes, axis=3).reshape(height // 24, width * 3)
+    
+    def iter_column_commands(self, bands):
+        """
+        Gera comandos ESC * 33 (24 pontos por coluna) para as faixas
         
-        # Converter imagem para raster bitmap
-        # (Simplificado - implementação completa requer processamento bit a bit)
+        Cada faixa de 24 linhas é um comando ESC * seguido de ESC J 24.
+        Faixas totalmente brancas só avançam o papel, como no raster. A
+        última faixa é completada com linhas brancas.
+        
+        Args:
+            bands: Iterável de PIL Image monocromáticas, na ordem de impressão
+            
+        Yields:
+            Bytes de comandos ESC * e ESC J
+        """
+        import numpy as np
+        
+        leftover = None  # Linhas que não completaram 24 na faixa anterior
+        feed = 0  # Avanço acumulado depois da última faixa com conteúdo
+        gap = 0  # Parte do avanço que é espaço em branco (pode ser encurtada)
+        seen_content = False
+        
+        def flush(internal):
+            rows = feed - gap
+            if internal and self.collapse_blank_rows is not None:
+                rows += min(gap, self.collapse_blank_rows)
+            else:
+                rows += gap
+            while rows > 0:
+                dots = min(rows, 255)
+                yield ESCPOS_COMMANDS['feed_dots'] + bytes((dots,))
+                rows -= dots
+        
+        def stripes_of(ink):
+            nonlocal feed, gap, seen_content
+            blank = ~ink.reshape(-1, 24 * ink.shape[1]).any(axis=1) if self.blank_feed_min_rows else None
+            packed = self.pack_column_stripes(ink)
+            header = ESCPOS_COMMANDS['column_image'] + bytes((ink.shape[1] & 0xFF, ink.shape[1] >> 8))
+            
+            for index, stripe in enumerate(packed):
+                if blank is not None and blank[index]:
+                    feed += 24
+                    gap += 24
+                    continue
+                yield from flush(internal=seen_content)
+                yield header + stripe.tobytes()
+                feed, gap = 24, 0
+                seen_content = True
+        
+        for band in bands:
+            if band.mode != '1':
+                band = band.convert('1')
+            ink = ~np.asarray(band)
+            if leftover is not None:
+                ink = np.concatenate((leftover, ink))
+            
+            full = ink.shape[0] - ink.shape[0] % 24
+            leftover = ink[full:] if full < ink.shape[0] else None
+            if full:
+                yield from stripes_of(ink[:full])
+        
+        # Última faixa incompleta: completar com linhas brancas
+        if leftover is not None:
+            padded = np.zeros((24, leftover.shape[1]), dtype=bool)
+            padded[:leftover.shape[0]] = leftover
+            yield from stripes_of(padded)
+        
+        yield from flush(internal=False)
+    
+    def iter_esc_pos_chunks(self, bands, band_height=None, copies=1, copy_separator=None, encoder=None):
+        """
+        Gera os comandos ESC/POS de uma impressão em blocos
+        
+        Com várias cópias a imagem é codificada uma única vez e os mesmos
+        blocos são repetidos, separados por corte ou avanço de papel.
+        
+        Args:
+            bands: Iterável de PIL Image monocromáticas, na ordem de impressão
+            band_height: Linhas por bloco GS v 0 (padrão: configuração)
+            copies: Número de cópias
+            copy_separator: Entre cópias: 'cut', 'feed' ou 'none' (padrão: configuração)
+            encoder: 'raster' ou 'column' (padrão: perfil da impressora)
+            
+        Yields:
+            Bytes: cabeçalho, blocos de imagem e avanços ESC J, e o rodapé (avanço e corte)
+        """
+        # Imagem em blocos GS v 0 ou ESC * (linhas brancas como avanço de papel)
+        body = self.iter_image_commands(bands, band_height, encoder)
+        yield from self.wrap_image_commands(body, copies, copy_separator)
+    
+    def wrap_image_commands(self, body, copies=1, copy_separator=None):
+        """
+        Monta uma impressão a partir dos comandos de imagem já codificados
+        
+        Args:
+            body: Iterável de bytes (iter_image_commands ou payload guardado em cache)
+            copies: Número de cópias
+            copy_separator: Entre cópias: 'cut', 'feed' ou 'none' (padrão: configuração)
+            
+        Yields:
+            Bytes: cabeçalho, blocos de imagem de cada cópia e o rodapé (avanço e corte)
+        """
+        # Initialize printer + line spacing 0
+        yield (ESCPOS_COMMANDS['initialize']
+               + ESCPOS_COMMANDS['line_spacing_0']
+               + ESCPOS_COMMANDS['align_left'])
+        
+        if copies == 1:
+            yield from body
+        else:
+            body = list(body)
+            separator = self._copy_separator_bytes(copy_separator)
+            
+            for copy_index in range(copies):
+                if copy_index > 0 and separator:
+                    yield separator
+                yield from body
+        
+        # Print and feed + cut paper (se suportado)
+        yield ESCPOS_COMMANDS['feed_2'] + ESCPOS_COMMANDS['cut']
+    
+    def encoding_key(self):
+        """
+        Parâmetros que mudam os bytes gerados por iter_image_commands
+        
+        Returns:
+            Tupla para compor chaves de cache de comandos codificados
+        """
+        return (self.resolve_encoder(), self.band_height, self.blank_feed_min_rows, self.collapse_blank_rows)
+    
+    def _copy_separator_bytes(self, copy_separator=None):
+        """
+        Comandos enviados entre duas cópias
+        
+        Args:
+            copy_separator: 'cut', 'feed' ou 'none' (padrão: configuração)
+            
+        Returns:
+            Bytes com os comandos (vazio para 'none')
+        """
+        copy_separator = copy_separator or PRINTER_CONFIG['copy_separator']
+        
+        if copy_separator == 'cut':
+            return ESCPOS_COMMANDS['feed_2'] + ESCPOS_COMMANDS['cut']
+        if copy_separator == 'feed':
+            return ESCPOS_COMMANDS['feed_2']
+        return b''
+    
+    def get_esc_pos_commands(self, image, band_height=None):
+        """
+        Gera comandos ESC/POS para imprimir a imagem
+        
+        Args:
+            image: PIL Image (monocromática)
+            band_height: Linhas por bloco GS v 0 (padrão: configuração)
+            
+        Returns:
+            Bytes com comandos ESC/POS
+        """
+        return b''.join(self.iter_esc_pos_chunks([image], band_height))
+
+
+def load_encoder_benchmark():
+    """
+    Lê os resultados gravados por PrinterHandler.benchmark_encoders
+    
+    Returns:
+        Dicionário {impressora: {codificador: segundos}} (vazio se não houver arquivo)
+    """
+    try:
+        with open(PRINTER_CONFIG['encoder_benchmark_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+if __name__ == "__main__":
+    import sys
+    
+    # Uso: python printer_handler.py --benchmark-encoders [host[:porta]]
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark-encoders':
+        handler = PrinterHandler()
+        if len(sys.argv) > 2:
+            host, _, port = sys.argv[2].partition(':')
+            handler.set_network_printer(host, int(port) if port else None)
         
-        # Print and feed
-        commands.extend(b'\x1B\x64\x02')  # ESC d 2 (feed 2 lines)
+        if not handler.has_raw_transport():
+            print("Nenhum transporte RAW disponível (defina uma impressora de rede ou use o Windows).")
+            sys.exit(1)
         
-        # Cut paper (se suportado)
-        commands.extend(b'\x1D\x56\x00')  # GS V 0
+        results = handler.benchmark_encoders()
+        if results is None:
+            print("Falha ao enviar para a impressora.")
+            sys.exit(1)
         
-        return bytes(commands)
+        for encoder, seconds in results.items():
+            print(f"{encoder:<8} {seconds * 1000:8.1f} ms")
+        print(f"Gravado em {PRINTER_CONFIG['encoder_benchmark_file']} para {handler.printer_id()}")
@@ -0,0 +1,107 @@
+"""
+Impressora de rede simulada para TopStart Thermal
+Servidor TCP local que se comporta como uma impressora na porta 9100
+(testes e demonstração da frota sem impressoras reais)
+
+Uso:
+    python stand_in_printer.py [porta]    # Impressora simulada (padrão: 9100)
+"""
+
+import socket
+import threading
+import time
+
+
+class StandInPrinter:
+    def __init__(self, host='127.0.0.1', port=0, bytes_per_s=None):
+        """
+        Impressora de rede simulada para testes (servidor TCP local)
+        
+        Aceita conexões como uma impressora na porta 9100 e guarda tudo
+        que recebe.
+        
+        Args:
+            host: Endereço de escuta
+            port: Porta de escuta (0 = porta livre escolhida pelo sistema)
+            bytes_per_s: Velocidade simulada da impressora (None = sem limite);
+                a leitura é atrasada e o envio fica preso no fluxo TCP
+        """
+        self.bytes_per_s = bytes_per_s
+        self.received = bytearray()
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = socket.create_server((host, port))
+        if bytes_per_s:
+            # Buffer pequeno, como o de uma impressora: quem envia sente a velocidade
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.host, self.port = self._server.getsockname()[:2]
+        self._clients = []
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, name="stand-in-printer", daemon=True)
+        self._thread.start()
+    
+    def _accept_loop(self):
+        """Aceita conexões e cria uma thread de leitura para cada uma"""
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                break
+            
+            with self._lock:
+                self.connections += 1
+                self._clients.append(client)
+            
+            threading.Thread(target=self._read_loop, args=(client,), daemon=True).start()
+    
+    def _read_loop(self, client):
+        """Recebe os bytes de uma conexão até ela ser fechada"""
+        read_size = 4096 if self.bytes_per_s else 65536
+        with client:
+            while True:
+                try:
+                    data = client.recv(read_size)
+                except OSError:
+                    break
+                if not data:
+                    break
+                with self._lock:
+                    self.received.extend(data)
+                if self.bytes_per_s:
+                    time.sleep(len(data) / self.bytes_per_s)
+    
+    def drop_connections(self):
+        """Fecha as conexões abertas (simula uma impressora reiniciando)"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+    
+    def close(self):
+        """Para o servidor"""
+        self._running = False
+        # shutdown acorda o accept da thread; só close deixaria a porta aceitando conexões
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        self.drop_connections()
+
+
+if __name__ == "__main__":
+    import sys
+    
+    printer = StandInPrinter('0.0.0.0', int(sys.argv[1]) if len(sys.argv) > 1 else 9100)
+    print(f"Impressora simulada em {printer.host}:{printer.port} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+            print(f"\r{printer.connections} conexão(ões), {len(printer.received)} bytes recebidos", end="")
+    except KeyboardInterrupt:
+        printer.close()
@@ -0,0 +1,90 @@
+"""
+Decodificador de comandos ESC/POS de imagem para os testes
+
+Reconstrói os pontos impressos a partir dos bytes: GS v 0 (raster), ESC * 33
+(colunas de 24 pontos) e ESC J n (avanço de n pontos).
+"""
+
+import numpy as np
+
+from config import ESCPOS_COMMANDS
+
+RASTER = ESCPOS_COMMANDS['raster_image']
+COLUMN = ESCPOS_COMMANDS['column_image']
+FEED = ESCPOS_COMMANDS['feed_dots']
+
+
+def parse(data):
+    """
+    Separa os comandos de imagem de um fluxo de bytes
+    
+    Returns:
+        Lista de tuplas ('raster', linhas bool), ('column', 24 linhas bool) ou ('feed', n)
+    """
+    commands = []
+    position = 0
+    while position < len(data):
+        if data.startswith(RASTER, position):
+            position += len(RASTER)
+            bytes_per_row = data[position] | data[position + 1] << 8
+            rows = data[position + 2] | data[position + 3] << 8
+            position += 4
+            size = bytes_per_row * rows
+            packed = np.frombuffer(data, np.uint8, size, position).reshape(rows, bytes_per_row)
+            commands.append(('raster', np.unpackbits(packed, axis=1).astype(bool)))
+            position += size
+        elif data.startswith(COLUMN, position):
+            position += len(COLUMN)
+            width = data[position] | data[position + 1] << 8
+            position += 2
+            # Cada coluna: 3 bytes de cima para baixo, bit mais significativo em cima
+            columns = np.frombuffer(data, np.uint8, width * 3, position).reshape(width, 3)
+            commands.append(('column', np.unpackbits(columns, axis=1).astype(bool).T))
+            position += width * 3
+        elif data.startswith(FEED, position):
+            commands.append(('feed', data[position + len(FEED)]))
+            position += len(FEED) + 1
+        else:
+            raise ValueError(f"Comando desconhecido na posição {position}: {data[position:position + 4]!r}")
+    return commands
+
+
+def render(data, width):
+    """
+    Pontos impressos por uma sequência de comandos de imagem
+    
+    O raster imprime e avança as suas linhas; ESC * imprime 24 linhas sem
+    avançar (o avanço vem do ESC J seguinte).
+    
+    Args:
+        data: Bytes (ou lista de blocos) de iter_image_commands
+        width: Largura da imagem em pontos
+    
+    Returns:
+        Array bool (linhas avançadas x largura), True = ponto preto
+    """
+    if not isinstance(data, (bytes, bytearray)):
+        data = b''.join(data)
+    
+    rows = {}
+    y = 0
+    for kind, value in parse(data):
+        if kind == 'raster':
+            for row in value:
+                rows[y] = row[:width]
+                y += 1
+        elif kind == 'column':
+            for offset, row in enumerate(value):
+                rows[y + offset] = rows.get(y + offset, np.zeros(width, bool)) | row[:width]
+        else:
+            y += value
+    
+    canvas = np.zeros((max([y] + [index + 1 for index in rows]), width), bool)
+    for index, row in rows.items():
+        canvas[index] = row
+    return canvas
+
+
+def ink_of(image):
+    """Pontos pretos de uma imagem monocromática (no modo '1' True é branco)"""
+    return ~np.asarray(image.convert('1'))
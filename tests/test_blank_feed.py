@@ -0,0 +1,92 @@
+"""
+Linhas brancas como avanço de papel: menos bytes, mesmos pontos impressos
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from escpos_decoder import FEED, ink_of, parse, render
+from printer_handler import PrinterHandler
+
+
+def receipt(blocks, width=384):
+    """Imagem com trechos de conteúdo (True) e brancos (False) de alturas dadas"""
+    rows = []
+    for index, (height, content) in enumerate(blocks):
+        block = np.zeros((height, width), bool)
+        if content:
+            block[:, 10 + index:200] = True
+        rows.append(block)
+    return Image.fromarray(~np.concatenate(rows))
+
+
+@pytest.fixture
+def handler():
+    handler = PrinterHandler()
+    handler.set_profile('generic')
+    handler.blank_feed_min_rows = 8
+    handler.collapse_blank_rows = None
+    return handler
+
+
+def feeds(commands):
+    return [value for kind, value in parse(b''.join(commands)) if kind == 'feed']
+
+
+def test_blank_run_becomes_feed_split_at_255(handler):
+    image = receipt([(20, True), (600, False), (20, True)])
+    commands = list(handler.iter_image_commands([image], 256))
+    
+    assert feeds(commands) == [255, 255, 90]
+    assert b''.join(commands).count(FEED) == 3
+    assert np.array_equal(render(commands, 384), ink_of(image))
+
+
+def test_leading_and_trailing_blank_rows_are_fed(handler):
+    image = receipt([(300, False), (10, True), (40, False)])
+    commands = list(handler.iter_image_commands([image], 256))
+    
+    assert feeds(commands) == [255, 45, 40]
+    assert np.array_equal(render(commands, 384), ink_of(image))
+
+
+def test_short_blank_runs_stay_in_raster(handler):
+    image = receipt([(20, True), (7, False), (20, True)])
+    commands = list(handler.iter_image_commands([image], 256))
+    
+    assert feeds(commands) == []
+    assert np.array_equal(render(commands, 384), ink_of(image))
+
+
+@pytest.mark.parametrize('band_height', [256, 64, 7])
+def test_blank_run_split_across_bands(handler, band_height):
+    # Conteúdo e brancos cortados em faixas de 50 linhas: a sequência branca continua entre faixas
+    image = receipt([(30, True), (130, False), (5, True), (4, False), (31, True), (100, False)])
+    bands = [image.crop((0, top, 384, min(top + 50, image.height))) for top in range(0, image.height, 50)]
+    commands = list(handler.iter_image_commands(bands, band_height))
+    
+    assert feeds(commands) == [130, 100]
+    assert np.array_equal(render(commands, 384), ink_of(image))
+
+
+def test_collapse_shortens_internal_gaps_only(handler):
+    handler.collapse_blank_rows = 40
+    image = receipt([(100, False), (10, True), (300, False), (10, True), (20, False), (10, True), (90, False)])
+    commands = list(handler.iter_image_commands([image], 256))
+    
+    # Offset inicial e espaço final intactos; o espaço interno de 300 vira 40
+    assert feeds(commands) == [100, 40, 20, 90]
+    printed = render(commands, 384)
+    ink = ink_of(image)
+    expected = np.concatenate((ink[:110], ink[110:150], ink[410:]))
+    assert np.array_equal(printed, expected)
+
+
+def test_disabled_sends_everything_as_raster(handler):
+    handler.blank_feed_min_rows = 0
+    image = receipt([(20, True), (600, False), (20, True)])
+    commands = list(handler.iter_image_commands([image], 256))
+    
+    assert feeds(commands) == []
+    assert np.array_equal(render(commands, 384), ink_of(image))
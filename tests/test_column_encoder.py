@@ -0,0 +1,135 @@
+"""
+Codificador ESC * 33 (colunas de 24 pontos) e escolha do codificador por perfil
+"""
+
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import printer_handler as printer_module
+from escpos_decoder import COLUMN, RASTER, ink_of, parse, render
+from printer_handler import PrinterHandler
+
+
+def random_mono(width, height, seed=0, density=0.3):
+    ink = np.random.default_rng(seed).random((height, width)) < density
+    return Image.fromarray(~ink)
+
+
+@pytest.fixture
+def handler():
+    handler = PrinterHandler()
+    handler.set_profile('legacy')
+    handler.blank_feed_min_rows = 8
+    handler.collapse_blank_rows = None
+    return handler
+
+
+@pytest.fixture
+def benchmark_file(tmp_path, monkeypatch):
+    path = tmp_path / 'encoder_benchmark.json'
+    monkeypatch.setitem(printer_module.PRINTER_CONFIG, 'encoder_benchmark_file', str(path))
+    return path
+
+
+def padded(ink):
+    """Pontos esperados: a última faixa é completada até 24 linhas brancas"""
+    rows = -(-ink.shape[0] // 24) * 24
+    result = np.zeros((rows, ink.shape[1]), bool)
+    result[:ink.shape[0]] = ink
+    return result
+
+
+def test_pack_column_stripes_bit_order(handler):
+    ink = np.zeros((24, 2), bool)
+    ink[0, 0] = True  # Ponto de cima da primeira coluna: MSB do primeiro byte
+    ink[23, 1] = True  # Ponto de baixo da segunda coluna: LSB do terceiro byte
+    ink[8, 1] = True  # Primeiro ponto do segundo byte
+    
+    assert handler.pack_column_stripes(ink).tolist() == [[0x80, 0, 0, 0, 0x80, 0x01]]
+
+
+@pytest.mark.parametrize('height', [24, 100, 1000])
+def test_column_commands_round_trip(handler, height):
+    image = random_mono(384, height, seed=height)
+    commands = list(handler.iter_column_commands([image]))
+    
+    stripes = [value for kind, value in parse(b''.join(commands)) if kind == 'column']
+    assert len(stripes) == -(-height // 24)
+    assert all(command[:len(COLUMN)] == COLUMN for command in commands[::2])
+    assert np.array_equal(render(commands, 384), padded(ink_of(image)))
+
+
+def test_column_stripes_continue_across_bands(handler):
+    # Faixas que não são múltiplas de 24: as linhas que sobram vão para a próxima faixa
+    bands = [random_mono(384, height, seed=height) for height in (10, 50, 7, 100)]
+    commands = handler.iter_column_commands(bands)
+    
+    expected = padded(np.concatenate([ink_of(band) for band in bands]))
+    assert np.array_equal(render(commands, 384), expected)
+
+
+def test_blank_stripes_become_feeds(handler):
+    ink = np.zeros((24 * 20, 384), bool)
+    ink[:24, :100] = True
+    ink[-24:, :100] = True
+    image = Image.fromarray(~ink)
+    commands = list(handler.iter_column_commands([image]))
+    
+    kinds = [kind for kind, _ in parse(b''.join(commands))]
+    assert kinds.count('column') == 2
+    assert np.array_equal(render(commands, 384), ink)
+
+
+@pytest.mark.parametrize('profile, expected', [('generic', 'raster'), ('legacy', 'column')])
+def test_profile_selects_encoder(handler, profile, expected):
+    handler.set_profile(profile)
+    image = random_mono(384, 48)
+    data = b''.join(handler.iter_image_commands([image]))
+    
+    assert handler.resolve_encoder() == expected
+    assert data.startswith(COLUMN if expected == 'column' else RASTER)
+    # Os dois codificadores recebem a mesma imagem e imprimem os mesmos pontos
+    assert np.array_equal(render(data, 384)[:48], ink_of(image))
+
+
+def test_unknown_profile_is_rejected(handler):
+    with pytest.raises(ValueError):
+        handler.set_profile('inexistente')
+
+
+def test_auto_profile_uses_stored_benchmark(handler, benchmark_file):
+    handler.set_profile('auto')
+    handler.printer_name = 'balcao'
+    
+    # Sem resultado para a impressora: raster
+    assert handler.resolve_encoder() == 'raster'
+    
+    benchmark_file.write_text(json.dumps({
+        'balcao': {'raster': 2.5, 'column': 0.8},
+        'cozinha': {'raster': 0.5, 'column': 0.9},
+    }), encoding='utf-8')
+    assert handler.resolve_encoder() == 'column'
+    assert handler.encoding_key()[0] == 'column'
+    
+    handler.printer_name = 'cozinha'
+    assert handler.resolve_encoder() == 'raster'
+
+
+def test_benchmark_encoders_stores_results(handler, benchmark_file):
+    sent = []
+    
+    class Backend:
+        def send(self, chunks):
+            sent.append(b''.join(chunks))
+            return True
+    
+    handler.backend = Backend()
+    handler.printer_name = 'balcao'
+    results = handler.benchmark_encoders(random_mono(384, 48))
+    
+    assert set(results) == {'raster', 'column'}
+    assert len(sent) == 2
+    assert json.loads(benchmark_file.read_text(encoding='utf-8'))['balcao'] == results
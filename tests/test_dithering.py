@@ -0,0 +1,130 @@
+"""
+Motor de dithering: resultados conhecidos, densidade dos meios-tons e referências ponto a ponto
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import dithering
+
+
+def gray(pixels):
+    return Image.fromarray(np.asarray(pixels, dtype=np.uint8))
+
+
+def white(image):
+    """Pixels brancos (no modo '1' True é branco)"""
+    assert image.mode == '1'
+    return np.asarray(image)
+
+
+def reference_atkinson(pixels, level=128):
+    """Atkinson pixel a pixel, na ordem de leitura (referência lenta)"""
+    values = pixels.astype(np.float64)
+    height, width = values.shape
+    output = np.zeros((height, width), bool)
+    for y in range(height):
+        for x in range(width):
+            quantized = 255.0 if values[y, x] >= level else 0.0
+            output[y, x] = quantized == 255.0
+            error = (values[y, x] - quantized) / 8
+            for dx, dy in ((1, 0), (2, 0), (-1, 1), (0, 1), (1, 1), (0, 2)):
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    values[y + dy, x + dx] += error
+    return output
+
+
+def reference_row_diffusion(pixels, level=128):
+    """Difusão linha a linha (1/4, 1/2, 1/4 para baixo) com limiar Bayer, pixel a pixel"""
+    bayer = dithering.bayer_matrix(8)
+    height, width = pixels.shape
+    output = np.zeros((height, width), bool)
+    carry = np.zeros(width)
+    for y in range(height):
+        error = np.zeros(width)
+        for x in range(width):
+            value = pixels[y, x] + carry[x]
+            output[y, x] = value >= level + (bayer[y % 8, x % 8] - 0.5) * 127
+            error[x] = value - 255 * output[y, x]
+        carry = np.zeros(width)
+        for x in range(width):
+            for dx, weight in ((-1, 0.25), (0, 0.5), (1, 0.25)):
+                if 0 <= x + dx < width:
+                    carry[x + dx] += error[x] * weight
+    return output
+
+
+def test_threshold_lut():
+    image = dithering.threshold(gray([[0, 127, 128, 255]]), 128)
+    assert white(image).tolist() == [[False, False, True, True]]
+    
+    image = dithering.threshold(gray([[0, 127, 128, 255]]), 1)
+    assert white(image).tolist() == [[False, True, True, True]]
+
+
+def test_gamma_is_applied_before_threshold():
+    assert dithering._gamma_lut(1.0) == list(range(256))
+    assert dithering._gamma_lut(2.0)[128] == 64
+    assert dithering._gamma_lut(0.5)[64] == 128
+    
+    # 150 vira 88 com gamma 2: abaixo do limiar 100
+    assert white(dithering.dither(gray([[150]]), 'threshold', 100)).tolist() == [[True]]
+    assert white(dithering.dither(gray([[150]]), 'threshold', 100, gamma=2.0)).tolist() == [[False]]
+
+
+def test_ordered_bayer2_known_pattern():
+    # Limiares da matriz 2x2 em torno de 128: [[32.4, 159.9], [223.6, 96.1]]
+    image = dithering.ordered(gray(np.full((4, 4), 100)), 2, 128)
+    assert white(image).tolist() == [[True, False, True, False], [False, True, False, True]] * 2
+
+
+def test_floyd_steinberg_extremes_and_level():
+    assert not white(dithering.floyd_steinberg(gray(np.zeros((8, 8))))).any()
+    assert white(dithering.floyd_steinberg(gray(np.full((8, 8), 255)))).all()
+    
+    # Limiar mais alto escurece o mesmo cinza
+    flat = gray(np.full((64, 64), 150))
+    assert white(dithering.floyd_steinberg(flat, 200)).mean() < white(dithering.floyd_steinberg(flat, 128)).mean()
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('level', [128, 90])
+def test_atkinson_matches_reference(seed, level):
+    pixels = np.random.default_rng(seed).integers(0, 256, (9, 13), dtype=np.uint8)
+    result = dithering.atkinson(gray(pixels), level)
+    assert np.array_equal(white(result), reference_atkinson(pixels, level))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_row_diffusion_matches_reference(seed):
+    pixels = np.random.default_rng(seed).integers(0, 256, (11, 17), dtype=np.uint8)
+    result = dithering.row_diffusion(gray(pixels))
+    assert np.array_equal(white(result), reference_row_diffusion(pixels))
+
+
+@pytest.mark.parametrize('method', [method for method in dithering.METHODS if method != 'threshold'])
+@pytest.mark.parametrize('value', [127, 128])
+def test_flat_half_gray_gives_half_density(method, value):
+    image = dithering.dither(gray(np.full((96, 96), value)), method)
+    assert image.size == (96, 96)
+    assert abs(white(image).mean() - 0.5) < 0.02
+
+
+@pytest.mark.parametrize('method', dithering.METHODS)
+def test_extremes_stay_black_and_white(method):
+    pixels = np.zeros((16, 16), dtype=np.uint8)
+    pixels[:, 8:] = 255
+    result = white(dithering.dither(gray(pixels), method))
+    assert not result[:, :8].any()
+    assert result[:, 8:].all()
+
+
+def test_dither_converts_non_gray_input():
+    image = Image.new('RGB', (4, 4), (255, 255, 255))
+    assert white(dithering.dither(image, 'threshold')).all()
+
+
+def test_dither_rejects_unknown_method():
+    with pytest.raises(ValueError, match="desconhecido"):
+        dithering.dither(gray([[0]]), 'halftone')
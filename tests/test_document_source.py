@@ -0,0 +1,100 @@
+"""
+Documentos de várias páginas (TIFF): uma página por vez, com os limites de cada uma
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import document_source
+from config import DOCUMENT_CONFIG
+from image_processor import ImageProcessor
+
+# Largura, altura e se a página tem conteúdo
+PAGES = [(200, 300, True), (200, 900, True), (200, 100, False), (100, 400, True)]
+
+
+def page(width, height, ink, index):
+    image = Image.new('L', (width, height), 255)
+    if ink:
+        image.paste(0, (10, 20 + index, width - 10, height - 30))
+    return image
+
+
+@pytest.fixture
+def tiff_path(tmp_path):
+    path = tmp_path / 'documento.tif'
+    pages = [page(width, height, ink, index) for index, (width, height, ink) in enumerate(PAGES)]
+    pages[0].save(path, save_all=True, append_images=pages[1:])
+    return str(path)
+
+
+@pytest.fixture
+def processor():
+    return ImageProcessor(target_width_px=384, pixels_per_mm=8)
+
+
+def test_page_count(tiff_path):
+    assert document_source.is_document(tiff_path)
+    assert document_source.page_count(tiff_path) == len(PAGES)
+
+
+def test_iter_pages_yields_each_frame(tiff_path, processor):
+    sizes = [image.size for image in document_source.iter_pages(tiff_path, processor)]
+    assert sizes == [(width, height) for width, height, _ in PAGES]
+    
+    # Intervalo de páginas
+    sizes = [image.size for image in document_source.iter_pages(tiff_path, processor, 1, 3)]
+    assert sizes == [(200, 900), (200, 100)]
+
+
+def test_each_page_is_checked_against_limits(tiff_path):
+    # A segunda página (900px -> 1728px na largura alvo = 216mm) passa do limite
+    processor = ImageProcessor(target_width_px=384, pixels_per_mm=8, max_height_mm=100)
+    pages = document_source.iter_pages(tiff_path, processor)
+    
+    assert next(pages).size == (200, 300)
+    with pytest.raises(ValueError, match="muito"):
+        next(pages)
+
+
+def test_processed_pages_match_single_image_pipeline(tiff_path, processor):
+    pages = list(document_source.iter_processed_pages(tiff_path, processor, offset_mm=2, method='threshold'))
+    
+    assert len(pages) == len(PAGES)
+    for index, result in enumerate(pages):
+        expected = processor.convert_to_monochrome(
+            processor.process(page(*PAGES[index], index), offset_mm=2), 'threshold'
+        )
+        assert result.mode == '1'
+        assert np.array_equal(np.asarray(result), np.asarray(expected))
+
+
+def test_joined_bands_skip_blank_pages_and_add_gaps(tiff_path, processor):
+    bands = list(document_source.iter_joined_bands(tiff_path, processor, method='threshold', gap_mm=3))
+    
+    expected = []
+    for index, (width, height, ink) in enumerate(PAGES):
+        content = processor.trim_blank_rows(processor.load_resized(page(width, height, ink, index)))
+        if content is None:
+            continue
+        if expected:
+            expected.append(None)
+        expected.append(processor.convert_to_monochrome(content, 'threshold'))
+    
+    assert len(bands) == len(expected) == 5
+    for band, reference in zip(bands, expected):
+        assert band.mode == '1' and band.width == 384
+        if reference is None:
+            # Espaço entre páginas: linhas brancas
+            assert band.height == 3 * 8
+            assert np.asarray(band).all()
+        else:
+            assert np.array_equal(np.asarray(band), np.asarray(reference))
+
+
+def test_joined_bands_default_gap(tiff_path, processor):
+    bands = list(document_source.iter_joined_bands(tiff_path, processor, method='threshold'))
+    gap_rows = int(DOCUMENT_CONFIG['page_gap_mm'] * processor.pixels_per_mm)
+    
+    assert bands[1].height == gap_rows
@@ -0,0 +1,132 @@
+"""
+Histórico em SQLite: migração do history.json, gravação em lotes e limites
+"""
+
+import json
+import time
+
+import pytest
+from PIL import Image
+
+from history_store import HistoryStore
+from image_processor import ImageProcessor
+
+# Intervalo entre usos: a ordem vem de time.time(), que no Windows tem resolução de ~16ms
+TICK_S = 0.02
+
+
+@pytest.fixture
+def store():
+    history = HistoryStore(':memory:', legacy_file='')
+    yield history
+    history.close()
+
+
+def test_migrates_legacy_json_once(tmp_path):
+    legacy = tmp_path / 'history.json'
+    legacy.write_text(json.dumps(['c.png', 'b.png', 42, 'a.png']), encoding='utf-8')
+    
+    history = HistoryStore(':memory:', legacy_file=str(legacy))
+    try:
+        # Ordem preservada (o primeiro da lista é o mais recente); itens inválidos ignorados
+        assert [entry['path'] for entry in history.recent(10)] == ['c.png', 'b.png', 'a.png']
+        assert not legacy.exists()
+        assert (tmp_path / 'history.json.migrated').exists()
+    finally:
+        history.close()
+
+
+def test_unreadable_legacy_json_is_kept(tmp_path):
+    legacy = tmp_path / 'history.json'
+    legacy.write_text('{não é json', encoding='utf-8')
+    
+    history = HistoryStore(':memory:', legacy_file=str(legacy))
+    try:
+        assert history.count() == 0
+        assert legacy.exists()
+    finally:
+        history.close()
+
+
+def test_record_update_and_remove(store):
+    store.record('a.png', width=800, height=1200, content_hash='h1')
+    time.sleep(TICK_S)
+    store.record('b.png', width=100, height=100)
+    store.flush()
+    time.sleep(TICK_S)
+    assert [entry['path'] for entry in store.recent()] == ['b.png', 'a.png']
+    
+    # Usar de novo: volta ao topo, conta o uso e mantém os metadados não informados
+    store.record('a.png', thumbnail='a.thumb.png')
+    store.update('a.png', processed_height=640, settings={'offset_mm': 2, 'auto_top_fix': True})
+    store.flush()
+    entry = store.get('a.png')
+    assert [item['path'] for item in store.recent()] == ['a.png', 'b.png']
+    assert entry['use_count'] == 2
+    assert (entry['width'], entry['height'], entry['content_hash']) == (800, 1200, 'h1')
+    assert entry['thumbnail'] == 'a.thumb.png'
+    assert entry['processed_height'] == 640
+    assert entry['settings'] == {'offset_mm': 2, 'auto_top_fix': True}
+    
+    # update não muda a ordem nem cria entradas
+    store.update('b.png', processed_height=10)
+    store.update('novo.png', processed_height=10)
+    store.remove('a.png')
+    store.flush()
+    assert store.get('a.png') is None
+    assert store.get('novo.png') is None
+    assert [item['path'] for item in store.recent()] == ['b.png']
+
+
+def test_unknown_field_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.record('a.png', cor='azul')
+
+
+def test_find_by_hash_returns_most_recent(store):
+    for path, content_hash in [('original.png', 'abc'), ('outro.png', 'def'), ('copia.png', 'abc')]:
+        store.record(path, content_hash=content_hash)
+        time.sleep(TICK_S)
+    store.flush()
+    
+    assert store.find_by_hash('abc')['path'] == 'copia.png'
+    assert store.find_by_hash('zzz') is None
+
+
+def test_max_entries_prunes_least_recently_used():
+    history = HistoryStore(':memory:', legacy_file='', max_entries=3)
+    try:
+        for index in range(5):
+            history.record(f"{index}.png")
+            history.flush()
+            time.sleep(TICK_S)
+        
+        assert history.count() == 3
+        assert [entry['path'] for entry in history.recent(10)] == ['4.png', '3.png', '2.png']
+    finally:
+        history.close()
+
+
+def test_close_flushes_pending_writes(tmp_path):
+    path = str(tmp_path / 'history.db')
+    history = HistoryStore(path, legacy_file='')
+    for index in range(200):
+        history.record(f"{index}.png", width=index)
+    history.close()
+    
+    reopened = HistoryStore(path, legacy_file='')
+    try:
+        assert reopened.count() == 200
+        assert reopened.get('199.png')['width'] == 199
+    finally:
+        reopened.close()
+
+
+def test_open_image_keeps_original_size_for_history(tmp_path):
+    # JPEG reduzido na decodificação: o histórico guarda o tamanho do arquivo
+    path = str(tmp_path / 'foto.jpg')
+    Image.new('L', (2000, 3000), 128).save(path)
+    
+    with ImageProcessor(target_width_px=384).open_image(path, grayscale=True) as image:
+        assert image.size != (2000, 3000)
+        assert image.info['original_size'] == (2000, 3000)
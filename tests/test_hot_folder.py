@@ -0,0 +1,133 @@
+"""
+Pasta monitorada: estabilidade dos arquivos e impressão única por conteúdo
+"""
+
+import io
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from hot_folder import HotFolder, PrintedStore
+
+SETTLE_S = 0.1
+
+
+class FakePrinter:
+    """PrinterHandler sem impressora: guarda as imagens recebidas"""
+    
+    def __init__(self):
+        self.images = []
+        self._lock = threading.Lock()
+    
+    def has_raw_transport(self):
+        return False
+    
+    def print_image(self, image, copies=1, copy_separator=None):
+        with self._lock:
+            self.images.append(image.copy())
+        return True
+
+
+def png_bytes(height, seed=0):
+    image = Image.new('L', (200, height), 255)
+    image.paste(0, (10, 10 + seed, 150, 30 + seed))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def printer():
+    return FakePrinter()
+
+
+@pytest.fixture
+def hot_folder(tmp_path, printer):
+    service = HotFolder([tmp_path], printer_handler=printer, state_db=':memory:',
+                        settle_s=SETTLE_S, poll_interval_s=0.02, use_watchdog=False)
+    yield service
+    service.stop()
+
+
+def settle(service):
+    """Duas passagens separadas por settle_s: a primeira registra, a segunda despacha"""
+    service.scan()
+    service.dispatch_stable()
+    time.sleep(SETTLE_S * 1.5)
+    service.scan()
+    service.dispatch_stable()
+    assert service.wait_idle(timeout=10)
+
+
+def test_printed_store_remembers_hashes():
+    store = PrintedStore(':memory:')
+    assert not store.contains('abc')
+    store.add('abc', 'x.png')
+    assert store.contains('abc')
+    store.close()
+
+
+def test_same_content_is_printed_once(tmp_path, hot_folder, printer):
+    (tmp_path / 'a.png').write_bytes(png_bytes(100))
+    (tmp_path / 'b.png').write_bytes(png_bytes(100))
+    (tmp_path / 'c.png').write_bytes(png_bytes(100, seed=5))
+    
+    hot_folder.process_existing()
+    
+    assert hot_folder.stats == {'printed': 2, 'duplicates': 1, 'failed': 0}
+    assert len(printer.images) == 2
+
+
+def test_growing_file_waits_to_settle(tmp_path, hot_folder, printer):
+    data = png_bytes(300)
+    path = tmp_path / 'growing.png'
+    path.write_bytes(data[:len(data) // 2])
+    
+    hot_folder.scan()
+    assert hot_folder.dispatch_stable() == 1
+    
+    # O arquivo muda antes de estabilizar: o prazo recomeça
+    time.sleep(SETTLE_S * 0.6)
+    with open(path, 'ab') as file:
+        file.write(data[len(data) // 2:])
+    time.sleep(SETTLE_S * 0.6)
+    hot_folder.scan()
+    assert hot_folder.dispatch_stable() == 1
+    assert hot_folder.stats['printed'] == 0
+    
+    settle(hot_folder)
+    assert hot_folder.stats == {'printed': 1, 'duplicates': 0, 'failed': 0}
+
+
+def test_empty_file_does_not_block_process_existing(tmp_path, hot_folder, printer):
+    (tmp_path / 'empty.png').write_bytes(b'')
+    (tmp_path / 'ticket.png').write_bytes(png_bytes(100))
+    
+    worker = threading.Thread(target=hot_folder.process_existing, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    
+    assert not worker.is_alive()
+    assert hot_folder.stats == {'printed': 1, 'duplicates': 0, 'failed': 0}
+    
+    # Gravado depois: volta a ser candidato e é impresso
+    (tmp_path / 'empty.png').write_bytes(png_bytes(100, seed=7))
+    settle(hot_folder)
+    assert hot_folder.stats['printed'] == 2
+
+
+def test_renamed_printed_file_is_not_printed_again(tmp_path, hot_folder, printer):
+    (tmp_path / 'a.png').write_bytes(png_bytes(100))
+    hot_folder.process_existing()
+    assert hot_folder.stats['printed'] == 1
+    
+    os.rename(tmp_path / 'a.png', tmp_path / 'b.png')
+    settle(hot_folder)
+    
+    assert hot_folder.stats == {'printed': 1, 'duplicates': 1, 'failed': 0}
+    assert len(printer.images) == 1
+    # O nome antigo sai do registro de arquivos enviados
+    assert str(tmp_path / 'a.png') not in hot_folder._dispatched
@@ -0,0 +1,97 @@
+"""
+Caches do pipeline: etapas na memória (StageCache) e comandos em disco (PayloadStore)
+"""
+
+import os
+
+from PIL import Image
+
+from image_cache import PayloadStore, StageCache
+
+
+def gray(width, height):
+    return Image.new('L', (width, height), 255)
+
+
+def test_stage_cache_evicts_least_recently_used_by_bytes():
+    cache = StageCache(max_bytes=3000)
+    cache.put('a', gray(10, 100))
+    cache.put('b', gray(10, 100))
+    cache.put('c', gray(10, 100))
+    
+    # "a" é usada: "b" passa a ser a mais antiga
+    assert cache.get('a') is not None
+    cache.put('d', gray(10, 100))
+    
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    assert cache.current_bytes == 3000
+
+
+def test_stage_cache_skips_images_larger_than_limit():
+    cache = StageCache(max_bytes=1000)
+    cache.put('grande', gray(100, 100))
+    
+    assert cache.get('grande') is None
+    assert cache.current_bytes == 0
+
+
+def test_stage_cache_computes_once():
+    cache = StageCache()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return gray(4, 4)
+    
+    first = cache.get_or_compute(('resized', 1), compute)
+    assert cache.get_or_compute(('resized', 1), compute) is first
+    assert len(calls) == 1
+
+
+def test_payload_round_trip(tmp_path):
+    store = PayloadStore(tmp_path)
+    chunks = [b'\x1b@', b'', b'\x1dv0\x00' + bytes(range(256)) * 10, b'\x1dV\x00']
+    key = PayloadStore.make_key('hash', 384, 'threshold', 0)
+    
+    assert store.get(key) is None
+    store.put(key, chunks)
+    
+    assert store.get(key) == chunks
+    assert PayloadStore.make_key('hash', 384, 'threshold', 0) == key
+    assert PayloadStore.make_key('hash', 384, 'threshold', 1) != key
+
+
+def test_payload_truncated_or_bad_magic_is_discarded(tmp_path):
+    store = PayloadStore(tmp_path)
+    store.put('truncado', [b'abcdef', b'ghij'])
+    with open(store.path('truncado'), 'r+b') as f:
+        f.truncate(os.path.getsize(store.path('truncado')) - 2)
+    with open(store.path('estranho'), 'wb') as f:
+        f.write(b'XXXX\x00\x00\x00\x01a')
+    
+    assert store.get('truncado') is None
+    assert store.get('estranho') is None
+    # Arquivos corrompidos saem do cache
+    assert not os.path.exists(store.path('truncado'))
+    assert not os.path.exists(store.path('estranho'))
+
+
+def test_payload_eviction_by_bytes_and_last_use(tmp_path):
+    chunk = b'x' * 1000
+    size = len(PayloadStore._encode([chunk]))
+    store = PayloadStore(tmp_path, max_bytes=size * 2)
+    
+    store.put('a', [chunk])
+    store.put('b', [chunk])
+    os.utime(store.path('a'), (1000, 1000))
+    os.utime(store.path('b'), (2000, 2000))
+    
+    # Ler "a" a torna a mais recente: "b" é descartada ao passar do limite
+    assert store.get('a') == [chunk]
+    store.put('c', [chunk])
+    
+    assert store.get('b') is None
+    assert store.get('a') == [chunk]
+    assert store.get('c') == [chunk]
+    assert sorted(os.listdir(tmp_path)) == ['a.escpos', 'c.escpos']
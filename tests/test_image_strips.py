@@ -0,0 +1,65 @@
+"""
+Processamento em faixas: mesmo resultado do redimensionamento da imagem inteira
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processor import ImageProcessor
+
+FORMATS = [('BMP', 'bmp'), ('PPM', 'ppm'), ('TIFF', 'tif')]
+MODES = ['L', 'RGB', 'P', 'RGBA', '1']
+
+
+def random_image(mode, width, height, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    return image if mode == 'RGB' else image.convert(mode)
+
+
+def save(image, path, format_id):
+    # TIFF em uma única faixa: o arquivo inteiro é um tile 'raw'
+    options = {'rowsperstrip': image.height} if format_id == 'TIFF' else {}
+    try:
+        image.save(path, format_id, **options)
+    except (OSError, KeyError, ValueError):
+        pytest.skip(f"{format_id} não grava o modo {image.mode}")
+
+
+@pytest.mark.parametrize('format_id, extension', FORMATS)
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('size', [(300, 2500), (1000, 1203)], ids=['estreita', 'larga'])
+def test_strips_match_full_decode(tmp_path, format_id, extension, mode, size):
+    path = tmp_path / f"imagem.{extension}"
+    save(random_image(mode, *size), path, format_id)
+    
+    processor = ImageProcessor()
+    processor.strip_bytes = 256 * 1024  # Várias faixas mesmo em imagens pequenas
+    
+    with Image.open(path) as image:
+        strips = processor.resize_to_width_in_strips(image)
+    with Image.open(path) as image:
+        full = processor.resize_to_width(processor.load(image), grayscale=True)
+    
+    assert strips.size == full.size
+    assert np.array_equal(np.asarray(strips), np.asarray(full))
+
+
+@pytest.mark.parametrize('format_id, extension', FORMATS)
+def test_uncompressed_files_are_read_in_strips(tmp_path, format_id, extension):
+    path = tmp_path / f"imagem.{extension}"
+    save(random_image('RGB', 300, 2500), path, format_id)
+    
+    processor = ImageProcessor()
+    with Image.open(path) as image:
+        layout = processor._raw_layout(image)
+        assert layout is not None
+        
+        # Uma faixa do meio tem só as linhas pedidas, iguais às da imagem inteira
+        strip = processor._read_rows(image, layout, 1000, 1218)
+    with Image.open(path) as image:
+        expected = image.convert('RGB').crop((0, 1000, 300, 1218))
+    
+    assert strip.size == (300, 218)
+    assert np.array_equal(np.asarray(strip.convert('RGB')), np.asarray(expected))
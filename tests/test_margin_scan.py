@@ -0,0 +1,94 @@
+"""
+A varredura vetorizada de margens deve dar o mesmo resultado do laço linha a linha original
+"""
+
+import numpy as np
+import pytest
+
+from image_processor import ImageProcessor
+
+
+def loop_find_content_row(img_array, threshold, from_bottom=False):
+    """Laço original (uma linha por vez), usado como referência"""
+    rows = range(img_array.shape[0])
+    if from_bottom:
+        rows = reversed(rows)
+    for y in rows:
+        dark_pixels = np.sum(img_array[y] < threshold)
+        if dark_pixels > (img_array.shape[1] * 0.01):
+            return y
+    return None
+
+
+def random_image(rng, height, width=464):
+    """
+    Imagem clara com linhas esparsas perto do limite de 1% de pixels escuros
+    
+    Cada linha recebe de 0 a 8 pixels escuros (o limite em 464 colunas é 4,64),
+    então metade das linhas marcadas fica logo abaixo e metade logo acima dele.
+    """
+    img_array = np.full((height, width), 255, dtype=np.uint8)
+    marked = rng.choice(height, size=max(1, height // 50), replace=False)
+    for y in marked:
+        columns = rng.choice(width, size=rng.integers(0, 9), replace=False)
+        img_array[y, columns] = rng.integers(0, 256, size=columns.size)
+    return img_array
+
+
+@pytest.fixture
+def processor():
+    return ImageProcessor()
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('height', [1, 15, 600, 3999, 4000, 5003])
+def test_matches_loop_on_random_images(processor, seed, height):
+    rng = np.random.default_rng(seed)
+    img_array = random_image(rng, height)
+    
+    for from_bottom in (False, True):
+        expected = loop_find_content_row(img_array, 250, from_bottom)
+        assert processor._find_content_row(img_array, 250, from_bottom) == expected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_coarse_scan_matches_loop_on_single_rows(processor, seed):
+    # Conteúdo em uma única linha de uma imagem alta: a linha pode cair em
+    # qualquer posição do bloco, inclusive no bloco final incompleto
+    rng = np.random.default_rng(seed)
+    height = 6007
+    img_array = np.full((height, 464), 255, dtype=np.uint8)
+    y = int(rng.integers(0, height))
+    img_array[y, rng.choice(464, size=5, replace=False)] = 0
+    
+    assert processor._find_content_row_coarse(img_array, 250) == y
+    assert processor._find_content_row_coarse(img_array, 250, from_bottom=True) == y
+    assert processor._find_content_row(img_array, 250) == loop_find_content_row(img_array, 250)
+
+
+def test_coarse_scan_ignores_blocks_only_dark_when_merged(processor):
+    # Cada linha do bloco tem 4 pixels escuros (abaixo do limite), em colunas
+    # diferentes: a cópia reduzida marca o bloco, mas nenhuma linha tem conteúdo
+    img_array = np.full((4800, 464), 255, dtype=np.uint8)
+    for offset in range(16):
+        img_array[1600 + offset, offset * 4:offset * 4 + 4] = 0
+    img_array[4000, :10] = 0
+    
+    assert processor._find_content_row(img_array, 250) == 4000
+    assert processor._find_content_row(img_array, 250) == loop_find_content_row(img_array, 250)
+
+
+@pytest.mark.parametrize('height', [300, 4500])
+@pytest.mark.parametrize('value, expected_top, expected_bottom', [
+    (255, None, None),
+    (0, 0, -1),
+])
+def test_blank_and_dark_images(processor, height, value, expected_top, expected_bottom):
+    img_array = np.full((height, 464), value, dtype=np.uint8)
+    if expected_bottom is not None:
+        expected_bottom += height
+    
+    assert processor._find_content_row(img_array, 250) == expected_top
+    assert processor._find_content_row(img_array, 250, from_bottom=True) == expected_bottom
+    assert loop_find_content_row(img_array, 250) == expected_top
+    assert loop_find_content_row(img_array, 250, from_bottom=True) == expected_bottom
@@ -0,0 +1,63 @@
+"""
+Conexões TCP do backend de rede, contra a impressora simulada
+"""
+
+import time
+
+import pytest
+
+from network_printer import ConnectionPool, NetworkPrinterBackend
+from stand_in_printer import StandInPrinter
+
+
+def wait_for(condition, timeout=2.0):
+    """Aguarda a thread da impressora simulada processar o que foi enviado"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def printer():
+    stand_in = StandInPrinter()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def backend(printer):
+    pool = ConnectionPool()
+    yield NetworkPrinterBackend(printer.host, printer.port, pool=pool)
+    pool.close_all()
+
+
+def test_jobs_reuse_the_connection(printer, backend):
+    for index in range(5):
+        assert backend.send([b'job', bytes([index])])
+    
+    assert wait_for(lambda: len(printer.received) == 20)
+    assert printer.connections == 1
+    assert bytes(printer.received) == b''.join(b'job' + bytes([index]) for index in range(5))
+
+
+def test_reconnects_after_drop_connections(printer, backend):
+    assert backend.send([b'first'])
+    assert wait_for(lambda: len(printer.received) == 5)
+    
+    # A impressora reinicia: o socket ocioso do pool está morto
+    printer.drop_connections()
+    
+    assert backend.send([b'second', b'-job'])
+    assert wait_for(lambda: len(printer.received) == 15)
+    assert printer.connections == 2
+    assert bytes(printer.received) == b'firstsecond-job'
+
+
+def test_reports_failure_when_printer_is_off(printer, backend):
+    printer.close()
+    
+    assert not backend.send([b'lost'])
+    assert not backend.probe()
@@ -0,0 +1,89 @@
+"""
+Caminhos otimizados do pipeline: mesmos pixels do pipeline em etapas
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_processor import ImageProcessor
+
+OFFSETS_MM = [0, 5, -3, -1000, 2.5]
+
+
+def receipt(width=600, height=900, margin=120, seed=0, mode='L'):
+    """Cupom sintético: margem branca no topo, texto simulado e meios-tons"""
+    rng = np.random.default_rng(seed)
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    for top in range(margin, height - 20, 30):
+        pixels[top:top + 14, 20:rng.integers(100, width - 20)] = rng.integers(0, 120)
+    pixels[height // 2:height // 2 + 80] = np.linspace(0, 255, width, dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    return image if mode == 'L' else image.convert(mode)
+
+
+@pytest.fixture
+def processor():
+    return ImageProcessor(target_width_px=384, pixels_per_mm=8)
+
+
+def assert_same_pixels(result, expected):
+    assert result.size == expected.size
+    assert np.array_equal(np.asarray(result.convert('L')), np.asarray(expected.convert('L')))
+
+
+@pytest.mark.parametrize('offset_mm', OFFSETS_MM)
+@pytest.mark.parametrize('auto_top_fix', [True, False])
+@pytest.mark.parametrize('margin', [120, 0])
+def test_trim_and_offset_matches_staged_steps(processor, offset_mm, auto_top_fix, margin):
+    resized = processor.load_resized(receipt(margin=margin))
+    
+    staged = processor.remove_top_margin(resized) if auto_top_fix else resized
+    staged = processor.apply_offset(staged, offset_mm)
+    fused = processor.trim_and_offset(resized, auto_top_fix, offset_mm)
+    
+    assert fused.mode == 'L'
+    assert_same_pixels(fused, staged)
+
+
+@pytest.mark.parametrize('mode', ['L', 'RGB'])
+@pytest.mark.parametrize('offset_mm', OFFSETS_MM)
+def test_process_matches_staged_pipeline(processor, mode, offset_mm):
+    image = receipt(mode=mode)
+    
+    staged = processor.resize_to_width(image, grayscale=True)
+    staged = processor.apply_offset(processor.remove_top_margin(staged), offset_mm)
+    
+    assert_same_pixels(processor.process(image, True, offset_mm), staged)
+
+
+def test_blank_image_is_kept(processor):
+    blank = Image.new('L', (600, 300), 255)
+    resized = processor.load_resized(blank)
+    
+    assert_same_pixels(processor.trim_and_offset(resized, True, -1000), resized)
+    assert processor.trim_and_offset(resized, True, 2).height == resized.height + 16
+
+
+@pytest.mark.parametrize('method', ['threshold', 'floyd-steinberg', 'bayer4', 'dither'])
+@pytest.mark.parametrize('offset_mm', OFFSETS_MM)
+@pytest.mark.parametrize('band_height', [256, 37])
+def test_monochrome_bands_match_process(processor, method, offset_mm, band_height):
+    image = receipt(height=1400)
+    
+    expected = processor.convert_to_monochrome(processor.process(image, True, offset_mm), method)
+    bands = list(processor.iter_monochrome_bands(image, band_height, True, offset_mm, method))
+    
+    assert all(band.mode == '1' and band.height <= band_height for band in bands)
+    joined = np.concatenate([np.asarray(band) for band in bands])
+    assert np.array_equal(joined, np.asarray(expected))
+
+
+@pytest.mark.parametrize('offset_mm', [0, 5])
+def test_monochrome_bands_without_top_fix(processor, offset_mm):
+    image = receipt()
+    
+    expected = processor.convert_to_monochrome(processor.process(image, False, offset_mm), 'threshold')
+    bands = processor.iter_monochrome_bands(image, 64, False, offset_mm, 'threshold')
+    
+    assert np.array_equal(np.concatenate([np.asarray(band) for band in bands]), np.asarray(expected))
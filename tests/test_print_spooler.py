@@ -0,0 +1,75 @@
+"""
+Spooler: processamento adiado e reimpressão a partir dos comandos gravados
+"""
+
+import threading
+
+from PIL import Image
+
+from image_cache import PayloadStore
+from print_spooler import JOB_DONE, JOB_FAILED, PrintSpooler
+from printer_handler import PrinterHandler
+
+
+class RecordingBackend:
+    """Transporte RAW que guarda os bytes enviados"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    def send(self, chunks):
+        self.sent.append(b''.join(chunks))
+        return True
+
+
+def make_spooler(tmp_path):
+    handler = PrinterHandler()
+    handler.backend = RecordingBackend()
+    return PrintSpooler(handler, payload_cache=PayloadStore(tmp_path)), handler.backend
+
+
+def ticket():
+    image = Image.new('1', (384, 64), 1)
+    image.paste(0, (10, 10, 200, 40))
+    return image
+
+
+def test_render_runs_on_encoder_thread(tmp_path):
+    spooler, backend = make_spooler(tmp_path)
+    threads = []
+    
+    def render():
+        threads.append(threading.current_thread().name)
+        return ticket()
+    
+    job_id = spooler.submit(None, render=render)
+    
+    assert spooler.wait(job_id, timeout=5) == JOB_DONE
+    assert threads == ['spooler-encoder']
+    assert len(backend.sent) == 1
+
+
+def test_reprint_uses_stored_payload_without_render(tmp_path):
+    spooler, backend = make_spooler(tmp_path)
+    renders = []
+    
+    def render():
+        renders.append(1)
+        return ticket()
+    
+    first = spooler.submit(None, render=render, cache_key='cupom')
+    assert spooler.wait(first, timeout=5) == JOB_DONE
+    second = spooler.submit(None, render=render, cache_key='cupom')
+    assert spooler.wait(second, timeout=5) == JOB_DONE
+    
+    assert len(renders) == 1
+    assert backend.sent[0] == backend.sent[1]
+
+
+def test_render_error_fails_the_job(tmp_path):
+    spooler, backend = make_spooler(tmp_path)
+    
+    job_id = spooler.submit(None, render=lambda: 1 / 0)
+    
+    assert spooler.wait(job_id, timeout=5) == JOB_FAILED
+    assert backend.sent == []
@@ -0,0 +1,158 @@
+"""
+Frota de impressoras contra impressoras simuladas (servidores TCP locais)
+"""
+
+import asyncio
+import re
+
+import pytest
+
+from network_printer import ConnectionPool, NetworkPrinterBackend
+from printer_fleet import FleetPrinter, PrinterFleet
+from stand_in_printer import StandInPrinter
+
+JOB_PATTERN = re.compile(rb'<(\d+)>')
+
+
+def job_chunks(number, size):
+    """Trabalho identificável no fluxo recebido: marcador <n> e enchimento"""
+    marker = f"<{number}>".encode()
+    return [marker + b'.' * (size - len(marker))]
+
+
+def received_jobs(stand_in):
+    """Números dos trabalhos na ordem em que a impressora simulada os recebeu"""
+    return [int(number) for number in JOB_PATTERN.findall(bytes(stand_in.received))]
+
+
+async def wait_for(condition, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def stand_ins():
+    printers = []
+    yield printers
+    for stand_in in printers:
+        stand_in.close()
+
+
+def fleet_printer(name, stand_in, pool):
+    return FleetPrinter(name, NetworkPrinterBackend(stand_in.host, stand_in.port, pool=pool))
+
+
+def test_faster_printer_takes_more_jobs(stand_ins, pool):
+    stand_ins += [StandInPrinter(bytes_per_s=400_000), StandInPrinter(bytes_per_s=40_000)]
+    printers = [fleet_printer('rapida', stand_ins[0], pool), fleet_printer('lenta', stand_ins[1], pool)]
+    
+    async def scenario():
+        fleet = PrinterFleet(printers, affinity={})
+        await fleet.start()
+        jobs = [fleet.submit(chunks=job_chunks(index, 20_000)) for index in range(24)]
+        await fleet.close()
+        return jobs, fleet.stats()
+    
+    jobs, stats = asyncio.run(scenario())
+    
+    assert all(job.done.result() for job in jobs)
+    assert stats['rapida']['jobs'] + stats['lenta']['jobs'] == 24
+    assert stats['rapida']['jobs'] > 2 * stats['lenta']['jobs']
+    assert stats['rapida']['bytes_per_s'] > stats['lenta']['bytes_per_s']
+
+
+def test_group_fails_over_to_next_printer_in_order(stand_ins, pool):
+    stand_ins += [StandInPrinter(bytes_per_s=100_000) for _ in range(3)]
+    printers = [fleet_printer(name, stand_in, pool) for name, stand_in in zip('abc', stand_ins)]
+    
+    async def scenario():
+        fleet = PrinterFleet(printers, affinity={'cozinha': ['a', 'b']}, health_interval_s=60)
+        await fleet.start()
+        jobs = [fleet.submit(chunks=job_chunks(index, 10_000), group='cozinha') for index in range(12)]
+        
+        # A impressora "a" cai no meio dos envios
+        assert await wait_for(lambda: len(received_jobs(stand_ins[0])) >= 3)
+        stand_ins[0].close()
+        await fleet.close()
+        
+        # Enviado não quer dizer lido: aguardar a impressora simulada
+        on_b = [job.id - 1 for job in jobs if job.printer == 'b']
+        assert await wait_for(lambda: received_jobs(stand_ins[1]) == on_b)
+        return jobs, fleet.stats()
+    
+    jobs, stats = asyncio.run(scenario())
+    
+    assert all(job.done.result() for job in jobs)
+    assert not stats['a']['healthy'] and stats['a']['failures'] == 1
+    assert received_jobs(stand_ins[2]) == []
+    
+    # "b" continua de onde "a" parou: o grupo não se mistura entre as impressoras
+    printers_in_order = [job.printer for job in jobs]
+    switch = printers_in_order.index('b')
+    assert switch >= 3
+    assert printers_in_order == ['a'] * switch + ['b'] * (12 - switch)
+
+
+def test_affinity_keeps_group_order(stand_ins, pool):
+    stand_ins += [StandInPrinter(bytes_per_s=200_000) for _ in range(3)]
+    names = ('caixa', 'balcao', 'cozinha')
+    printers = [fleet_printer(name, stand_in, pool) for name, stand_in in zip(names, stand_ins)]
+    
+    async def scenario():
+        fleet = PrinterFleet(printers, affinity={'cozinha': 'cozinha'})
+        await fleet.start()
+        jobs = [
+            fleet.submit(chunks=job_chunks(index, 5_000), group='cozinha' if index % 3 == 0 else None)
+            for index in range(30)
+        ]
+        await fleet.close()
+        
+        sent = sum(job.printer == 'cozinha' for job in jobs)
+        assert await wait_for(lambda: len(received_jobs(stand_ins[2])) == sent)
+        return jobs
+    
+    jobs = asyncio.run(scenario())
+    
+    assert all(job.done.result() for job in jobs)
+    kitchen = [job.id - 1 for job in jobs if job.group == 'cozinha']
+    assert {job.printer for job in jobs if job.group == 'cozinha'} == {'cozinha'}
+    on_kitchen = [number for number in received_jobs(stand_ins[2]) if number % 3 == 0]
+    assert on_kitchen == kitchen
+
+
+def test_health_loop_brings_printer_back(stand_ins, pool):
+    stand_in = StandInPrinter()
+    port = stand_in.port
+    stand_in.close()
+    
+    async def scenario():
+        printer = FleetPrinter('unica', NetworkPrinterBackend('127.0.0.1', port, pool=pool))
+        fleet = PrinterFleet([printer], affinity={}, health_interval_s=0.05)
+        await fleet.start()
+        
+        # Sem impressora saudável o trabalho aguarda, sem desistir
+        job = fleet.submit(chunks=job_chunks(1, 100))
+        assert await wait_for(lambda: not printer.healthy)
+        await asyncio.sleep(0.2)
+        assert not job.done.done() and fleet.waiting == 1
+        
+        # A impressora volta (reiniciada na mesma porta)
+        stand_ins.append(StandInPrinter(port=port))
+        assert await asyncio.wait_for(job.done, timeout=5)
+        assert printer.healthy
+        await fleet.close()
+        assert await wait_for(lambda: received_jobs(stand_ins[0]) == [1])
+    
+    asyncio.run(scenario())
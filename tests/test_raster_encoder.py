@@ -0,0 +1,72 @@
+"""
+Codificador GS v 0: os bytes gerados reproduzem exatamente os pontos da imagem
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from config import ESCPOS_COMMANDS
+from escpos_decoder import RASTER, ink_of, parse, render
+from printer_handler import PrinterHandler
+
+
+def random_mono(width, height, seed=0, density=0.3):
+    ink = np.random.default_rng(seed).random((height, width)) < density
+    return Image.fromarray(~ink)
+
+
+@pytest.fixture
+def handler():
+    handler = PrinterHandler()
+    handler.set_profile('generic')
+    handler.blank_feed_min_rows = 0  # Só raster: linhas brancas também viram dados
+    return handler
+
+
+@pytest.mark.parametrize('width', [384, 383, 9])
+def test_pack_raster_rows_sets_one_bit_per_black_dot(handler, width):
+    image = random_mono(width, 10)
+    packed = handler.pack_raster_rows(image)
+    
+    assert packed.shape == (10, (width + 7) // 8)
+    unpacked = np.unpackbits(packed, axis=1).astype(bool)
+    assert np.array_equal(unpacked[:, :width], ink_of(image))
+    # Bits de preenchimento da última coluna de bytes ficam brancos
+    assert not unpacked[:, width:].any()
+
+
+@pytest.mark.parametrize('band_height', [256, 64, 7])
+def test_raster_bands_round_trip(handler, band_height):
+    image = random_mono(384, 1000, seed=band_height)
+    commands = list(handler.iter_image_commands([image], band_height))
+    
+    # Um GS v 0 por faixa, com cabeçalho de largura em bytes e altura
+    heights = [len(rows) for kind, rows in parse(b''.join(commands))]
+    full, rest = divmod(1000, band_height)
+    assert heights == [band_height] * full + ([rest] if rest else [])
+    for command, height in zip(commands, heights):
+        assert command[:len(RASTER)] == RASTER
+        assert command[len(RASTER):len(RASTER) + 4] == bytes((48, 0, height & 0xFF, height >> 8))
+    
+    assert np.array_equal(render(commands, 384), ink_of(image))
+
+
+def test_several_bands_are_printed_in_order(handler):
+    bands = [random_mono(384, height, seed=height) for height in (100, 3, 300)]
+    commands = handler.iter_image_commands(bands, 64)
+    
+    expected = np.concatenate([ink_of(band) for band in bands])
+    assert np.array_equal(render(commands, 384), expected)
+
+
+def test_esc_pos_chunks_wrap_image_with_header_and_cut(handler):
+    image = random_mono(384, 50)
+    chunks = list(handler.iter_esc_pos_chunks([image], copies=2, copy_separator='cut'))
+    
+    header = ESCPOS_COMMANDS['initialize'] + ESCPOS_COMMANDS['line_spacing_0'] + ESCPOS_COMMANDS['align_left']
+    footer = ESCPOS_COMMANDS['feed_2'] + ESCPOS_COMMANDS['cut']
+    body = b''.join(handler.iter_image_commands([image]))
+    
+    assert b''.join(chunks) == header + body + footer + body + footer
+    assert handler.get_esc_pos_commands(image) == header + body + footer
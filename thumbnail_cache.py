@@ -0,0 +1,84 @@
+"""
+Cache de miniaturas para TopStart Thermal
+Guarda em disco as miniaturas do histórico para não decodificar as imagens originais
+"""
+
+import hashlib
+import os
+from PIL import Image
+from config import CACHE_CONFIG
+import document_source
+from instrumentation import logger
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=None, size=(60, 60)):
+        """
+        Inicializa o cache de miniaturas
+        
+        Args:
+            cache_dir: Pasta das miniaturas (padrão: thumbnail_dir da config)
+            size: Tamanho máximo das miniaturas em pixels
+        """
+        self.cache_dir = cache_dir or CACHE_CONFIG['thumbnail_dir']
+        self.size = size
+    
+    def cache_path(self, image_path):
+        """
+        Caminho da miniatura de uma imagem
+        
+        A chave inclui caminho, data de modificação e tamanho do arquivo;
+        se o original mudar, a miniatura antiga simplesmente deixa de ser usada.
+        
+        Args:
+            image_path: Caminho da imagem original
+            
+        Returns:
+            Caminho do arquivo PNG da miniatura
+        """
+        stat = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{self.size[0]}x{self.size[1]}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+    
+    def get(self, image_path):
+        """
+        Retorna a miniatura, gerando e gravando no cache se necessário
+        
+        Args:
+            image_path: Caminho da imagem original
+            
+        Returns:
+            PIL Image já carregada
+        """
+        thumb_path = self.cache_path(image_path)
+        
+        if os.path.exists(thumb_path):
+            try:
+                with Image.open(thumb_path) as cached:
+                    cached.load()
+                    return cached
+            except OSError:
+                pass  # Miniatura corrompida: gerar de novo
+        
+        if image_path.lower().endswith('.pdf'):
+            thumbnail = document_source.render_pdf_thumbnail(image_path, self.size)
+        else:
+            with Image.open(image_path) as img:
+                # JPEG: decodificar direto em resolução reduzida
+                img.draft('RGB', self.size)
+                img.thumbnail(self.size, Image.Resampling.LANCZOS)
+                thumbnail = img.convert('RGBA') if img.mode in ('P', 'LA', 'PA') else img.copy()
+        
+        self._save(thumbnail, thumb_path)
+        return thumbnail
+    
+    def _save(self, thumbnail, thumb_path):
+        """Grava a miniatura de forma atômica (falhas de escrita são ignoradas)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{thumb_path}.{os.getpid()}.tmp"
+            thumbnail.save(temp_path, 'PNG')
+            os.replace(temp_path, thumb_path)
+        except OSError as e:
+            logger.warning("Não foi possível gravar a miniatura: %s", e)